@@ -1,39 +1,180 @@
+import io
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Autor, Livro, Membro, Emprestimo
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import cache
+from .busca import filtro_busca
+from .models import Autor, Livro, Membro, Emprestimo, Reserva, Tarefa
+
+# Formulários, importação (csv) e serviços são importados dentro das views e
+# actions que os usam: o autodiscover do admin carrega este módulo em todo
+# processo (inclusive comandos do manage.py), e eles só servem a poucas páginas.
 
 # ATENÇÃO: As linhas 'admin.site.register(...)' DUPLICADAS foram REMOVIDAS daqui.
 
 # biblioteca/admin.py
 
+# 0. Importação em lote por CSV (usada por Autor, Livro e Membro)
+class ImportacaoCSVAdminMixin:
+    """Adiciona a página 'Importar CSV' à lista do modelo."""
+    change_list_template = 'admin/biblioteca/change_list_importacao.html'
+    tipo_importacao = None  # chave de biblioteca.importacao.IMPORTACOES
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='%s_%s_importar' % info),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        from .forms import ImportacaoCSVForm
+        from .importacao import ArquivoInvalido, importar_csv
+
+        resultado = None
+        if request.method == 'POST':
+            form = ImportacaoCSVForm(request.POST, request.FILES)
+            if form.is_valid():
+                arquivo = io.TextIOWrapper(form.cleaned_data['arquivo'].file, encoding='utf-8-sig', newline='')
+                try:
+                    resultado = importar_csv(self.tipo_importacao, arquivo, form.cleaned_data['delimitador'])
+                except ArquivoInvalido as erro:
+                    form.add_error('arquivo', str(erro))
+                else:
+                    nivel = 'success' if not resultado.erros else 'warning'
+                    self.message_user(request, f'{resultado.criados} registro(s) importado(s), {len(resultado.erros)} linha(s) com erro.', level=nivel)
+        else:
+            form = ImportacaoCSVForm()
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Importar {self.model._meta.verbose_name_plural} (CSV)',
+            'form': form,
+            'resultado': resultado,
+        }
+        return render(request, 'admin/biblioteca/importar_csv.html', contexto)
+
+
+# 0.1 Listagens rápidas para tabelas grandes
+class PaginadorEstimado(Paginator):
+    """Paginator cujo total vem de cache.contagem_aproximada() (COUNT(*) reaproveitado)."""
+
+    @cached_property
+    def count(self):
+        return cache.contagem_aproximada(
+            self.object_list,
+            limiar=getattr(settings, 'BIBLIOTECA_ADMIN_CONTAGEM_LIMIAR', 10000),
+            validade=getattr(settings, 'BIBLIOTECA_ADMIN_CONTAGEM_TIMEOUT', 5 * 60),
+        )
+
+
+class FiltroAutocompletar(admin.RelatedFieldListFilter):
+    """
+    Filtro por chave estrangeira que não carrega a tabela relacionada inteira
+    na barra lateral: mostra só "Todos" e o item escolhido, e os demais são
+    buscados pelo autocompletar do admin conforme o usuário digita.
+    """
+    template = 'admin/biblioteca/filtro_autocompletar.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.url_autocompletar = reverse('admin:autocomplete') + '?' + urlencode({
+            'app_label': model._meta.app_label,
+            'model_name': model._meta.model_name,
+            'field_name': field.name,
+        })
+
+    def field_choices(self, field, request, model_admin):
+        # Uma consulta pelo(s) item(ns) escolhido(s), nenhuma sem filtro ativo
+        if not self.lookup_val:
+            return []
+        try:
+            escolhidos = field.remote_field.model._default_manager.filter(pk__in=self.lookup_val)
+            return [(obj.pk, str(obj)) for obj in escolhidos]
+        except (ValueError, ValidationError):
+            return []  # parâmetro inválido: o ChangeList responde com o erro
+
+    def has_output(self):
+        return True
+
+
+class ListagemRapidaAdminMixin:
+    """
+    Changelist sem as contagens caras: o total vem do PaginadorEstimado e o
+    "N de M resultados" (segundo COUNT(*) da tabela inteira) não é calculado.
+    """
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    # A ordem padrão da changelist, explícita também para o autocompletar
+    # (que pagina o resultado) e sempre pela chave primária, sem ordenar em memória
+    ordering = ('-id',)
+
+    class Media:
+        js = ('biblioteca/filtro_autocompletar.js',)
+
+
 # 1. Personalização do Autor
 @admin.register(Autor)
-class AutorAdmin(admin.ModelAdmin):
+class AutorAdmin(ListagemRapidaAdminMixin, ImportacaoCSVAdminMixin, admin.ModelAdmin):
     list_display = ('nome', 'nacionalidade')
     search_fields = ('nome',)
+    tipo_importacao = 'autores'
 
 
 # 2. Personalização do Livro
 @admin.register(Livro)
-class LivroAdmin(admin.ModelAdmin):
-    list_display = ('titulo', 'autor', 'editora', 'ano', 'quantidade_disponivel', 'quantidade_total')
-    list_filter = ('ano', 'autor', 'editora')
+class LivroAdmin(ListagemRapidaAdminMixin, ImportacaoCSVAdminMixin, admin.ModelAdmin):
+    list_display = ('titulo', 'autor', 'editora', 'ano', 'quantidade_disponivel', 'quantidade_total',
+                    'emprestimos_ativos', 'vezes_emprestado')
+    list_select_related = ('autor',)
+    list_filter = ('ano', ('autor', FiltroAutocompletar), 'editora')
+    autocomplete_fields = ('autor',)
     search_fields = ('titulo', 'autor__nome')
-    list_editable = ('quantidade_disponivel',)
+    # O estoque disponível não é mais editável na lista: ele acompanha os empréstimos
+    # (serviços) e é corrigido pelo comando reconciliar_contadores
+    readonly_fields = ('emprestimos_ativos', 'vezes_emprestado')
+    tipo_importacao = 'livros'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Usa o índice de busca textual em vez de LIKE '%termo%' em titulo/autor__nome
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(filtro_busca(search_term)), False
 
 
 # 3. Personalização do Membro
 @admin.register(Membro)
-class MembroAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'contato', 'tipo')
+class MembroAdmin(ListagemRapidaAdminMixin, ImportacaoCSVAdminMixin, admin.ModelAdmin):
+    list_display = ('nome', 'contato', 'tipo', 'emprestimos_ativos', 'total_emprestimos')
     search_fields = ('nome', 'contato')
     list_filter = ('tipo',)
+    readonly_fields = ('emprestimos_ativos', 'total_emprestimos')
+    tipo_importacao = 'membros'
 
 
 # 4. Personalização do Empréstimo
 @admin.register(Emprestimo)
-class EmprestimoAdmin(admin.ModelAdmin):
+class EmprestimoAdmin(ListagemRapidaAdminMixin, admin.ModelAdmin):
     list_display = ('livro', 'membro', 'data_saida', 'data_prevista', 'data_devolucao', 'status')
-    list_filter = ('status', 'data_saida', 'data_prevista')
+    # Só as duas tabelas exibidas (sem o JOIN em autor que o select_related() genérico faria)
+    list_select_related = ('livro', 'membro')
+    list_filter = (
+        'status', 'data_saida', 'data_prevista',
+        ('livro', FiltroAutocompletar), ('membro', FiltroAutocompletar),
+    )
+    # Formulário com autocompletar em vez de um <select> com todos os livros e membros
+    autocomplete_fields = ('livro', 'membro')
     search_fields = ('livro__titulo', 'membro__nome')
     ordering = ('-data_saida',)
     
@@ -43,19 +184,63 @@ class EmprestimoAdmin(admin.ModelAdmin):
     # Action personalizada: Marcar como Devolvido
     @admin.action(description='Marcar itens selecionados como Devolvidos')
     def marcar_como_devolvido(self, request, queryset):
-        livros_devolvidos = 0
-        for emprestimo in queryset:
-            if emprestimo.status != "Devolvido":
-                # Esta linha assume que existe um método salvar_devolucao() no seu modelo Emprestimo
-                # Se não existir, o código falhará em tempo de execução
-                try:
-                    emprestimo.salvar_devolucao()
-                    livros_devolvidos += 1
-                except AttributeError:
-                    self.message_user(request, "Erro: O método salvar_devolucao() não existe no modelo Emprestimo.", level='error')
-                    return
+        from .services import devolver_em_lote
+
+        # Devolução em lote: poucas consultas, independente de quantos itens foram selecionados
+        livros_devolvidos = devolver_em_lote(queryset)
 
         if livros_devolvidos > 0:
             self.message_user(request, f'{livros_devolvidos} empréstimo(s) foram marcados como Devolvidos e o estoque atualizado.', level='success')
         else:
-            self.message_user(request, 'Nenhum empréstimo ativo foi selecionado ou os itens já estavam devolvidos.', level='warning')
\ No newline at end of file
+            self.message_user(request, 'Nenhum empréstimo ativo foi selecionado ou os itens já estavam devolvidos.', level='warning')
+
+
+# 5. Personalização da Reserva
+@admin.register(Reserva)
+class ReservaAdmin(ListagemRapidaAdminMixin, admin.ModelAdmin):
+    list_display = ('livro', 'membro', 'criada_em', 'status', 'separada_ate', 'notificada')
+    list_select_related = ('livro', 'membro')
+    list_filter = ('status', ('livro', FiltroAutocompletar), ('membro', FiltroAutocompletar))
+    search_fields = ('livro__titulo', 'membro__nome')
+    # O status anda com o estoque (serviços): reservas são criadas no balcão e
+    # aqui só consultadas ou canceladas
+    readonly_fields = ('membro', 'livro', 'criada_em', 'status', 'separada_ate', 'notificada')
+    actions = ['cancelar']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Cancelar reservas selecionadas')
+    def cancelar(self, request, queryset):
+        from .services import ReservaIndisponivel, cancelar_reserva
+
+        canceladas = 0
+        for reserva in queryset.filter(status__in=["Aguardando", "Separada"]):
+            try:
+                cancelar_reserva(reserva)
+                canceladas += 1
+            except ReservaIndisponivel:
+                # Atendida ou expirada entre a listagem e o cancelamento
+                pass
+        self.message_user(request, f'{canceladas} reserva(s) cancelada(s).', level='success')
+
+
+# 6. Fila de tarefas (consulta e reexecução)
+@admin.register(Tarefa)
+class TarefaAdmin(ListagemRapidaAdminMixin, admin.ModelAdmin):
+    list_display = ('nome', 'status', 'prioridade', 'tentativas', 'criada_em', 'iniciada_em', 'concluida_em', 'trabalhador')
+    list_filter = ('status', 'nome')
+    search_fields = ('nome', 'chave')
+    readonly_fields = [campo.name for campo in Tarefa._meta.fields]
+    actions = ['reexecutar']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Reexecutar tarefas com falha selecionadas')
+    def reexecutar(self, request, queryset):
+        # Sem a chave: pode já haver outra pendente com ela (tarefa_chave_pendente_unica)
+        reexecutadas = queryset.filter(status="Falhou").update(
+            status="Pendente", tentativas=0, executar_apos=timezone.now(), concluida_em=None, chave=None,
+        )
+        self.message_user(request, f'{reexecutadas} tarefa(s) de volta à fila.', level='success')
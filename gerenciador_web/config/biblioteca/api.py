@@ -0,0 +1,179 @@
+# biblioteca/api.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import cache
+from .models import Autor, Emprestimo, Livro, Membro
+from .paginacao import CursorInvalido, apaginar_por_cursor
+
+
+# API JSON somente leitura para quiosques e o aplicativo. Cada resposta leva
+# um ETag calculado a partir das versões de cache dos grupos de que o recurso
+# depende (as mesmas invalidadas pelos serviços e signals), então responder
+# 304 a um cliente que já tem os dados não consulta o banco.
+
+class Recurso:
+    """Um modelo exposto na API: campos permitidos, ordenação do cursor e grupos de cache."""
+
+    def __init__(self, modelo, campos, ordenacao, grupos, filtros=(), restrito=False):
+        self.modelo = modelo
+        self.campos = campos
+        self.ordenacao = ordenacao
+        self.grupos = grupos
+        self.filtros = filtros
+        # Recursos com dados pessoais só para a equipe (is_staff)
+        self.restrito = restrito
+
+
+RECURSOS = {
+    'livros': Recurso(
+        Livro,
+        ('id', 'titulo', 'autor_id', 'editora', 'ano', 'quantidade_total', 'quantidade_disponivel',
+         'emprestimos_ativos', 'vezes_emprestado'),
+        ordenacao=('titulo', 'id'),
+        grupos=(cache.ACERVO, cache.ESTOQUE),
+        filtros=('autor_id', 'ano', 'editora'),
+    ),
+    'autores': Recurso(
+        Autor, ('id', 'nome', 'nacionalidade'), ordenacao=('id',), grupos=(cache.ACERVO,),
+    ),
+    'membros': Recurso(
+        Membro, ('id', 'nome', 'contato', 'tipo', 'emprestimos_ativos', 'total_emprestimos'),
+        ordenacao=('id',), grupos=(cache.MEMBROS,), filtros=('tipo',), restrito=True,
+    ),
+    'emprestimos': Recurso(
+        Emprestimo,
+        ('id', 'membro_id', 'livro_id', 'data_saida', 'data_prevista', 'data_devolucao', 'status'),
+        ordenacao=('id',), grupos=(cache.EMPRESTIMOS,), filtros=('status', 'membro_id', 'livro_id'),
+        restrito=True,
+    ),
+}
+
+# Parâmetros que não são filtros
+PARAMETROS = {'campos', 'cursor', 'limite'}
+LIMITE_MAXIMO = 500
+
+
+class ErroDaRequisicao(Exception):
+    """Parâmetro inválido: vira uma resposta 400 com a mensagem."""
+
+
+def _erro(mensagem, status):
+    return JsonResponse({'erro': mensagem}, status=status)
+
+
+def _campos(request, recurso):
+    pedidos = [campo.strip() for campo in request.GET.get('campos', '').split(',') if campo.strip()]
+    desconhecidos = set(pedidos) - set(recurso.campos)
+    if desconhecidos:
+        raise ErroDaRequisicao(f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}.")
+    return pedidos or list(recurso.campos)
+
+
+def _filtros(request, recurso):
+    desconhecidos = set(request.GET) - PARAMETROS - set(recurso.filtros)
+    if desconhecidos:
+        raise ErroDaRequisicao(f"Filtros desconhecidos: {', '.join(sorted(desconhecidos))}.")
+    return {campo: request.GET[campo] for campo in recurso.filtros if campo in request.GET}
+
+
+def _limite(request):
+    padrao = getattr(settings, 'BIBLIOTECA_API_POR_PAGINA', 100)
+    try:
+        limite = int(request.GET.get('limite', padrao))
+    except ValueError:
+        raise ErroDaRequisicao("limite deve ser um número.")
+    return min(max(limite, 1), LIMITE_MAXIMO)
+
+
+def _serializar(obj, campos):
+    return {campo: getattr(obj, campo) for campo in campos}
+
+
+async def _responder(request, recurso, consultar):
+    """
+    Fluxo comum da lista e do detalhe: permissão, GET condicional pelas
+    versões do cache e, só se preciso, a consulta (`consultar(campos)`).
+    """
+    if recurso.restrito and not (await request.auser()).is_staff:
+        return _erro("Acesso restrito à equipe da biblioteca.", 403)
+
+    # As versões são lidas antes do banco: se os dados mudarem durante a
+    # consulta, o ETag fica velho e o cliente só busca de novo na próxima vez
+    versoes, modificado = cache.estado(*recurso.grupos)
+    digest = hashlib.sha1(repr((request.get_full_path(), versoes)).encode()).hexdigest()
+    etag = f'"{digest}"'
+    # O ETag é exato; o Last-Modified tem resolução de 1 segundo (vale o ETag
+    # quando o cliente manda os dois, como pede o HTTP)
+
+    if get_conditional_response(request, etag=etag, last_modified=modificado) is not None:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            campos = _campos(request, recurso)
+            dados = await consultar(campos)
+        except ErroDaRequisicao as exc:
+            return _erro(str(exc), 400)
+        if dados is None:
+            return _erro("Registro não encontrado.", 404)
+        response = JsonResponse(dados)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modificado)
+    # O cliente pode guardar a resposta, mas sempre revalida (e recebe 304 se nada mudou)
+    if recurso.restrito:
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_safe
+async def lista(request, nome):
+    """Lista paginada por cursor: ?campos=id,titulo&limite=50&cursor=...&<filtro>=valor."""
+    recurso = RECURSOS.get(nome)
+    if recurso is None:
+        return _erro("Recurso desconhecido.", 404)
+
+    async def consultar(campos):
+        limite = _limite(request)
+        filtros = _filtros(request, recurso)
+        try:
+            # Só as colunas pedidas (mais as da ordenação, que o cursor usa) saem do banco
+            queryset = recurso.modelo.objects.filter(**filtros).only(
+                *dict.fromkeys([*campos, *recurso.ordenacao])
+            )
+            pagina = await apaginar_por_cursor(queryset, recurso.ordenacao, request.GET.get('cursor'), limite)
+        except CursorInvalido:
+            raise ErroDaRequisicao("Cursor inválido.")
+        except (ValueError, ValidationError):
+            raise ErroDaRequisicao("Valor de filtro inválido.")
+        return {
+            'resultados': [_serializar(obj, campos) for obj in pagina],
+            'proximo_cursor': pagina.proximo_cursor,
+            'cursor_anterior': pagina.cursor_anterior,
+        }
+
+    return await _responder(request, recurso, consultar)
+
+
+@require_safe
+async def detalhe(request, nome, pk):
+    """Um registro: /api/livros/42/?campos=titulo,quantidade_disponivel."""
+    recurso = RECURSOS.get(nome)
+    if recurso is None:
+        return _erro("Recurso desconhecido.", 404)
+
+    async def consultar(campos):
+        obj = await recurso.modelo.objects.only(*campos).filter(pk=pk).afirst()
+        return None if obj is None else _serializar(obj, campos)
+
+    return await _responder(request, recurso, consultar)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BibliotecaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'biblioteca'
+
+    def ready(self):
+        # Registra os receivers que invalidam o cache do acervo
+        from . import signals  # noqa: F401
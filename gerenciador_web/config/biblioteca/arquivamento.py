@@ -0,0 +1,61 @@
+# biblioteca/arquivamento.py
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import cache
+from .models import Emprestimo, EmprestimoArquivado
+
+
+# Empréstimos movidos por transação: cada lote é curto e não segura a escrita
+# do SQLite enquanto o balcão registra empréstimos
+LOTE_ARQUIVAMENTO = 2000
+
+# Colunas copiadas para o arquivo (o status não vai: lá é sempre "Devolvido")
+COLUNAS = ('id', 'membro_id', 'livro_id', 'data_saida', 'data_prevista', 'data_devolucao')
+
+
+def data_de_corte(hoje=None):
+    """Devoluções anteriores a esta data podem ir para o arquivo."""
+    dias = getattr(settings, 'BIBLIOTECA_ARQUIVAR_APOS_DIAS', 365)
+    return (hoje or date.today()) - timedelta(days=dias)
+
+
+def _mover(ids):
+    """Copia os empréstimos para o arquivo e os apaga da tabela em uso (INSERT ... SELECT + DELETE)."""
+    origem = Emprestimo.objects.filter(pk__in=ids).values_list(*COLUNAS)
+    sql, params = origem.query.sql_with_params()
+    quote = connection.ops.quote_name
+    destino = quote(EmprestimoArquivado._meta.db_table)
+    colunas = ', '.join(quote(coluna) for coluna in COLUNAS)
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {destino} ({colunas}) {sql}', params)
+        # DELETE direto: Emprestimo tem signals, e o delete() do ORM buscaria
+        # as linhas para disparar um post_delete por empréstimo
+        cursor.execute(
+            f'DELETE FROM {quote(Emprestimo._meta.db_table)} WHERE {quote("id")} IN ({marcadores})', ids
+        )
+
+
+def arquivar_emprestimos(antes_de=None, lote=LOTE_ARQUIVAMENTO):
+    """
+    Move para EmprestimoArquivado, em lotes de `lote`, os empréstimos
+    devolvidos antes de `antes_de` (padrão: data_de_corte()). Cada lote é uma
+    transação; interromper no meio deixa tudo consistente e a próxima
+    execução continua de onde parou. Retorna quantos foram arquivados.
+    """
+    antes_de = antes_de or data_de_corte()
+    candidatos = Emprestimo.objects.filter(status="Devolvido", data_devolucao__lt=antes_de)
+    arquivados = 0
+    while True:
+        with transaction.atomic():
+            ids = list(candidatos.order_by('pk').values_list('pk', flat=True)[:lote])
+            if not ids:
+                break
+            _mover(ids)
+            cache.invalidar_apos_commit(cache.EMPRESTIMOS)
+        arquivados += len(ids)
+    return arquivados
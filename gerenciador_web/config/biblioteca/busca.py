@@ -0,0 +1,101 @@
+# biblioteca/busca.py
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Livro
+
+
+# Tabela virtual FTS5 criada pela migração 0005 e mantida por triggers no banco
+# (cobre também bulk_create e update(), que não disparam signals do Django).
+TABELA_BUSCA = 'biblioteca_livro_busca'
+
+# Pesos do bm25 por coluna: titulo, autor, editora, ano
+PESOS = (10.0, 5.0, 1.0, 1.0)
+
+
+def indice_disponivel():
+    """O índice FTS5 só existe no SQLite; em outros bancos a busca usa LIKE."""
+    return connection.vendor == 'sqlite'
+
+
+def expressao_fts(termo):
+    """
+    Converte o texto digitado em uma expressão FTS5 segura: cada palavra vira
+    um prefixo entre aspas ("mach"*) e todas precisam aparecer.
+    """
+    return ' '.join(f'"{palavra}"*' for palavra in re.findall(r'\w+', termo))
+
+
+def filtro_busca(termo):
+    """Q() para restringir um queryset de Livro ao resultado da busca (sem ranking; termo sem palavras não acha nada)."""
+    if indice_disponivel():
+        expressao = expressao_fts(termo)
+        if not expressao:
+            # Só pontuação (ex: "!!"): MATCH '' é erro de sintaxe no FTS5
+            return Q(pk__in=[])
+        return Q(pk__in=RawSQL(
+            f'SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s', [expressao]
+        ))
+    filtro = Q()
+    for palavra in termo.split():
+        filtro &= (
+            Q(titulo__icontains=palavra) | Q(autor__nome__icontains=palavra)
+            | Q(editora__icontains=palavra) | Q(ano__icontains=palavra)
+        )
+    return filtro
+
+
+class ResultadoBusca:
+    """Uma página de resultados da busca, já na ordem de relevância."""
+
+    def __init__(self, termo, livros, pagina, tem_proxima):
+        self.termo = termo
+        self.livros = livros
+        self.pagina = pagina
+        self.tem_proxima = tem_proxima
+
+    def __iter__(self):
+        return iter(self.livros)
+
+    def __len__(self):
+        return len(self.livros)
+
+    @property
+    def tem_anterior(self):
+        return self.pagina > 1
+
+
+def buscar_livros(termo, pagina=1, tamanho=20):
+    """
+    Busca no acervo por título, autor, editora e ano, ignorando acentos e
+    maiúsculas, ordenada por relevância (bm25). Faz duas consultas: os IDs
+    da página no índice e os livros (com autor) por chave primária.
+    """
+    expressao = expressao_fts(termo)
+    if not expressao:
+        return ResultadoBusca(termo, [], 1, False)
+
+    inicio = (pagina - 1) * tamanho
+    if indice_disponivel():
+        pesos = ', '.join(str(peso) for peso in PESOS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s '
+                f'ORDER BY bm25({TABELA_BUSCA}, {pesos}) LIMIT %s OFFSET %s',
+                [expressao, tamanho + 1, inicio],
+            )
+            ids = [linha[0] for linha in cursor.fetchall()]
+    else:
+        ids = list(
+            Livro.objects.filter(filtro_busca(termo)).order_by('titulo', 'id')
+            .values_list('pk', flat=True)[inicio:inicio + tamanho + 1]
+        )
+
+    tem_proxima = len(ids) > tamanho
+    ids = ids[:tamanho]
+    por_id = Livro.objects.select_related('autor').in_bulk(ids)
+    return ResultadoBusca(termo, [por_id[pk] for pk in ids if pk in por_id], pagina, tem_proxima)
@@ -0,0 +1,221 @@
+# biblioteca/cache.py
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import transaction
+
+from .models import Livro
+
+
+# Invalidação por versão: em vez de apagar chaves (não dá para listar todas as
+# páginas em cache), cada grupo tem um contador de versão que entra no nome das
+# chaves. Incrementar o contador torna todas as chaves antigas inalcançáveis.
+# O valor inicial vem do relógio: se o backend descartar a chave de versão, a
+# nova nunca coincide com uma versão antiga cujas chaves ainda estejam no cache.
+# O cache é compartilhado entre processos (settings.CACHES): uma baixa feita
+# por um comando do cron invalida as páginas do site. O incr() do
+# FileBasedCache não é atômico (get + set), e duas invalidações simultâneas
+# podem gravar o mesmo número; mas as duas rodam depois dos seus COMMITs,
+# então quem lê a versão nova já lê o banco com as duas alterações.
+
+PREFIXO = 'biblioteca'
+ACERVO = 'acervo'  # dados de catálogo: título, autor, editora, ano, total
+ESTOQUE = 'estoque'  # qualquer baixa/devolução (disponibilidade e contadores dos livros)
+MEMBROS = 'membros'  # cadastro e contadores dos membros
+EMPRESTIMOS = 'emprestimos'
+
+# Grupos que também guardam a hora da última alteração (Last-Modified da API)
+GRUPOS_COM_DATA = {ACERVO, ESTOQUE, MEMBROS, EMPRESTIMOS}
+
+
+def _timeout():
+    return getattr(settings, 'BIBLIOTECA_CACHE_TIMEOUT', 60 * 60)
+
+
+def _chave_versao(grupo):
+    return f'{PREFIXO}:versao:{grupo}'
+
+
+def _chave_modificacao(grupo):
+    return f'{PREFIXO}:modificado:{grupo}'
+
+
+def _nova_versao():
+    return time.time_ns()
+
+
+def versao(grupo):
+    """Versão atual do grupo (criada na primeira leitura)."""
+    chave = _chave_versao(grupo)
+    valor = cache.get(chave)
+    if valor is None:
+        cache.add(chave, _nova_versao(), timeout=None)
+        valor = cache.get(chave)
+    return valor
+
+
+def invalidar(*grupos):
+    """Incrementa a versão dos grupos, invalidando tudo o que foi guardado com a anterior."""
+    agora = int(time.time())
+    for grupo in grupos:
+        chave = _chave_versao(grupo)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            # Chave ainda não existia (ou foi descartada): uma versão nova basta
+            cache.set(chave, _nova_versao(), timeout=None)
+        if grupo in GRUPOS_COM_DATA:
+            cache.set(_chave_modificacao(grupo), agora, timeout=None)
+
+
+def invalidar_apos_commit(*grupos):
+    """
+    Invalida só depois do COMMIT: um leitor que consulte o banco antes disso
+    grava o valor antigo sob a versão antiga, que ninguém mais vai ler.
+    """
+    transaction.on_commit(lambda: invalidar(*grupos))
+
+
+def estado(*grupos):
+    """
+    Situação dos grupos sem consultar o banco: (versões, hora da última
+    alteração em segundos). Enquanto nenhuma alteração foi registrada vale a
+    hora da primeira leitura, que nunca é anterior à alteração real.
+    """
+    versoes = tuple(versao(grupo) for grupo in grupos)
+    agora = int(time.time())
+    datas = []
+    for grupo in grupos:
+        chave = _chave_modificacao(grupo)
+        cache.add(chave, agora, timeout=None)
+        datas.append(cache.get(chave, agora))
+    return versoes, max(datas)
+
+
+# --- Disponibilidade por livro ---
+
+def _grupo_livro(livro_id):
+    return f'livro:{livro_id}'
+
+
+def invalidar_disponibilidade(livro_ids):
+    """Chamado pelos caminhos de empréstimo/devolução depois de alterar o estoque."""
+    invalidar_apos_commit(ESTOQUE, *[_grupo_livro(pk) for pk in livro_ids])
+
+
+def _disponibilidade_em_cache(livro_ids):
+    """Parte da leitura que não toca o banco: (encontrados, faltando, chaves de versão e de valor)."""
+    chaves_versao = {pk: _chave_versao(_grupo_livro(pk)) for pk in livro_ids}
+    versoes = cache.get_many(chaves_versao.values())
+
+    chaves_valor = {
+        pk: f'{PREFIXO}:disponivel:{pk}:{versoes[chave]}'
+        for pk, chave in chaves_versao.items() if chave in versoes
+    }
+    em_cache = cache.get_many(chaves_valor.values())
+    resultado = {pk: em_cache[chave] for pk, chave in chaves_valor.items() if chave in em_cache}
+    faltando = [pk for pk in livro_ids if pk not in resultado]
+    return resultado, faltando, chaves_versao, chaves_valor
+
+
+def _guardar_disponibilidade(novos, chaves_versao, chaves_valor):
+    guardar = {chaves_valor[pk]: valor for pk, valor in novos.items() if pk in chaves_valor}
+    for pk, valor in novos.items():
+        if pk in chaves_valor:
+            continue
+        # Versão criada depois da consulta: só vale se ninguém invalidou antes
+        # (nesse caso o add falha, porque a invalidação já criou a chave).
+        nova = _nova_versao()
+        if cache.add(chaves_versao[pk], nova, timeout=None):
+            guardar[f'{PREFIXO}:disponivel:{pk}:{nova}'] = valor
+    cache.set_many(guardar, timeout=_timeout())
+
+
+def disponibilidade(livro_ids):
+    """
+    Quantidade disponível de cada livro ({id: quantidade}), lida do cache.
+    As versões são lidas ANTES do banco, então um valor gravado aqui nunca
+    sobrevive a uma baixa/devolução concluída depois da leitura.
+    """
+    resultado, faltando, chaves_versao, chaves_valor = _disponibilidade_em_cache(list(livro_ids))
+    if faltando:
+        novos = dict(Livro.objects.filter(pk__in=faltando).values_list('pk', 'quantidade_disponivel'))
+        resultado.update(novos)
+        _guardar_disponibilidade(novos, chaves_versao, chaves_valor)
+    return resultado
+
+
+# As versões assíncronas só trocam o acesso ao banco pelo ORM assíncrono. O
+# cache é chamado direto: com FileBasedCache é a leitura de arquivos pequenos
+# e locais, e os métodos a* do cache passariam cada chamada pelo pool de threads.
+
+async def adisponibilidade(livro_ids):
+    """Versão assíncrona de disponibilidade()."""
+    resultado, faltando, chaves_versao, chaves_valor = _disponibilidade_em_cache(list(livro_ids))
+    if faltando:
+        novos = {
+            pk: quantidade async for pk, quantidade in
+            Livro.objects.filter(pk__in=faltando).values_list('pk', 'quantidade_disponivel')
+        }
+        resultado.update(novos)
+        _guardar_disponibilidade(novos, chaves_versao, chaves_valor)
+    return resultado
+
+
+# --- Páginas do acervo ---
+
+def _chave_pagina(cursor, tamanho):
+    return f'{PREFIXO}:acervo:{versao(ACERVO)}:{tamanho}:{cursor or ""}'
+
+
+def pagina_do_acervo(cursor, tamanho, carregar):
+    """
+    Página da listagem (livros com autor e cursores) guardada sob a versão do
+    acervo. `carregar()` consulta o banco quando não há cópia em cache.
+    Retorna (pagina, veio_do_cache).
+    """
+    chave = _chave_pagina(cursor, tamanho)
+    pagina = cache.get(chave)
+    if pagina is not None:
+        return pagina, True
+    pagina = carregar()
+    cache.set(chave, pagina, timeout=_timeout())
+    return pagina, False
+
+
+async def apagina_do_acervo(cursor, tamanho, carregar):
+    """Versão assíncrona de pagina_do_acervo(); `carregar` é uma função async."""
+    chave = _chave_pagina(cursor, tamanho)
+    pagina = cache.get(chave)
+    if pagina is not None:
+        return pagina, True
+    pagina = await carregar()
+    cache.set(chave, pagina, timeout=_timeout())
+    return pagina, False
+
+
+# --- Contagens do admin ---
+
+def contagem_aproximada(queryset, limiar, validade):
+    """
+    COUNT(*) do queryset, reaproveitado por `validade` segundos quando passa
+    de `limiar` linhas: numa tabela grande a contagem exata custa uma
+    varredura a cada página, e um total alguns minutos atrasado não muda a
+    navegação. Contagens pequenas (baratas) são sempre exatas.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        # Filtro que não pode achar nada (ex: pk__in=[]): nem vai ao banco
+        return 0
+    chave = f'{PREFIXO}:contagem:{hashlib.sha1(repr((sql, params)).encode()).hexdigest()}'
+    total = cache.get(chave)
+    if total is None:
+        total = queryset.count()
+        if total >= limiar:
+            cache.set(chave, total, timeout=validade)
+    return total
@@ -0,0 +1,137 @@
+# biblioteca/dados_sinteticos.py
+
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import cache, estatisticas
+from .models import Autor, Emprestimo, Livro, Membro
+
+
+# Vocabulário para títulos, nomes e editoras com acentuação real do português
+PALAVRAS = (
+    "memórias póstumas coração sertão história amor cidade noite mar vento "
+    "caminho jardim estrela sombra canção infância guerra ilha fogo pedra "
+    "viagem segredo tempo rio montanha saudade luz silêncio casa sonho"
+).split()
+NOMES = "José Maria Ana João Cecília Érico Jorge Clarice Graciliano Raquel Lygia Manuel".split()
+SOBRENOMES = "Assis Amado Lispector Ramos Queiroz Veríssimo Meireles Bandeira Telles Rosa".split()
+EDITORAS = "Record Rocco Companhia Garnier Globo Ática Saraiva Nova Fronteira".split()
+NACIONALIDADES = ["Brasileira", "Portuguesa", "Angolana", "Moçambicana"]
+TIPOS_MEMBRO = ["Estudante", "Professor", "Comum", "Funcionário"]
+
+# Empréstimos com saída nos últimos dias ficam ativos; os demais já foram devolvidos
+DIAS_ATIVOS = 21
+LOTE = 50_000
+
+
+def _proximo_id(modelo):
+    return (modelo.objects.aggregate(maior=Max('pk'))['maior'] or 0) + 1
+
+
+def _inserir(tabela, colunas, linhas):
+    """INSERT em lote direto no banco (sem instanciar modelos nem disparar signals)."""
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        tabela, ', '.join(colunas), ', '.join(['%s'] * len(colunas))
+    )
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(linhas), LOTE):
+            cursor.executemany(sql, linhas[inicio:inicio + LOTE])
+
+
+def gerar(autores=1_000, livros=10_000, membros=5_000, anos=1, emprestimos_por_dia=100,
+          semente=42, hoje=None):
+    """
+    Acrescenta ao banco um conjunto sintético e coerente: livros com estoque,
+    membros e `anos` de histórico de empréstimos (ativos recentes e devolvidos,
+    alguns com atraso). O estoque disponível de cada livro desconta os ativos.
+    Retorna a contagem de registros criados por tabela.
+    """
+    aleatorio = random.Random(semente)
+    hoje = hoje or date.today()
+
+    with transaction.atomic():
+        primeiro_autor = _proximo_id(Autor)
+        _inserir(Autor._meta.db_table, ['id', 'nome', 'nacionalidade'], [
+            (primeiro_autor + i, f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {primeiro_autor + i}",
+             aleatorio.choice(NACIONALIDADES))
+            for i in range(autores)
+        ])
+
+        primeiro_livro = _proximo_id(Livro)
+        totais = {primeiro_livro + i: aleatorio.randint(1, 5) for i in range(livros)}
+
+        primeiro_membro = _proximo_id(Membro)
+
+        # Contadores de circulação, gravados junto com livros e membros
+        ativos, vezes = Counter(), Counter()
+        ativos_do_membro, total_do_membro = Counter(), Counter()
+        linhas_emprestimo = []
+        if livros and membros:
+            for dia in range(anos * 365, -1, -1):
+                saida = hoje - timedelta(days=dia)
+                for _ in range(emprestimos_por_dia):
+                    livro_id = aleatorio.randrange(primeiro_livro, primeiro_livro + livros)
+                    membro_id = aleatorio.randrange(primeiro_membro, primeiro_membro + membros)
+                    prevista = saida + timedelta(days=7)
+                    vezes[livro_id] += 1
+                    total_do_membro[membro_id] += 1
+                    if dia <= DIAS_ATIVOS and ativos[livro_id] < totais[livro_id]:
+                        ativos[livro_id] += 1
+                        ativos_do_membro[membro_id] += 1
+                        devolucao, status = None, "Ativo"
+                    else:
+                        devolucao = min(saida + timedelta(days=aleatorio.randint(1, 14)), hoje).isoformat()
+                        status = "Devolvido"
+                    linhas_emprestimo.append(
+                        (membro_id, livro_id, saida.isoformat(), prevista.isoformat(), devolucao, status)
+                    )
+
+        _inserir(Membro._meta.db_table, ['id', 'nome', 'contato', 'tipo', 'emprestimos_ativos', 'total_emprestimos'], [
+            (pk, f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}",
+             f"membro{pk}@exemplo.com", aleatorio.choice(TIPOS_MEMBRO), ativos_do_membro[pk], total_do_membro[pk])
+            for pk in range(primeiro_membro, primeiro_membro + membros)
+        ])
+        _inserir(Livro._meta.db_table,
+                 ['id', 'titulo', 'autor_id', 'editora', 'ano', 'quantidade_total', 'quantidade_disponivel',
+                  'emprestimos_ativos', 'vezes_emprestado'], [
+            (pk, ' '.join(aleatorio.sample(PALAVRAS, 3)).capitalize(),
+             aleatorio.randrange(primeiro_autor, primeiro_autor + autores) if autores else None,
+             aleatorio.choice(EDITORAS), aleatorio.randint(1850, hoje.year), total, total - ativos[pk],
+             ativos[pk], vezes[pk])
+            for pk, total in totais.items()
+        ])
+        _inserir(Emprestimo._meta.db_table,
+                 ['membro_id', 'livro_id', 'data_saida', 'data_prevista', 'data_devolucao', 'status'],
+                 linhas_emprestimo)
+
+        # Os resumos do painel são refeitos a partir do histórico gerado
+        estatisticas.recalcular()
+
+    # Os INSERTs diretos não passam pelos signals que invalidam o cache
+    cache.invalidar(cache.ACERVO, cache.ESTOQUE, cache.MEMBROS, cache.EMPRESTIMOS)
+    return {
+        'autores': autores,
+        'livros': livros,
+        'membros': membros,
+        'emprestimos': len(linhas_emprestimo),
+        'emprestimos_ativos': sum(ativos.values()),
+    }
+
+
+@contextmanager
+def banco_descartavel():
+    """
+    Troca a conexão padrão por um banco de teste novo (migrado) durante o bloco
+    e o destrói no final. Usado pelos benchmarks para não tocar nos dados reais.
+    """
+    nome_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
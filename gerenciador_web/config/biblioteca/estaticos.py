@@ -0,0 +1,142 @@
+# biblioteca/estaticos.py
+
+import gzip
+import mimetypes
+import os
+from dataclasses import dataclass, field
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, só as versões .gz
+    brotli = None
+
+
+# Arquivos estáticos de produção (BIBLIOTECA_ESTATICOS=producao):
+# - no build, o collectstatic grava cada arquivo com o hash do conteúdo no
+#   nome (base.3f2a1c9e.css) e, para os de texto, as versões .gz/.br;
+# - em execução, o EstaticosMiddleware serve o STATIC_ROOT: nomes com hash
+#   vão com cache de um ano (mudou o conteúdo, muda o nome), a versão
+#   comprimida é escolhida pelo Accept-Encoding e o ETag responde 304.
+
+# Extensões que valem a pena comprimir (imagens e fontes já vêm comprimidas)
+COMPRIMIVEIS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.csv')
+# Abaixo disto a economia não paga o custo da descompressão
+TAMANHO_MINIMO = 256
+# Em ordem de preferência: (Content-Encoding, sufixo do arquivo)
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Nomes sem hash (ex: links antigos) podem mudar: revalidam pelo ETag
+CACHE_REVALIDAR = 'public, max-age=0, must-revalidate'
+
+
+def comprimir(caminho):
+    """
+    Grava ao lado do arquivo as versões .gz (e .br, com o pacote brotli)
+    que ficarem menores que o original. Retorna os sufixos gravados.
+    """
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    if len(dados) < TAMANHO_MINIMO:
+        return []
+    versoes = {'.gz': gzip.compress(dados, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        versoes['.br'] = brotli.compress(dados, quality=11)
+
+    gravados = []
+    for sufixo, comprimido in versoes.items():
+        if len(comprimido) < len(dados):
+            with open(caminho + sufixo, 'wb') as arquivo:
+                arquivo.write(comprimido)
+            gravados.append(sufixo)
+    return gravados
+
+
+class ArmazenamentoComprimido(ManifestStaticFilesStorage):
+    """
+    Storage do collectstatic: o do Manifest (nomes com hash e o
+    staticfiles.json que o {% static %} consulta) mais a compressão de
+    cada arquivo de texto, feita uma vez no build e não por requisição.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Os originais continuam no STATIC_ROOT ao lado das cópias com hash
+        for nome in sorted(set(paths) | set(self.hashed_files.values())):
+            if nome.endswith(COMPRIMIVEIS):
+                comprimir(self.path(nome))
+
+
+@dataclass
+class Estatico:
+    """Um arquivo do STATIC_ROOT pronto para servir: cabeçalhos já calculados e versões comprimidas."""
+    caminho: str
+    tipo: str
+    tamanho: int
+    etag: str
+    modificado: str
+    cache_control: str
+    # Content-Encoding -> (caminho, tamanho, ETag)
+    comprimidos: dict = field(default_factory=dict)
+
+
+def indexar(raiz, imutaveis=()):
+    """
+    Percorre o STATIC_ROOT uma vez (na subida do processo): caminho relativo
+    à STATIC_URL -> Estatico. Só o que está no índice é servido, então nada
+    fora do diretório é alcançável por '..' na URL. `imutaveis` são os nomes
+    com hash do manifest.
+    """
+    imutaveis = set(imutaveis)
+    sufixos = tuple(sufixo for _, sufixo in CODIFICACOES)
+    indice = {}
+    for pasta, _, arquivos in os.walk(raiz):
+        for nome_arquivo in arquivos:
+            if nome_arquivo.endswith(sufixos) or nome_arquivo == 'staticfiles.json':
+                continue
+            caminho = os.path.join(pasta, nome_arquivo)
+            nome = os.path.relpath(caminho, raiz).replace(os.sep, '/')
+            info = os.stat(caminho)
+            base = f'{int(info.st_mtime):x}-{info.st_size:x}'
+            tipo, _ = mimetypes.guess_type(nome_arquivo)
+            if tipo and (tipo.startswith('text/') or tipo in ('application/javascript', 'image/svg+xml')):
+                tipo += '; charset=utf-8'
+            estatico = Estatico(
+                caminho=caminho,
+                tipo=tipo or 'application/octet-stream',
+                tamanho=info.st_size,
+                etag=f'"{base}"',
+                modificado=http_date(info.st_mtime),
+                cache_control=CACHE_IMUTAVEL if nome in imutaveis else CACHE_REVALIDAR,
+            )
+            for codificacao, sufixo in CODIFICACOES:
+                if os.path.exists(caminho + sufixo):
+                    # Conteúdo diferente, ETag diferente (o do gzip não vale para o br)
+                    estatico.comprimidos[codificacao] = (
+                        caminho + sufixo, os.path.getsize(caminho + sufixo), f'"{base}-{codificacao}"',
+                    )
+            indice[nome] = estatico
+    return indice
+
+
+def aceitas(accept_encoding):
+    """Codificações aceitas no cabeçalho Accept-Encoding (as com q=0 ficam de fora)."""
+    resultado = set()
+    for item in accept_encoding.split(','):
+        nome, _, parametros = item.strip().partition(';')
+        if not nome:
+            continue
+        qualidade = parametros.strip()
+        if qualidade.startswith('q='):
+            try:
+                if float(qualidade[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        resultado.add(nome.strip().lower())
+    return resultado
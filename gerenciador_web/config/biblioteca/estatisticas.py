@@ -0,0 +1,223 @@
+# biblioteca/estatisticas.py
+
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+
+from .models import (
+    CirculacaoDiaria, Emprestimo, EmprestimosDoLivroNoDia, EstoquePorEditora, HistoricoEmprestimo, Livro,
+)
+
+
+# Linhas por INSERT (limita a quantidade de parâmetros de cada instrução)
+LOTE_ESTATISTICAS = 500
+
+
+# --- Atualização incremental (chamada pelos serviços, dentro da transação) ---
+
+def _insert_acumulando(modelo, chaves, colunas, substituir=()):
+    """
+    Partes do INSERT ... ON CONFLICT DO UPDATE que cria a linha do resumo ou
+    soma os valores aos que já existem (as colunas em `substituir` são
+    sobrescritas): (início do INSERT, cláusula ON CONFLICT, campos).
+    """
+    quote = connection.ops.quote_name
+    tabela = quote(modelo._meta.db_table)
+    campos = [modelo._meta.get_field(nome) for nome in (*chaves, *colunas)]
+    conflito = ', '.join(quote(modelo._meta.get_field(nome).column) for nome in chaves)
+    atualizar = ', '.join(
+        f'{quote(nome)} = excluded.{quote(nome)}' if nome in substituir
+        else f'{quote(nome)} = {tabela}.{quote(nome)} + excluded.{quote(nome)}'
+        for nome in colunas
+    )
+    return (
+        f'INSERT INTO {tabela} ({", ".join(quote(campo.column) for campo in campos)})',
+        f'ON CONFLICT ({conflito}) DO UPDATE SET {atualizar}',
+        campos,
+    )
+
+
+def _acumular(modelo, chaves, colunas, linhas, substituir=()):
+    """
+    Soma as linhas [(chaves..., valores...)] ao resumo: uma instrução por
+    lote, sem ler o resumo antes; o UPDATE é atômico no banco, como os
+    contadores de estoque.
+    """
+    inicio, conflito, campos = _insert_acumulando(modelo, chaves, colunas, substituir)
+    marcadores = '(' + ', '.join(['%s'] * len(campos)) + ')'
+    linhas = list(linhas)
+    with connection.cursor() as cursor:
+        for posicao in range(0, len(linhas), LOTE_ESTATISTICAS):
+            lote = linhas[posicao:posicao + LOTE_ESTATISTICAS]
+            params = [
+                campo.get_db_prep_value(valor, connection)
+                for linha in lote for campo, valor in zip(campos, linha)
+            ]
+            cursor.execute(f'{inicio} VALUES {", ".join([marcadores] * len(lote))} {conflito}', params)
+
+
+def registrar_emprestimos(eventos):
+    """Soma aos resumos os empréstimos [(dia, tipo_membro, editora, livro_id), ...]."""
+    circulacao, por_livro, por_editora = Counter(), Counter(), Counter()
+    for dia, tipo_membro, editora, livro_id in eventos:
+        circulacao[dia, tipo_membro, editora] += 1
+        por_livro[dia, livro_id] += 1
+        por_editora[editora] += 1
+    if not circulacao:
+        return
+    _acumular(CirculacaoDiaria, ('dia', 'tipo_membro', 'editora'), ('emprestimos', 'devolucoes', 'devolucoes_atrasadas'),
+              [(*chave, n, 0, 0) for chave, n in circulacao.items()])
+    _acumular(EmprestimosDoLivroNoDia, ('dia', 'livro'), ('emprestimos',),
+              [(*chave, n) for chave, n in por_livro.items()])
+    _acumular(EstoquePorEditora, ('editora',), ('copias', 'emprestadas'),
+              [(editora, 0, n) for editora, n in por_editora.items()])
+
+
+def registrar_devolucoes(eventos):
+    """Soma aos resumos as devoluções [(dia, tipo_membro, editora, atrasada, quantidade), ...]."""
+    circulacao, por_editora = defaultdict(lambda: [0, 0]), Counter()
+    for dia, tipo_membro, editora, atrasada, quantidade in eventos:
+        circulacao[dia, tipo_membro, editora][0] += quantidade
+        circulacao[dia, tipo_membro, editora][1] += quantidade if atrasada else 0
+        por_editora[editora] += quantidade
+    if not circulacao:
+        return
+    _acumular(CirculacaoDiaria, ('dia', 'tipo_membro', 'editora'), ('emprestimos', 'devolucoes', 'devolucoes_atrasadas'),
+              [(*chave, 0, devolvidos, atrasados) for chave, (devolvidos, atrasados) in circulacao.items()])
+    _acumular(EstoquePorEditora, ('editora',), ('copias', 'emprestadas'),
+              [(editora, 0, -n) for editora, n in por_editora.items()])
+
+
+def atualizar_copias(editoras):
+    """
+    Recalcula as cópias no acervo das editoras (cadastro, edição ou importação
+    de livros).
+    """
+    editoras = set(editoras)
+    if not editoras:
+        return
+    totais = dict(
+        Livro.objects.filter(editora__in=editoras).order_by().values_list('editora')
+        .annotate(copias=Sum('quantidade_total'))
+    )
+    _acumular(EstoquePorEditora, ('editora',), ('copias', 'emprestadas'),
+              [(editora, totais.get(editora, 0), 0) for editora in sorted(editoras)],
+              substituir=('copias',))
+
+
+def trocar_editora(livro_id, antiga, nova):
+    """
+    Um livro passou de uma editora para outra: recalcula as cópias das duas e
+    leva os empréstimos em aberto dele da antiga para a nova.
+    """
+    atualizar_copias([antiga, nova])
+    abertos = Emprestimo.objects.em_aberto().filter(livro_id=livro_id).count()
+    if abertos:
+        _acumular(EstoquePorEditora, ('editora',), ('copias', 'emprestadas'),
+                  [(antiga, 0, -abertos), (nova, 0, abertos)])
+
+
+# --- Reconstrução a partir do histórico ---
+
+def _acumular_consulta(modelo, chaves, colunas, consulta):
+    """
+    Como _acumular(), mas as linhas vêm de um SELECT agregado (INSERT ...
+    SELECT): o banco soma e grava sem as linhas passarem pelo Python.
+    """
+    inicio, conflito, _ = _insert_acumulando(modelo, chaves, colunas)
+    # No SQLite o ON CONFLICT depois de um SELECT sem WHERE é ambíguo
+    sql, params = consulta.filter(pk__isnull=False).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{inicio} {sql} {conflito}', params)
+
+
+def recalcular():
+    """
+    Apaga e refaz os resumos a partir de todos os empréstimos (inclusive os
+    arquivados), com um INSERT ... SELECT agregado por resumo. Usado pelo
+    comando recalcular_estatisticas, após cargas diretas no banco ou para
+    corrigir divergências. Retorna quantas linhas cada resumo ficou com.
+    """
+    historico = HistoricoEmprestimo.objects.order_by()
+    devolvidos = historico.filter(data_devolucao__isnull=False)
+    abertos = historico.filter(data_devolucao__isnull=True)
+    zero = Value(0)
+    circulacao = (('dia', 'tipo_membro', 'editora'), ('emprestimos', 'devolucoes', 'devolucoes_atrasadas'))
+    with transaction.atomic():
+        for modelo in (CirculacaoDiaria, EmprestimosDoLivroNoDia, EstoquePorEditora):
+            modelo.objects.all().delete()
+
+        _acumular_consulta(CirculacaoDiaria, *circulacao, historico.values_list(
+            'data_saida', 'membro__tipo', 'livro__editora',
+        ).annotate(emprestimos=Count('pk'), devolucoes=zero, atrasadas=zero))
+        _acumular_consulta(CirculacaoDiaria, *circulacao, devolvidos.values_list(
+            'data_devolucao', 'membro__tipo', 'livro__editora',
+        ).annotate(
+            emprestimos=zero, devolucoes=Count('pk'),
+            atrasadas=Count('pk', filter=Q(data_devolucao__gt=F('data_prevista'))),
+        ))
+        _acumular_consulta(EmprestimosDoLivroNoDia, ('dia', 'livro'), ('emprestimos',), historico.values_list(
+            'data_saida', 'livro_id',
+        ).annotate(emprestimos=Count('pk')))
+
+        _acumular_consulta(EstoquePorEditora, ('editora',), ('copias', 'emprestadas'), Livro.objects.order_by().values_list(
+            'editora',
+        ).annotate(copias=Sum('quantidade_total'), emprestadas=zero))
+        _acumular_consulta(EstoquePorEditora, ('editora',), ('copias', 'emprestadas'), abertos.values_list(
+            'livro__editora',
+        ).annotate(copias=zero, emprestadas=Count('pk')))
+
+    return {
+        modelo.__name__: modelo.objects.count()
+        for modelo in (CirculacaoDiaria, EmprestimosDoLivroNoDia, EstoquePorEditora)
+    }
+
+
+# --- Painel ---
+
+def painel(hoje=None, dias_ranking=30, meses=12, limite=10):
+    """Dados do painel de estatísticas, lidos só dos resumos."""
+    hoje = hoje or date.today()
+    inicio_ranking = hoje - timedelta(days=dias_ranking - 1)
+    # Primeiro dia do mês de `meses - 1` meses atrás
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - (meses - 1), 12)
+    inicio_meses = date(ano, mes + 1, 1)
+    periodo = CirculacaoDiaria.objects.filter(dia__gte=inicio_meses, dia__lte=hoje)
+
+    # Soma por dia no banco (pelo índice único, que começa por dia) e junta os
+    # meses aqui: TruncMonth no SQLite chama uma função Python por linha
+    por_mes = {}
+    for linha in periodo.values('dia').annotate(
+        emprestimos=Sum('emprestimos'), devolucoes=Sum('devolucoes')
+    ).order_by('dia'):
+        mes = por_mes.setdefault(linha['dia'].replace(day=1), {
+            'mes': linha['dia'].replace(day=1), 'emprestimos': 0, 'devolucoes': 0,
+        })
+        mes['emprestimos'] += linha['emprestimos']
+        mes['devolucoes'] += linha['devolucoes']
+
+    atraso_por_tipo = []
+    for linha in periodo.values('tipo_membro').annotate(
+        devolvidos=Sum('devolucoes'), atrasados=Sum('devolucoes_atrasadas')
+    ).order_by('tipo_membro'):
+        linha['taxa'] = 100 * linha['atrasados'] / linha['devolvidos'] if linha['devolvidos'] else None
+        atraso_por_tipo.append(linha)
+
+    return {
+        'inicio_ranking': inicio_ranking,
+        'inicio_meses': inicio_meses,
+        'mais_emprestados': list(
+            EmprestimosDoLivroNoDia.objects.filter(dia__gte=inicio_ranking, dia__lte=hoje)
+            .values('livro_id', 'livro__titulo').annotate(total=Sum('emprestimos'))
+            .order_by('-total', 'livro_id')[:limite]
+        ),
+        'por_mes': list(por_mes.values()),
+        'atraso_por_tipo': atraso_por_tipo,
+        'utilizacao_por_editora': list(
+            EstoquePorEditora.objects.filter(copias__gt=0)
+            .annotate(taxa=ExpressionWrapper(100.0 * F('emprestadas') / F('copias'), output_field=FloatField()))
+            .order_by('-taxa', 'editora')[:limite]
+        ),
+    }
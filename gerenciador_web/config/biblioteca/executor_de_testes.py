@@ -0,0 +1,29 @@
+# biblioteca/executor_de_testes.py
+
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ExecutorDeTestes(DiscoverRunner):
+    """
+    O DiscoverRunner com o cache em arquivos (CACHES) num diretório
+    temporário, apagado no fim: os testes não leem o cache do site nem o
+    que sobrou de uma execução anterior.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.pasta_cache = tempfile.mkdtemp(prefix='biblioteca-cache-')
+        self.cache_de_teste = override_settings(
+            CACHES={'default': {**settings.CACHES['default'], 'LOCATION': self.pasta_cache}},
+        )
+        self.cache_de_teste.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_de_teste.disable()
+        shutil.rmtree(self.pasta_cache, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
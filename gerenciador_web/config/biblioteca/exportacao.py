@@ -0,0 +1,109 @@
+# biblioteca/exportacao.py
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Livro, Membro, Emprestimo, HistoricoEmprestimo
+
+
+# Colunas de cada exportação: (cabeçalho, caminho no ORM).
+# Caminhos com '__' viram JOIN no mesmo SELECT (values_list), sem instanciar modelos.
+EXPORTACOES = {
+    'livros': (Livro, [
+        ('id', 'id'),
+        ('titulo', 'titulo'),
+        ('autor', 'autor__nome'),
+        ('autor_nacionalidade', 'autor__nacionalidade'),
+        ('editora', 'editora'),
+        ('ano', 'ano'),
+        ('quantidade_total', 'quantidade_total'),
+        ('quantidade_disponivel', 'quantidade_disponivel'),
+    ]),
+    'membros': (Membro, [
+        ('id', 'id'),
+        ('nome', 'nome'),
+        ('contato', 'contato'),
+        ('tipo', 'tipo'),
+    ]),
+    'emprestimos': (Emprestimo, [
+        ('id', 'id'),
+        ('membro_id', 'membro_id'),
+        ('membro', 'membro__nome'),
+        ('livro_id', 'livro_id'),
+        ('livro', 'livro__titulo'),
+        ('autor', 'livro__autor__nome'),
+        ('data_saida', 'data_saida'),
+        ('data_prevista', 'data_prevista'),
+        ('data_devolucao', 'data_devolucao'),
+        ('status', 'status'),
+    ]),
+    # Todos os empréstimos, inclusive os arquivados (ver arquivamento.py)
+    'historico': (HistoricoEmprestimo, [
+        ('id', 'id'),
+        ('membro_id', 'membro_id'),
+        ('membro', 'membro__nome'),
+        ('livro_id', 'livro_id'),
+        ('livro', 'livro__titulo'),
+        ('autor', 'livro__autor__nome'),
+        ('data_saida', 'data_saida'),
+        ('data_prevista', 'data_prevista'),
+        ('data_devolucao', 'data_devolucao'),
+        ('status', 'status'),
+        ('arquivado', 'arquivado'),
+    ]),
+}
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+# Linhas buscadas do banco por vez (o cursor é lido aos poucos, a memória não cresce)
+LINHAS_POR_LOTE = 2000
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def cabecalhos(nome):
+    return [cabecalho for cabecalho, _ in EXPORTACOES[nome][1]]
+
+
+def linhas(nome):
+    """Itera as linhas (tuplas) da exportação direto do cursor do banco."""
+    modelo, colunas = EXPORTACOES[nome]
+    return (
+        modelo.objects.order_by('pk')
+        .values_list(*[caminho for _, caminho in colunas])
+        .iterator(chunk_size=LINHAS_POR_LOTE)
+    )
+
+
+def gerar_csv(nome):
+    """Gera o CSV linha a linha (texto), começando pelo cabeçalho."""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(cabecalhos(nome))
+    for linha in linhas(nome):
+        yield escritor.writerow(linha)
+
+
+def gerar_json(nome):
+    """Gera um array JSON de objetos, um objeto por linha, sem montar a lista na memória."""
+    chaves = cabecalhos(nome)
+    separador = '[\n'
+    for linha in linhas(nome):
+        yield separador + json.dumps(dict(zip(chaves, linha)), cls=DjangoJSONEncoder, ensure_ascii=False)
+        separador = ',\n'
+    yield '[]\n' if separador == '[\n' else '\n]\n'
+
+
+GERADORES = {
+    'csv': gerar_csv,
+    'json': gerar_json,
+}
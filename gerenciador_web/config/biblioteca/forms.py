@@ -1,7 +1,47 @@
 # biblioteca/forms.py
 
 from django import forms
-from .models import Livro, Autor, Membro, Emprestimo
+from django.urls import reverse
+from .models import Livro, Autor, Membro, Emprestimo, Reserva
+from .services import registrar_emprestimo, registrar_emprestimos_em_lote, reservar
+
+
+class SelectAutocompletar(forms.Select):
+    """
+    Select que renderiza só a opção já escolhida. As demais chegam do endpoint
+    JSON de autocompletar conforme o usuário digita, então a página não carrega
+    a tabela inteira de membros/livros.
+    """
+    class Media:
+        js = ('biblioteca/autocompletar.js',)
+
+    def __init__(self, tipo, attrs=None):
+        super().__init__(attrs)
+        self.tipo = tipo
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocompletar'] = reverse('biblioteca:autocompletar', args=[self.tipo])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # O select múltiplo não tem opção vazia: nenhum item marcado já é "nenhum"
+        opcoes = [] if self.allow_multiple_selected else [
+            self.create_option(name, '', '---------', not any(value), 0)
+        ]
+        selecionados = [v for v in value if v not in (None, '')]
+        if selecionados:
+            # Uma consulta só para os itens escolhidos (ex: formulário reexibido com erro)
+            field = self.choices.field
+            for obj in self.choices.queryset.filter(pk__in=selecionados):
+                opcoes.append(self.create_option(
+                    name, field.prepare_value(obj), field.label_from_instance(obj), True, len(opcoes)
+                ))
+        return [(None, opcoes, 0)]
+
+
+class SelectMultiploAutocompletar(SelectAutocompletar, forms.SelectMultiple):
+    """SelectAutocompletar que acumula vários itens (ex: os livros de um empréstimo em lote)."""
 
 
 class AutorForm(forms.ModelForm):
@@ -46,6 +86,15 @@ class LivroForm(forms.ModelForm):
         }
 
 
+def _separados_para(membro, livros):
+    """Ids dos livros com cópia separada para uma reserva do membro (só consulta se preciso)."""
+    if membro is None or not livros:
+        return set()
+    return set(Reserva.objects.filter(
+        membro=membro, livro__in=livros, status="Separada"
+    ).values_list('livro_id', flat=True))
+
+
 class EmprestimoForm(forms.ModelForm):
     """Formulário para registrar um novo Empréstimo."""
     class Meta:
@@ -54,24 +103,97 @@ class EmprestimoForm(forms.ModelForm):
         # pois são definidos automaticamente ou na devolução.
         fields = ['membro', 'livro'] 
         widgets = {
-            'membro': forms.Select(attrs={'class': 'form-select'}),
-            'livro': forms.Select(attrs={'class': 'form-select'}),
+            'membro': SelectAutocompletar('membros', attrs={'class': 'form-select'}),
+            'livro': SelectAutocompletar('livros', attrs={'class': 'form-select'}),
         }
     
     # Validação para verificar se há estoque disponível
     def clean_livro(self):
         livro = self.cleaned_data.get('livro')
         # Verifica se o livro existe e se a quantidade disponível é maior que zero
-        if livro and livro.quantidade_disponivel <= 0:
+        # (ou se há uma cópia separada para a reserva deste membro)
+        if livro and livro.quantidade_disponivel <= 0 and not _separados_para(
+            self.cleaned_data.get('membro'), [livro]
+        ):
             raise forms.ValidationError("Este livro não possui mais cópias disponíveis no estoque.")
         return livro
 
-    # Redefine o save() para atualizar o estoque do livro
+    # Redefine o save() para atualizar o estoque do livro.
+    # O clean_livro() acima é só um aviso antecipado: quem garante o estoque é o
+    # UPDATE condicional do serviço (pode levantar EstoqueIndisponivel).
     def save(self, commit=True):
         emprestimo = super().save(commit=False)
         if commit:
-            # Diminui a quantidade disponível
-            emprestimo.livro.quantidade_disponivel -= 1 
-            emprestimo.livro.save()
-            emprestimo.save()
-        return emprestimo
\ No newline at end of file
+            self.instance = emprestimo = registrar_emprestimo(emprestimo.membro, emprestimo.livro)
+        return emprestimo
+
+
+class EmprestimoLoteForm(forms.Form):
+    """Vários livros para o mesmo membro, registrados numa única transação."""
+    membro = forms.ModelChoiceField(
+        queryset=Membro.objects.all(),
+        widget=SelectAutocompletar('membros', attrs={'class': 'form-select'}),
+    )
+    livros = forms.ModelMultipleChoiceField(
+        queryset=Livro.objects.all(),
+        widget=SelectMultiploAutocompletar('livros', attrs={'class': 'form-select', 'size': 8}),
+    )
+
+    # Mesmo aviso antecipado do EmprestimoForm, sobre os livros que o próprio
+    # campo já carregou (nenhuma consulta extra); quem garante é o serviço.
+    def clean_livros(self):
+        livros = self.cleaned_data['livros']
+        esgotados = [livro for livro in livros if livro.quantidade_disponivel <= 0]
+        if esgotados:
+            separados = _separados_para(self.cleaned_data.get('membro'), esgotados)
+            esgotados = [str(livro) for livro in esgotados if livro.pk not in separados]
+        if esgotados:
+            raise forms.ValidationError(
+                f"Sem cópias disponíveis no estoque: {', '.join(esgotados)}."
+            )
+        return livros
+
+    def save(self):
+        """Registra os empréstimos (pode levantar EstoqueIndisponivel) e devolve a lista."""
+        return registrar_emprestimos_em_lote(self.cleaned_data['membro'], self.cleaned_data['livros'])
+
+# --- Importação em lote (CSV) ---
+
+class LivroImportacaoForm(LivroForm):
+    """LivroForm sem o campo 'autor': na importação o autor vem pelo nome, não pelo ID."""
+    class Meta(LivroForm.Meta):
+        fields = [campo for campo in LivroForm.Meta.fields if campo != 'autor']
+
+
+class ImportacaoCSVForm(forms.Form):
+    """Formulário de upload do arquivo CSV no admin."""
+    arquivo = forms.FileField(label='Arquivo CSV (UTF-8, primeira linha com os nomes das colunas)')
+    delimitador = forms.ChoiceField(choices=[(',', 'Vírgula (,)'), (';', 'Ponto e vírgula (;)')], initial=',')
+
+
+class ReservaForm(forms.ModelForm):
+    """Coloca o membro na fila de um livro (ou separa uma cópia, se houver)."""
+    class Meta:
+        model = Reserva
+        fields = ['membro', 'livro']
+        widgets = {
+            'membro': SelectAutocompletar('membros', attrs={'class': 'form-select'}),
+            'livro': SelectAutocompletar('livros', attrs={'class': 'form-select'}),
+        }
+
+    # O ModelForm não valida a constraint reserva_em_andamento_unica (a condição
+    # usa status, que não está no formulário): a conferência fica aqui
+    def clean(self):
+        dados = super().clean()
+        membro, livro = dados.get('membro'), dados.get('livro')
+        if membro and livro and Reserva.objects.filter(
+            membro=membro, livro=livro, status__in=["Aguardando", "Separada"]
+        ).exists():
+            self.add_error('livro', "Este membro já tem uma reserva em andamento para este livro.")
+        return dados
+
+    def save(self, commit=True):
+        reserva = super().save(commit=False)
+        if commit:
+            self.instance = reserva = reservar(reserva.membro, reserva.livro)
+        return reserva
@@ -0,0 +1,130 @@
+# biblioteca/importacao.py
+
+import csv
+
+from django.db import transaction
+
+from . import cache, estatisticas
+from .forms import AutorForm, LivroImportacaoForm, MembroForm
+from .models import Autor, Livro, Membro
+
+
+# Tipo de importação -> (modelo, formulário que valida cada linha)
+IMPORTACOES = {
+    'autores': (Autor, AutorForm),
+    'livros': (Livro, LivroImportacaoForm),
+    'membros': (Membro, MembroForm),
+}
+
+TAMANHO_LOTE = 1000
+
+
+class ArquivoInvalido(Exception):
+    """O arquivo não pôde ser lido até o fim (codificação ou CSV malformado)."""
+
+
+class ResultadoImportacao:
+    """Resumo de uma importação: quantos registros foram criados e os erros por linha."""
+
+    def __init__(self):
+        self.criados = 0
+        self.autores_criados = 0
+        self.erros = []  # lista de (número da linha no arquivo, {campo: [mensagens]})
+
+    def adicionar_erro(self, linha, mensagens):
+        self.erros.append((linha, mensagens))
+
+
+class _MapaDeAutores:
+    """
+    Resolve autores pelo nome com um dicionário em memória (uma consulta no início).
+    Nomes desconhecidos são criados em lote, junto com os livros do mesmo lote.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        for nome, pk in Autor.objects.order_by('-pk').values_list('nome', 'pk').iterator():
+            self.ids[nome.strip().casefold()] = pk  # em nomes repetidos vence o mais antigo
+        self.novos = {}
+
+    def resolver(self, livro, nome):
+        chave = nome.strip().casefold()
+        if chave in self.ids:
+            livro.autor_id = self.ids[chave]
+        else:
+            self.novos.setdefault(chave, (Autor(nome=nome.strip()), []))[1].append(livro)
+
+    def criar_pendentes(self):
+        """Cria os autores novos com um bulk_create e liga os livros que esperavam por eles."""
+        if not self.novos:
+            return 0
+        autores = Autor.objects.bulk_create([autor for autor, _ in self.novos.values()])
+        for (chave, (_, livros)), autor in zip(self.novos.items(), autores):
+            self.ids[chave] = autor.pk
+            for livro in livros:
+                livro.autor_id = autor.pk
+        self.novos = {}
+        return len(autores)
+
+
+def importar_csv(tipo, arquivo, delimitador=',', tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa um CSV (arquivo de texto aberto) de autores, livros ou membros.
+    Cada linha é validada pelo formulário do cadastro; linhas inválidas entram
+    no relatório de erros sem interromper as demais. As válidas são gravadas
+    com bulk_create, um lote por transação.
+    """
+    modelo, form_class = IMPORTACOES[tipo]
+    resultado = ResultadoImportacao()
+    autores = _MapaDeAutores() if modelo is Livro else None
+    pendentes = []
+
+    def gravar():
+        with transaction.atomic():
+            if autores is not None:
+                resultado.autores_criados += autores.criar_pendentes()
+            modelo.objects.bulk_create(pendentes, batch_size=tamanho_lote)
+            # bulk_create não dispara post_save: invalida o acervo uma vez por lote
+            cache.invalidar_apos_commit(cache.MEMBROS if modelo is Membro else cache.ACERVO)
+            if modelo is Livro:
+                estatisticas.atualizar_copias(livro.editora for livro in pendentes)
+        resultado.criados += len(pendentes)
+        pendentes.clear()
+
+    leitor = csv.DictReader(arquivo, delimiter=delimitador)
+    try:
+        # A linha 1 é o cabeçalho, então os dados começam na linha 2
+        for numero, linha in enumerate(leitor, start=2):
+            # DictReader guarda os valores além do cabeçalho numa lista sob a chave None
+            if None in linha:
+                resultado.adicionar_erro(numero, {'linha': [f"{len(linha[None])} coluna(s) a mais que o cabeçalho."]})
+                continue
+            dados = {(chave or '').strip(): (valor or '').strip() for chave, valor in linha.items()}
+            if autores is not None and not dados.get('autor'):
+                resultado.adicionar_erro(numero, {'autor': ["Este campo é obrigatório."]})
+                continue
+
+            form = form_class(dados)
+            if not form.is_valid():
+                resultado.adicionar_erro(numero, {campo: list(msgs) for campo, msgs in form.errors.items()})
+                continue
+
+            objeto = form.save(commit=False)
+            if autores is not None:
+                autores.resolver(objeto, dados['autor'])
+            pendentes.append(objeto)
+            if len(pendentes) >= tamanho_lote:
+                gravar()
+    except (UnicodeDecodeError, csv.Error) as erro:
+        # As linhas lidas antes do problema são gravadas; o resto do arquivo não
+        if pendentes:
+            gravar()
+        motivo = "não está em UTF-8" if isinstance(erro, UnicodeDecodeError) else f"não é um CSV válido ({erro})"
+        raise ArquivoInvalido(
+            f"O arquivo {motivo}: a leitura parou perto da linha {leitor.line_num + 1}; "
+            f"{resultado.criados} registro(s) importado(s) antes dela."
+        ) from erro
+
+    if pendentes:
+        gravar()
+    return resultado
@@ -0,0 +1,25 @@
+# biblioteca/management/commands/arquivar_emprestimos.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from biblioteca.arquivamento import LOTE_ARQUIVAMENTO, arquivar_emprestimos, data_de_corte
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os empréstimos devolvidos antes da data de corte para o arquivo, "
+        "em lotes (rode periodicamente, ex: cron semanal)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antes-de', type=date.fromisoformat, help="Data de corte (AAAA-MM-DD). Padrão: hoje menos BIBLIOTECA_ARQUIVAR_APOS_DIAS.")
+        parser.add_argument('--lote', type=int, default=LOTE_ARQUIVAMENTO, help="Empréstimos por transação.")
+
+    def handle(self, *args, **options):
+        antes_de = options['antes_de'] or data_de_corte()
+        arquivados = arquivar_emprestimos(antes_de, lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{arquivados} empréstimo(s) devolvido(s) antes de {antes_de:%d/%m/%Y} arquivado(s)."
+        ))
@@ -0,0 +1,184 @@
+# biblioteca/management/commands/benchmark.py
+
+import json
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+
+from biblioteca.dados_sinteticos import banco_descartavel, gerar
+from biblioteca.models import Emprestimo, Livro, Membro
+from biblioteca.paginacao import codificar_cursor
+
+
+ESCALAS = {
+    'pequena': dict(autores=200, livros=2_000, membros=1_000, anos=1, emprestimos_por_dia=20),
+    'media': dict(autores=2_000, livros=50_000, membros=20_000, anos=3, emprestimos_por_dia=200),
+    'grande': dict(autores=20_000, livros=500_000, membros=100_000, anos=10, emprestimos_por_dia=1_000),
+}
+
+# Empréstimos devolvidos por iteração no cenário da action do admin
+DEVOLUCOES_POR_ACAO = 50
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentis(tempos):
+    if len(tempos) < 2:
+        return {'p50': round(tempos[0], 2), 'p90': round(tempos[0], 2),
+                'p95': round(tempos[0], 2), 'p99': round(tempos[0], 2)}
+    cortes = statistics.quantiles(tempos, n=100, method='inclusive')
+    return {
+        'p50': round(statistics.median(tempos), 2),
+        'p90': round(cortes[89], 2),
+        'p95': round(cortes[94], 2),
+        'p99': round(cortes[98], 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência (percentis), número de consultas e pico de memória das "
+        "principais páginas do app e do admin, e imprime um relatório JSON para "
+        "comparar entre commits. Por padrão gera os dados num banco descartável."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=sorted(ESCALAS), default='pequena')
+        parser.add_argument('--iteracoes', type=int, default=30)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--banco-atual', action='store_true',
+                            help="Usa os dados já existentes no banco configurado (as alterações são desfeitas no final).")
+        parser.add_argument('--sem-cache', action='store_true', help="Mede com o cache desligado (DummyCache).")
+        parser.add_argument('--cenario', action='append', help="Roda só os cenários indicados.")
+        parser.add_argument('--saida', help="Grava o JSON neste arquivo além de imprimi-lo.")
+
+    def handle(self, *args, **options):
+        try:
+            setup_test_environment()  # libera o host 'testserver' do Client
+            ambiente_proprio = True
+        except RuntimeError:
+            ambiente_proprio = False  # já estamos dentro do runner de testes
+
+        try:
+            if options['banco_atual']:
+                relatorio = self.executar(options, dados=None)
+            else:
+                with banco_descartavel():
+                    dados = gerar(semente=options['semente'], **ESCALAS[options['escala']])
+                    relatorio = self.executar(options, dados=dados)
+        finally:
+            if ambiente_proprio:
+                teardown_test_environment()
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+        self.stdout.write(saida)
+
+    def executar(self, options, dados):
+        cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}} if options['sem_cache'] else None
+        with override_settings(**({'CACHES': cache} if cache else {})), transaction.atomic():
+            cenarios = self.cenarios(random.Random(options['semente']))
+            escolhidos = options['cenario'] or list(cenarios)
+            resultados = {nome: self.medir(cenarios[nome], options['iteracoes']) for nome in escolhidos}
+            # Os cenários de escrita alteram o banco; nada disso deve ficar
+            transaction.set_rollback(True)
+
+        return {
+            'commit': _commit_atual(),
+            'escala': None if options['banco_atual'] else options['escala'],
+            'dados': dados or {
+                'livros': Livro.objects.count(),
+                'membros': Membro.objects.count(),
+                'emprestimos': Emprestimo.objects.count(),
+            },
+            'iteracoes': options['iteracoes'],
+            'cache': not options['sem_cache'],
+            'cenarios': resultados,
+        }
+
+    def medir(self, cenario, iteracoes):
+        """Aquece uma vez, mede latência e consultas por iteração e, à parte, o pico de memória."""
+        cenario(-1)
+        tempos, consultas = [], []
+        for i in range(iteracoes):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                resposta = cenario(i)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code >= 400:
+                raise RuntimeError(f"Resposta {resposta.status_code} no benchmark.")
+            consultas.append(len(capturadas))
+
+        # tracemalloc deixa o código mais lento, por isso fica fora da medição de tempo
+        tracemalloc.start()
+        try:
+            cenario(iteracoes)
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'latencia_ms': _percentis(tempos),
+            'consultas': {'min': min(consultas), 'max': max(consultas), 'media': round(statistics.mean(consultas), 1)},
+            'pico_memoria_kb': round(pico / 1024, 1),
+        }
+
+    def cenarios(self, aleatorio):
+        """Cada cenário é uma função (iteração) -> resposta HTTP do Client."""
+        cliente = Client()
+        admin = Client()
+        admin.force_login(User.objects.create_superuser('benchmark', 'benchmark@exemplo.com', None))
+
+        listar_url = reverse('biblioteca:listar_livros')
+        emprestimo_url = reverse('biblioteca:registrar_emprestimo')
+
+        total_livros = Livro.objects.count()
+        meio = Livro.objects.order_by('titulo', 'id').values_list('titulo', 'id')[total_livros // 2: total_livros // 2 + 1]
+        cursor_profundo = codificar_cursor(list(meio[0])) if meio else ''
+
+        membros = list(Membro.objects.values_list('pk', flat=True)[:1000])
+        disponiveis = list(Livro.objects.filter(quantidade_disponivel__gt=0).values_list('pk', flat=True)[:1000])
+        ativos = list(Emprestimo.objects.em_aberto().values_list('pk', flat=True)[:DEVOLUCOES_POR_ACAO * 1000])
+
+        def emprestar(_):
+            # Estoque pode acabar durante o cenário; o formulário reexibido também conta
+            dados = {'membro': aleatorio.choice(membros), 'livro': aleatorio.choice(disponiveis)}
+            return cliente.post(emprestimo_url, dados)
+
+        def devolver_em_lote(_):
+            selecionados = [ativos.pop() for _ in range(min(DEVOLUCOES_POR_ACAO, len(ativos)))]
+            return admin.post(
+                reverse('admin:biblioteca_emprestimo_changelist'),
+                {'action': 'marcar_como_devolvido', '_selected_action': selecionados},
+            )
+
+        return {
+            'listar_livros': lambda _: cliente.get(listar_url),
+            'listar_livros_pagina_profunda': lambda _: cliente.get(listar_url, {'cursor': cursor_profundo}),
+            'registrar_emprestimo_get': lambda _: cliente.get(emprestimo_url),
+            'registrar_emprestimo_post': emprestar,
+            'admin_livros': lambda _: admin.get(reverse('admin:biblioteca_livro_changelist')),
+            'admin_membros': lambda _: admin.get(reverse('admin:biblioteca_membro_changelist')),
+            'admin_emprestimos': lambda _: admin.get(reverse('admin:biblioteca_emprestimo_changelist')),
+            'admin_devolucao_em_lote': devolver_em_lote,
+        }
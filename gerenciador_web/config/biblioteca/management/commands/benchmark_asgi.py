@@ -0,0 +1,165 @@
+# biblioteca/management/commands/benchmark_asgi.py
+
+import asyncio
+import io
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from biblioteca.dados_sinteticos import PALAVRAS, banco_descartavel, gerar
+from biblioteca.models import Livro
+
+from .benchmark import ESCALAS, _commit_atual, _percentis
+
+
+HOST = 'testserver'  # liberado por setup_test_environment()
+
+
+def _rotas(aleatorio, quantidade):
+    """Sorteia `quantidade` URLs de leitura (listagem, ficha, disponibilidade, busca, autocompletar)."""
+    livro_ids = list(Livro.objects.values_list('pk', flat=True)[:5000])
+    listar = reverse('biblioteca:listar_livros')
+    disponibilidade = reverse('biblioteca:disponibilidade')
+    buscar = reverse('biblioteca:buscar')
+    autocompletar = reverse('biblioteca:autocompletar', args=['livros'])
+    geradores = [
+        lambda: listar,
+        lambda: reverse('biblioteca:detalhe_livro', args=[aleatorio.choice(livro_ids)]),
+        lambda: disponibilidade + '?ids=' + ','.join(str(pk) for pk in aleatorio.sample(livro_ids, min(10, len(livro_ids)))),
+        lambda: f'{buscar}?q={aleatorio.choice(PALAVRAS)}',
+        lambda: f'{autocompletar}?q={aleatorio.choice(PALAVRAS)[:3]}',
+    ]
+    return [aleatorio.choice(geradores)() for _ in range(quantidade)]
+
+
+def _rodar_wsgi(urls, concorrencia):
+    """Como um servidor WSGI com threads (ex: gunicorn --threads): uma thread por requisição em andamento."""
+    aplicacao = WSGIHandler()
+    local = threading.local()
+
+    def requisitar(url):
+        partes = urlsplit(url)
+        ambiente = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': partes.path, 'QUERY_STRING': partes.query,
+            'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+        }
+        inicio = time.perf_counter()
+        corpo = aplicacao(ambiente, lambda status, cabecalhos: setattr(local, 'status', int(status[:3])))
+        for _ in corpo:
+            pass
+        corpo.close()
+        return (time.perf_counter() - inicio) * 1000, local.status
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        return list(executor.map(requisitar, urls))
+
+
+async def _rodar_asgi(urls, concorrencia):
+    """Como um worker ASGI (ex: uvicorn): todas as requisições no mesmo event loop."""
+    aplicacao = ASGIHandler()
+    fila = iter(urls)
+    resultados = []
+
+    async def requisitar(url):
+        partes = urlsplit(url)
+        escopo = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': partes.path, 'raw_path': partes.path.encode(),
+            'query_string': partes.query.encode(), 'headers': [(b'host', HOST.encode())],
+            'server': (HOST, 80), 'client': ('127.0.0.1', 50000),
+        }
+        recebido = False
+        status = {}
+
+        async def receive():
+            nonlocal recebido
+            if not recebido:
+                recebido = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Future()  # o cliente nunca desconecta
+
+        async def send(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status['codigo'] = mensagem['status']
+
+        inicio = time.perf_counter()
+        await aplicacao(escopo, receive, send)
+        return (time.perf_counter() - inicio) * 1000, status['codigo']
+
+    async def cliente():
+        for url in fila:
+            resultados.append(await requisitar(url))
+
+    await asyncio.gather(*[cliente() for _ in range(concorrencia)])
+    return resultados
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga das rotas de leitura sob os handlers WSGI (pool de "
+        "threads) e ASGI (event loop), no mesmo processo e sem servidor HTTP: "
+        "mede requisições por segundo e latência com N requisições simultâneas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=sorted(ESCALAS), default='pequena')
+        parser.add_argument('--requisicoes', type=int, default=2000)
+        parser.add_argument('--concorrencia', type=int, default=32)
+        parser.add_argument('--modo', action='append', choices=['asgi', 'wsgi'], help="Padrão: os dois.")
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--banco-atual', action='store_true', help="Usa os dados do banco configurado.")
+        parser.add_argument('--saida', help="Grava o JSON neste arquivo além de imprimi-lo.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            if options['banco_atual']:
+                relatorio = self.executar(options)
+            else:
+                with banco_descartavel():
+                    gerar(semente=options['semente'], **ESCALAS[options['escala']])
+                    relatorio = self.executar(options)
+        finally:
+            teardown_test_environment()
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+        self.stdout.write(saida)
+
+    def executar(self, options):
+        urls = _rotas(random.Random(options['semente']), options['requisicoes'])
+        executores = {
+            'wsgi': lambda lista: _rodar_wsgi(lista, options['concorrencia']),
+            'asgi': lambda lista: asyncio.run(_rodar_asgi(lista, options['concorrencia'])),
+        }
+        relatorio = {
+            'commit': _commit_atual(),
+            'escala': None if options['banco_atual'] else options['escala'],
+            'requisicoes': options['requisicoes'],
+            'concorrencia': options['concorrencia'],
+            'modos': {},
+        }
+        for modo in options['modo'] or ['wsgi', 'asgi']:
+            executores[modo](urls[:50])  # aquecimento (cache, templates, conexões)
+            inicio = time.perf_counter()
+            resultados = executores[modo](urls)
+            decorrido = time.perf_counter() - inicio
+            erros = sum(1 for _, status in resultados if status >= 400)
+            relatorio['modos'][modo] = {
+                'requisicoes_por_segundo': round(len(resultados) / decorrido, 1),
+                'latencia_ms': _percentis([tempo for tempo, _ in resultados]),
+                'erros': erros,
+            }
+        return relatorio
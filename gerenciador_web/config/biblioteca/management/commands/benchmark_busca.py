@@ -0,0 +1,79 @@
+# biblioteca/management/commands/benchmark_busca.py
+
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from biblioteca.busca import buscar_livros
+from biblioteca.dados_sinteticos import PALAVRAS, SOBRENOMES, banco_descartavel, gerar
+from biblioteca.models import Livro
+
+from .benchmark import _percentis
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a busca FTS5 do acervo com a busca LIKE do admin (search_fields) "
+        "num catálogo sintético, criado num banco de teste descartável."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--livros', type=int, default=1_000_000)
+        parser.add_argument('--autores', type=int, default=20_000)
+        parser.add_argument('--consultas', type=int, default=30)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with banco_descartavel():
+            relatorio = self.medir(options)
+        self.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+    def medir(self, options):
+        aleatorio = random.Random(options['semente'])
+        inicio = time.perf_counter()
+        # Só catálogo: os triggers alimentam o índice FTS durante a carga
+        gerar(autores=options['autores'], livros=options['livros'], membros=0,
+              anos=0, emprestimos_por_dia=0, semente=options['semente'])
+        geracao = time.perf_counter() - inicio
+
+        termos = [
+            aleatorio.choice([
+                lambda: aleatorio.choice(PALAVRAS),
+                lambda: f"{aleatorio.choice(PALAVRAS)} {aleatorio.choice(PALAVRAS)}",
+                lambda: aleatorio.choice(SOBRENOMES),
+            ])()
+            for _ in range(options['consultas'])
+        ]
+
+        def like_admin(termo):
+            # O que o LivroAdmin fazia com search_fields = ('titulo', 'autor__nome'):
+            # cada palavra em LIKE '%palavra%' nos dois campos, página de 100 e COUNT(*)
+            filtro = Q()
+            for palavra in termo.split():
+                filtro &= Q(titulo__icontains=palavra) | Q(autor__nome__icontains=palavra)
+            consulta = Livro.objects.filter(filtro).select_related('autor').order_by('-pk')
+            consulta.count()
+            return list(consulta[:100])
+
+        def fts(termo):
+            return buscar_livros(termo, 1, 100).livros
+
+        resultados = {}
+        for nome, funcao in (('like_admin', like_admin), ('fts5', fts)):
+            tempos = []
+            for termo in termos:
+                t0 = time.perf_counter()
+                funcao(termo)
+                tempos.append((time.perf_counter() - t0) * 1000)
+            resultados[nome] = {'latencia_ms': {**_percentis(tempos), 'max': round(max(tempos), 2)}}
+
+        return {
+            'livros': options['livros'],
+            'autores': options['autores'],
+            'consultas': len(termos),
+            'geracao_s': round(geracao, 1),
+            'resultados': resultados,
+        }
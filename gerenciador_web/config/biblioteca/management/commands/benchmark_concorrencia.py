@@ -0,0 +1,181 @@
+# biblioteca/management/commands/benchmark_concorrencia.py
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from biblioteca.dados_sinteticos import gerar
+from biblioteca.models import Livro, Membro
+from biblioteca.paginacao import paginar_por_cursor
+from biblioteca.services import EstoqueIndisponivel, registrar_devolucao, registrar_emprestimo
+
+from .benchmark import _commit_atual, _percentis
+
+
+# Configuração de cada perfil comparado (chaves de settings.DATABASES['default'])
+PERFIS = {
+    'padrao': lambda: {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {}},
+    'producao': lambda: settings.BIBLIOTECA_SQLITE_PRODUCAO,
+}
+
+
+@contextmanager
+def _usar_banco(caminho, configuracao):
+    """
+    Aponta a conexão padrão para outro arquivo SQLite durante o bloco. As
+    threads criam as próprias conexões a partir do mesmo settings_dict, então
+    também passam a usar o arquivo e o perfil indicados.
+    """
+    dicionario = connection.settings_dict
+    chaves = ('NAME', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')
+    original = {chave: dicionario.get(chave) for chave in chaves}
+    connection.close()
+    dicionario.update(configuracao, NAME=caminho)
+    try:
+        yield
+    finally:
+        connection.close()
+        dicionario.update(original)
+
+
+class _Resultados:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.tempos = {'leitura': [], 'emprestimo': []}
+        self.erros = {'leitura': 0, 'emprestimo': 0}
+
+    def medir(self, tipo, funcao):
+        inicio = time.perf_counter()
+        try:
+            funcao()
+        except OperationalError:  # "database is locked" depois de esgotar o busy timeout
+            with self._trava:
+                self.erros[tipo] += 1
+        else:
+            with self._trava:
+                self.tempos[tipo].append((time.perf_counter() - inicio) * 1000)
+        finally:
+            close_old_connections()  # fim da "requisição": fecha ou reaproveita (CONN_MAX_AGE)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede leituras do acervo e empréstimos/devoluções rodando em paralelo "
+        "(threads) num banco SQLite descartável, no perfil padrão e no perfil "
+        "de produção (WAL, pragmas, BEGIN IMMEDIATE, CONN_MAX_AGE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfil', action='append', choices=sorted(PERFIS),
+                            help="Perfis a comparar (padrão: todos).")
+        parser.add_argument('--leitores', type=int, default=4)
+        parser.add_argument('--escritores', type=int, default=2)
+        parser.add_argument('--duracao', type=float, default=5.0, help="Segundos de carga por perfil.")
+        parser.add_argument('--livros', type=int, default=2_000)
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--saida', help="Grava o JSON neste arquivo além de imprimi-lo.")
+
+    def handle(self, *args, **options):
+        relatorio = {
+            'commit': _commit_atual(),
+            'leitores': options['leitores'],
+            'escritores': options['escritores'],
+            'duracao_s': options['duracao'],
+            'perfis': {},
+        }
+        with tempfile.TemporaryDirectory() as pasta:
+            # Um banco-modelo migrado e populado; cada perfil roda numa cópia dele
+            modelo = os.path.join(pasta, 'modelo.sqlite3')
+            with _usar_banco(modelo, PERFIS['padrao']()):
+                call_command('migrate', verbosity=0, interactive=False)
+                gerar(autores=max(options['livros'] // 10, 1), livros=options['livros'],
+                      membros=max(options['livros'] // 2, 1), anos=1, emprestimos_por_dia=5,
+                      semente=options['semente'])
+                livro_ids = list(Livro.objects.values_list('pk', flat=True))
+                membro_ids = list(Membro.objects.values_list('pk', flat=True))
+
+            for nome in options['perfil'] or sorted(PERFIS):
+                caminho = os.path.join(pasta, f'{nome}.sqlite3')
+                shutil.copyfile(modelo, caminho)
+                with _usar_banco(caminho, PERFIS[nome]()):
+                    relatorio['perfis'][nome] = self._rodar(livro_ids, membro_ids, options)
+                if options['verbosity'] >= 2:
+                    self.stderr.write(f"{nome}: {relatorio['perfis'][nome]}")
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida)
+        self.stdout.write(saida)
+
+    def _rodar(self, livro_ids, membro_ids, options):
+        resultados = _Resultados()
+        fim = time.monotonic() + options['duracao']
+        livros = Livro.objects.select_related('autor')
+
+        def leitor(semente):
+            aleatorio = random.Random(semente)
+            while time.monotonic() < fim:
+                # Uma página da listagem a partir de um ponto qualquer do acervo
+                livro_id = aleatorio.choice(livro_ids)
+                resultados.medir('leitura', lambda: list(paginar_por_cursor(
+                    livros.filter(pk__gte=livro_id), ('titulo', 'id'), None, 50,
+                )))
+
+        def escritor(semente):
+            aleatorio = random.Random(semente)
+
+            def emprestar_e_devolver():
+                livro = Livro.objects.get(pk=aleatorio.choice(livro_ids))
+                membro = Membro(pk=aleatorio.choice(membro_ids))
+                try:
+                    emprestimo = registrar_emprestimo(membro, livro)
+                except EstoqueIndisponivel:
+                    return
+                registrar_devolucao(emprestimo)
+
+            while time.monotonic() < fim:
+                resultados.medir('emprestimo', emprestar_e_devolver)
+
+        def executar(alvo, semente):
+            try:
+                alvo(semente)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=executar, args=(leitor, options['semente'] + i))
+            for i in range(options['leitores'])
+        ] + [
+            threading.Thread(target=executar, args=(escritor, options['semente'] + 1000 + i))
+            for i in range(options['escritores'])
+        ]
+        inicio = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        decorrido = time.monotonic() - inicio
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            modo = cursor.fetchone()[0]
+        relatorio = {'journal_mode': modo}
+        for tipo, tempos in resultados.tempos.items():
+            relatorio[tipo] = {
+                'operacoes': len(tempos),
+                'por_segundo': round(len(tempos) / decorrido, 1),
+                'erros': resultados.erros[tipo],
+                'latencia_ms': _percentis(tempos) if tempos else None,
+            }
+        return relatorio
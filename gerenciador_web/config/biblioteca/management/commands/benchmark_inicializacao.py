@@ -0,0 +1,135 @@
+# biblioteca/management/commands/benchmark_inicializacao.py
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from .benchmark import _commit_atual
+
+
+# O que cada processo medido executa: só a inicialização do Django (settings,
+# apps, models, ready()/autodiscover), que todo worker e comando paga
+INICIALIZAR = (
+    "import django, sys; django.setup(); "
+    "print('\\n'.join(sys.modules), file=sys.stdout)"
+)
+
+# Módulos que a execução enxuta deixa de carregar (aparecem no relatório)
+PESADOS = (
+    'django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles',
+    'biblioteca.admin', 'biblioteca.forms', 'biblioteca.importacao', 'biblioteca.services', 'csv',
+)
+
+# "import time:  self |  cumulativo | [recuo]módulo" (microssegundos; sem recuo = import de topo)
+LINHA = re.compile(r'^import time:\s*(\d+)\s*\|\s*(\d+)\s*\| ( *)(\S+)')
+
+
+def _grupo(modulo):
+    """Agrupa o tempo próprio dos módulos: apps do contrib separados, o resto pelo pacote."""
+    partes = modulo.split('.')
+    if partes[0] == 'django' and len(partes) > 2 and partes[1] == 'contrib':
+        return '.'.join(partes[:3])
+    return partes[0]
+
+
+def _medir(execucao):
+    """Um processo novo com -X importtime: (ms de parede, ms de imports, ms por grupo, módulos carregados)."""
+    ambiente = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+        'BIBLIOTECA_EXECUCAO': execucao,
+        # Sem .pyc novos durante a medição (o aquecimento já compilou tudo)
+        'PYTHONDONTWRITEBYTECODE': '1',
+    }
+    inicio = time.perf_counter()
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', INICIALIZAR],
+        cwd=settings.BASE_DIR, env=ambiente, capture_output=True, text=True, check=True,
+    )
+    parede = (time.perf_counter() - inicio) * 1000
+
+    total, grupos = 0, Counter()
+    for linha in processo.stderr.splitlines():
+        casou = LINHA.match(linha)
+        if not casou:
+            continue
+        proprio, cumulativo, recuo, modulo = casou.groups()
+        grupos[_grupo(modulo)] += int(proprio) / 1000
+        if not recuo:
+            total += int(cumulativo) / 1000
+    return parede, total, grupos, set(processo.stdout.split())
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a inicialização (django.setup()) nas execuções completa e enxuta "
+        "com python -X importtime: tempo total, tempo de import por pacote e "
+        "módulos pesados carregados. Com --historico acrescenta o resultado a "
+        "um arquivo JSON Lines, para acompanhar a evolução entre commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=10, help="Processos medidos por execução (vale a mediana).")
+        parser.add_argument('--maiores', type=int, default=10, help="Quantos grupos de módulos listar, do mais lento.")
+        parser.add_argument('--saida', help="Grava o JSON neste arquivo além de imprimi-lo.")
+        parser.add_argument('--historico', help="Acrescenta uma linha com o resumo a este arquivo (.jsonl).")
+
+    def handle(self, *args, **options):
+        relatorio = {
+            'commit': _commit_atual(),
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'repeticoes': options['repeticoes'],
+            'execucoes': {},
+        }
+        execucoes = ('completa', 'enxuta')
+        medicoes = {execucao: [] for execucao in execucoes}
+        for execucao in execucoes:
+            _medir(execucao)  # aquecimento: compila os .pyc e enche o cache de disco
+        # Alternadas: uma variação de carga da máquina afeta as duas igualmente
+        for _ in range(max(options['repeticoes'], 1)):
+            for execucao in execucoes:
+                medicoes[execucao].append(_medir(execucao))
+
+        for execucao, lista in medicoes.items():
+            grupos = Counter()
+            for _, _, por_grupo, _ in lista:
+                grupos.update(por_grupo)
+            carregados = lista[-1][3]
+            relatorio['execucoes'][execucao] = {
+                'processo_ms': round(statistics.median(m[0] for m in lista), 1),
+                'processo_min_ms': round(min(m[0] for m in lista), 1),
+                'imports_ms': round(statistics.median(m[1] for m in lista), 1),
+                'modulos': len(carregados),
+                'pesados_carregados': [modulo for modulo in PESADOS if modulo in carregados],
+                'maiores_ms': {
+                    grupo: round(tempo / len(lista), 1) for grupo, tempo in grupos.most_common(options['maiores'])
+                },
+            }
+        completa, enxuta = relatorio['execucoes']['completa'], relatorio['execucoes']['enxuta']
+        relatorio['ganho_enxuta_ms'] = round(completa['processo_ms'] - enxuta['processo_ms'], 1)
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+        if options['historico']:
+            resumo = {
+                chave: relatorio[chave] for chave in ('commit', 'data', 'python', 'django', 'ganho_enxuta_ms')
+            }
+            for execucao, dados in relatorio['execucoes'].items():
+                resumo[execucao] = {chave: dados[chave] for chave in ('processo_ms', 'processo_min_ms', 'imports_ms', 'modulos')}
+            with open(options['historico'], 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(resumo, ensure_ascii=False) + '\n')
+        self.stdout.write(saida)
@@ -0,0 +1,142 @@
+# biblioteca/management/commands/benchmark_templates.py
+
+import json
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Context
+from django.template.backends.django import DjangoTemplates
+
+from biblioteca.models import Autor, Livro
+
+from .benchmark import _commit_atual
+
+
+# O laço original de listar_livros.html, mantido aqui como referência da medição
+LACO = """{% for livro in livros %}
+        <tr>
+            <td><a href="{% url 'biblioteca:detalhe_livro' livro.pk %}">{{ livro.titulo }}</a></td>
+            <td>{{ livro.autor.nome }}</td>
+            <td>{{ livro.editora }}</td>
+            <td>{{ livro.ano }}</td>
+            <td>{{ livro.quantidade_total }}</td>
+            <td>
+                {{ livro.quantidade_disponivel }}
+            </td>
+            <td>
+                {% if livro.quantidade_disponivel > 0 %}
+                    <span class="badge bg-success">Disponível</span>
+                {% else %}
+                    <span class="badge bg-danger">Esgotado</span>
+                {% endif %}
+            </td>
+        </tr>
+{% endfor %}"""
+
+FRAGMENTO = "{% load acervo %}{% linhas_do_acervo livros %}"
+
+# Templates do site carregados (lidos e compilados) no cenário de carregamento
+TEMPLATES_DO_SITE = (
+    'base.html',
+    'biblioteca/listar_livros.html',
+    'biblioteca/detalhe_livro.html',
+    'biblioteca/buscar.html',
+    'biblioteca/registrar_emprestimo.html',
+    'biblioteca/painel_estatisticas.html',
+)
+
+# Espaços em volta das tags não mudam a página; as duas saídas são comparadas sem eles
+ESPACOS = re.compile(r'\s*(<[^>]+>)\s*')
+
+
+def _livros(quantidade):
+    """Livros em memória (sem banco), com o autor já ligado, como os do select_related."""
+    autores = [Autor(pk=i, nome=f'Autor <{i}> & Cia') for i in range(1, 101)]
+    livros = []
+    for i in range(1, quantidade + 1):
+        livro = Livro(
+            pk=i, titulo=f'Livro "{i:05d}"', editora='Editora & Filhos', ano=1950 + i % 70,
+            quantidade_total=3, quantidade_disponivel=i % 4,
+        )
+        livro.autor = autores[i % len(autores)]
+        livros.append(livro)
+    return livros
+
+
+def _motor(producao):
+    """Engine com a configuração de templates do projeto: a de desenvolvimento ou a de produção."""
+    config = {chave: valor for chave, valor in settings.TEMPLATES[0].items() if chave != 'BACKEND'}
+    config.update(NAME='benchmark', APP_DIRS=False)
+    opcoes = {chave: valor for chave, valor in config['OPTIONS'].items() if chave not in ('debug', 'loaders')}
+    if producao:
+        opcoes.update(settings.BIBLIOTECA_TEMPLATES_PRODUCAO['OPTIONS'])
+    else:
+        # Sem cache de templates: cada get_template() lê e compila o arquivo de novo
+        opcoes.update(debug=True, loaders=[
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ])
+    # O backend (e não Engine direto) registra as bibliotecas dos apps, como {% load acervo %}
+    return DjangoTemplates({**config, 'OPTIONS': opcoes}).engine
+
+
+def _mediana_ms(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a renderização das linhas da listagem do acervo (laço do template "
+        "x fragmento pré-compilado da tag linhas_do_acervo), em ms por 10 mil "
+        "linhas, e o carregamento dos templates com e sem o perfil de produção "
+        "(cached.Loader, debug=False). Imprime um relatório JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10_000, help="Livros na tabela renderizada.")
+        parser.add_argument('--repeticoes', type=int, default=5, help="Renderizações medidas (vale a mediana).")
+        parser.add_argument('--saida', help="Grava o JSON neste arquivo além de imprimi-lo.")
+
+    def handle(self, *args, **options):
+        linhas = max(options['linhas'], 1)
+        repeticoes = max(options['repeticoes'], 1)
+        contexto = Context({'livros': _livros(linhas)})
+        motor = _motor(producao=True)
+
+        renderizacao, saidas = {}, {}
+        for nome, fonte in (('laco', LACO), ('fragmento', FRAGMENTO)):
+            template = motor.from_string(fonte)
+            saidas[nome] = template.render(contexto)  # aquecimento
+            por_render = _mediana_ms(lambda: template.render(contexto), repeticoes)
+            renderizacao[nome] = round(por_render * 10_000 / linhas, 1)
+
+        carregamento = {}
+        for nome, producao in (('desenvolvimento', False), ('producao', True)):
+            motor = _motor(producao)
+            carregar = lambda: [motor.get_template(template) for template in TEMPLATES_DO_SITE]  # noqa: E731
+            carregar()
+            carregamento[nome] = round(_mediana_ms(carregar, max(repeticoes, 20)) * 1000 / len(TEMPLATES_DO_SITE), 1)
+
+        relatorio = {
+            'commit': _commit_atual(),
+            'linhas': linhas,
+            'repeticoes': repeticoes,
+            'render_ms_por_10k_linhas': renderizacao,
+            'ganho_fragmento': round(renderizacao['laco'] / renderizacao['fragmento'], 1) if renderizacao['fragmento'] else None,
+            'saidas_iguais': ESPACOS.sub(r'\1', saidas['laco']) == ESPACOS.sub(r'\1', saidas['fragmento']),
+            'carregar_template_us': carregamento,
+        }
+
+        saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida + '\n')
+        self.stdout.write(saida)
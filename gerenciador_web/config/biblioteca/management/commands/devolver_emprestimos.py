@@ -0,0 +1,33 @@
+# biblioteca/management/commands/devolver_emprestimos.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblioteca.models import Emprestimo
+from biblioteca.services import devolver_em_lote
+
+
+class Command(BaseCommand):
+    help = "Marca empréstimos como devolvidos em lote e repõe o estoque (ex: após um inventário)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help="IDs dos empréstimos a devolver.")
+        parser.add_argument('--livro', type=int, action='append', default=[], help="Devolve todos os empréstimos ativos deste livro.")
+        parser.add_argument('--membro', type=int, action='append', default=[], help="Devolve todos os empréstimos ativos deste membro.")
+        parser.add_argument('--data', type=date.fromisoformat, help="Data da devolução (AAAA-MM-DD). Padrão: hoje.")
+
+    def handle(self, *args, **options):
+        if not (options['ids'] or options['livro'] or options['membro']):
+            raise CommandError("Informe IDs de empréstimos, --livro ou --membro.")
+
+        emprestimos = Emprestimo.objects.all()
+        if options['ids']:
+            emprestimos = emprestimos.filter(pk__in=options['ids'])
+        if options['livro']:
+            emprestimos = emprestimos.filter(livro_id__in=options['livro'])
+        if options['membro']:
+            emprestimos = emprestimos.filter(membro_id__in=options['membro'])
+
+        devolvidos = devolver_em_lote(emprestimos, options['data'])
+        self.stdout.write(self.style.SUCCESS(f"{devolvidos} empréstimo(s) devolvido(s)."))
@@ -0,0 +1,23 @@
+# biblioteca/management/commands/exportar_dados.py
+
+from django.core.management.base import BaseCommand
+
+from biblioteca import exportacao
+
+
+class Command(BaseCommand):
+    help = "Exporta livros, membros, empréstimos ou o histórico (com os arquivados) em CSV/JSON, linha a linha (memória constante)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('nome', choices=sorted(exportacao.EXPORTACOES))
+        parser.add_argument('--formato', choices=sorted(exportacao.FORMATOS), default='csv')
+        parser.add_argument('--saida', help="Arquivo de destino. Padrão: saída padrão.")
+
+    def handle(self, *args, **options):
+        pedacos = exportacao.GERADORES[options['formato']](options['nome'])
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8', newline='') as arquivo:
+                arquivo.writelines(pedacos)
+        else:
+            for pedaco in pedacos:
+                self.stdout.write(pedaco, ending='')
@@ -0,0 +1,34 @@
+# biblioteca/management/commands/gerar_dados.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblioteca.dados_sinteticos import gerar
+
+
+class Command(BaseCommand):
+    help = (
+        "Acrescenta ao banco configurado um conjunto sintético de autores, livros, "
+        "membros e anos de empréstimos (para testes de carga e benchmarks)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--autores', type=int, default=1_000)
+        parser.add_argument('--livros', type=int, default=10_000)
+        parser.add_argument('--membros', type=int, default=5_000)
+        parser.add_argument('--anos', type=int, default=1, help="Anos de histórico de empréstimos.")
+        parser.add_argument('--emprestimos-por-dia', type=int, default=100)
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['livros'] and not options['autores']:
+            raise CommandError("Livros precisam de pelo menos um autor (--autores).")
+        criados = gerar(
+            autores=options['autores'],
+            livros=options['livros'],
+            membros=options['membros'],
+            anos=options['anos'],
+            emprestimos_por_dia=options['emprestimos_por_dia'],
+            semente=options['semente'],
+        )
+        resumo = ', '.join(f"{quantidade} {tabela}" for tabela, quantidade in criados.items())
+        self.stdout.write(self.style.SUCCESS(f"Criados: {resumo}."))
@@ -0,0 +1,36 @@
+# biblioteca/management/commands/importar_csv.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from biblioteca.importacao import IMPORTACOES, TAMANHO_LOTE, ArquivoInvalido, importar_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa autores, livros ou membros de um arquivo CSV em lotes. "
+        "Linhas inválidas são listadas e não interrompem a importação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTACOES))
+        parser.add_argument('arquivo', help="Caminho do CSV (UTF-8, com cabeçalho).")
+        parser.add_argument('--delimitador', default=',')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Registros por bulk_create/transação.")
+
+    def handle(self, *args, **options):
+        with open(options['arquivo'], encoding='utf-8-sig', newline='') as arquivo:
+            try:
+                resultado = importar_csv(
+                    options['tipo'], arquivo, options['delimitador'], options['lote']
+                )
+            except ArquivoInvalido as erro:
+                raise CommandError(str(erro))
+
+        for linha, mensagens in resultado.erros:
+            for campo, erros in mensagens.items():
+                self.stderr.write(f"linha {linha}: {campo}: {' '.join(erros)}")
+
+        resumo = f"{resultado.criados} registro(s) importado(s), {len(resultado.erros)} linha(s) com erro."
+        if resultado.autores_criados:
+            resumo += f" {resultado.autores_criados} autor(es) novo(s)."
+        self.stdout.write(self.style.SUCCESS(resumo))
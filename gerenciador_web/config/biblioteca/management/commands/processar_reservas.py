@@ -0,0 +1,28 @@
+# biblioteca/management/commands/processar_reservas.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from biblioteca.services import LOTE_RESERVAS, avisar_reservas_separadas, expirar_reservas
+
+
+class Command(BaseCommand):
+    help = (
+        "Rotina diária das reservas: expira em lotes as cópias separadas que "
+        "passaram do prazo (passando-as aos próximos da fila) e envia os avisos "
+        "ainda pendentes (normalmente já enviados pela tarefa avisar_reservas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', type=date.fromisoformat, help="Data de referência (AAAA-MM-DD). Padrão: hoje.")
+        parser.add_argument('--lote', type=int, default=LOTE_RESERVAS, help="Reservas por lote.")
+        parser.add_argument('--sem-avisos', action='store_true', help="Só expira; não envia os e-mails.")
+
+    def handle(self, *args, **options):
+        hoje = options['data'] or date.today()
+        expiradas = expirar_reservas(hoje, lote=options['lote'])
+        self.stdout.write(f"{expiradas} reserva(s) expirada(s) em {hoje:%d/%m/%Y}.")
+        if not options['sem_avisos']:
+            enviados = avisar_reservas_separadas(options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"{enviados} aviso(s) de reserva enviado(s)."))
@@ -0,0 +1,87 @@
+# biblioteca/management/commands/processar_tarefas.py
+
+import os
+import socket
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from biblioteca.tarefas import (
+    executar, executar_no_pool, limpar_concluidas, recuperar_interrompidas, reivindicar,
+)
+
+
+def _iniciar_processo():
+    # Processos criados por spawn (Windows/macOS) não herdam o Django configurado
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da fila de tarefas: reivindica lotes de tarefas prontas no banco "
+        "e as executa num pool de threads ou de processos, com novas tentativas "
+        "para as que falham. Rode um ou mais em paralelo (ex: um serviço do systemd)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trabalhadores', type=int, default=4, help="Tamanho do pool (0: executa no próprio processo).")
+        parser.add_argument('--processos', action='store_true', help="Pool de processos em vez de threads (tarefas que usam CPU).")
+        parser.add_argument('--lote', type=int, help="Tarefas reivindicadas por consulta. Padrão: 2 x trabalhadores.")
+        parser.add_argument('--intervalo', type=float, default=1.0, help="Segundos entre consultas quando a fila está vazia.")
+        parser.add_argument('--uma-vez', action='store_true', help="Esvazia a fila e termina, em vez de esperar por novas tarefas.")
+        parser.add_argument('--interrompidas-apos', type=int, default=600, help="Segundos em 'Executando' para uma tarefa voltar à fila.")
+
+    def handle(self, *args, **options):
+        trabalhador = f'{socket.gethostname()}:{os.getpid()}'
+        tamanho = max(options['trabalhadores'], 0)
+        lote = options['lote'] or max(2 * tamanho, 1)
+
+        recuperadas = recuperar_interrompidas(options['interrompidas_apos'])
+        apagadas = limpar_concluidas(getattr(settings, 'BIBLIOTECA_TAREFAS_MANTER_DIAS', 7))
+        if options['verbosity'] >= 2:
+            self.stdout.write(f"{recuperadas} tarefa(s) interrompida(s) de volta à fila; {apagadas} concluída(s) apagada(s).")
+
+        if tamanho == 0:
+            pool = None
+        elif options['processos']:
+            pool = ProcessPoolExecutor(tamanho, initializer=_iniciar_processo)
+        else:
+            pool = ThreadPoolExecutor(tamanho, thread_name_prefix='tarefa')
+
+        resultados = Counter()
+        try:
+            while True:
+                tarefas = reivindicar(trabalhador, lote)
+                if not tarefas:
+                    if options['uma_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                if pool is None:
+                    status = [executar(tarefa) for tarefa in tarefas]
+                else:
+                    if options['processos']:
+                        # Um processo criado por fork não pode herdar a conexão aberta do SQLite
+                        connections.close_all()
+                    status = list(pool.map(executar_no_pool, tarefas))
+                resultados.update(status)
+                if options['verbosity'] >= 2:
+                    for tarefa, final in zip(tarefas, status):
+                        self.stdout.write(f"{tarefa.pk}\t{tarefa.nome}\t{final}")
+        except KeyboardInterrupt:
+            # As tarefas em andamento terminam no shutdown abaixo; as não iniciadas
+            # voltam à fila pelo recuperar_interrompidas da próxima execução
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultados['Concluida']} tarefa(s) concluída(s), {resultados['Pendente']} para nova tentativa, "
+            f"{resultados['Falhou']} com falha."
+        ))
@@ -0,0 +1,35 @@
+# biblioteca/management/commands/reconciliar_contadores.py
+
+from django.core.management.base import BaseCommand
+
+from biblioteca.services import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula os contadores de circulação (empréstimos ativos, totais e "
+        "estoque disponível) a partir dos empréstimos e mostra as divergências."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corrigir', action='store_true', help="Regrava os valores divergentes.")
+        parser.add_argument('--mostrar', type=int, default=20, help="Quantas linhas divergentes listar por modelo.")
+
+    def handle(self, *args, **options):
+        divergencias = reconciliar_contadores(corrigir=options['corrigir'])
+
+        total = 0
+        for modelo, linhas in divergencias.items():
+            total += len(linhas)
+            nome = modelo._meta.verbose_name_plural
+            self.stdout.write(f"{nome}: {len(linhas)} linha(s) divergente(s).")
+            for pk, campos in linhas[:options['mostrar']]:
+                detalhes = ', '.join(f"{campo} {gravado} -> {correto}" for campo, (gravado, correto) in campos.items())
+                self.stdout.write(f"  #{pk}: {detalhes}")
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Contadores em dia."))
+        elif options['corrigir']:
+            self.stdout.write(self.style.SUCCESS(f"{total} linha(s) corrigida(s)."))
+        else:
+            self.stdout.write(self.style.WARNING("Rode com --corrigir para regravar os valores."))
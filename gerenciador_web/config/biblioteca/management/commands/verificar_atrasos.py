@@ -0,0 +1,44 @@
+# biblioteca/management/commands/verificar_atrasos.py
+
+from datetime import date
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from biblioteca.models import Emprestimo
+from biblioteca.services import mensagens_de_atraso
+
+
+class Command(BaseCommand):
+    help = (
+        "Rotina noturna: percorre os empréstimos atrasados em lotes (memória constante), "
+        "envia lembretes opcionais e marca os ativos vencidos como 'Atrasado'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', type=date.fromisoformat, help="Data de referência (AAAA-MM-DD). Padrão: hoje.")
+        parser.add_argument('--lote', type=int, default=2000, help="Quantidade de empréstimos por lote.")
+        parser.add_argument('--lembretes', action='store_true', help="Envia um e-mail de lembrete para cada atraso.")
+        parser.add_argument('--marcar', action='store_true', help="Muda o status dos ativos vencidos para 'Atrasado'.")
+
+    def handle(self, *args, **options):
+        hoje = options['data'] or date.today()
+        atrasados = Emprestimo.objects.atrasados(hoje).select_related('membro', 'livro')
+
+        total = enviados = 0
+        conexao = get_connection() if options['lembretes'] else None
+        for lote in atrasados.em_lotes(options['lote']):
+            total += len(lote)
+            if options['verbosity'] >= 2:
+                for emprestimo in lote:
+                    self.stdout.write(f"{emprestimo.pk}\t{emprestimo.data_prevista}\t{emprestimo}")
+            if conexao is not None:
+                enviados += conexao.send_messages(mensagens_de_atraso(lote, hoje)) or 0
+
+        self.stdout.write(f"{total} empréstimo(s) atrasado(s) em {hoje:%d/%m/%Y}.")
+        if conexao is not None:
+            self.stdout.write(f"{enviados} lembrete(s) enviado(s).")
+        # O UPDATE fica depois da leitura: no SQLite o cursor do iterator não é isolado de escritas
+        if options['marcar']:
+            marcados = Emprestimo.objects.marcar_atrasados(hoje)
+            self.stdout.write(self.style.SUCCESS(f"{marcados} empréstimo(s) marcado(s) como 'Atrasado'."))
@@ -0,0 +1,258 @@
+# biblioteca/middleware.py
+
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+
+logger = logging.getLogger('biblioteca.perfil')
+
+# Limites superiores (ms) das faixas do histograma de tempo por rota; a última é "acima de"
+FAIXAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class EstatisticasDeRotas:
+    """Agregado em memória (por processo) do tempo e das consultas de cada rota."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._rotas = {}
+
+    def registrar(self, rota, total_ms, banco_ms, consultas, duplicadas):
+        with self._trava:
+            dados = self._rotas.get(rota)
+            if dados is None:
+                dados = self._rotas[rota] = {
+                    'requisicoes': 0, 'total_ms': 0.0, 'maximo_ms': 0.0, 'banco_ms': 0.0,
+                    'consultas': 0, 'consultas_duplicadas': 0, 'histograma': [0] * (len(FAIXAS_MS) + 1),
+                }
+            dados['requisicoes'] += 1
+            dados['total_ms'] += total_ms
+            dados['maximo_ms'] = max(dados['maximo_ms'], total_ms)
+            dados['banco_ms'] += banco_ms
+            dados['consultas'] += consultas
+            dados['consultas_duplicadas'] += duplicadas
+            dados['histograma'][bisect_left(FAIXAS_MS, total_ms)] += 1
+
+    def resumo(self):
+        """Cópia serializável em JSON, com médias por requisição."""
+        faixas = [f'<={limite}ms' for limite in FAIXAS_MS] + [f'>{FAIXAS_MS[-1]}ms']
+        with self._trava:
+            rotas = {}
+            for rota, dados in sorted(self._rotas.items()):
+                n = dados['requisicoes']
+                rotas[rota] = {
+                    'requisicoes': n,
+                    'media_ms': round(dados['total_ms'] / n, 2),
+                    'maximo_ms': round(dados['maximo_ms'], 2),
+                    'media_banco_ms': round(dados['banco_ms'] / n, 2),
+                    'media_consultas': round(dados['consultas'] / n, 2),
+                    'consultas_duplicadas': dados['consultas_duplicadas'],
+                    'histograma': dict(zip(faixas, dados['histograma'])),
+                }
+        return rotas
+
+    def zerar(self):
+        with self._trava:
+            self._rotas.clear()
+
+
+ESTATISTICAS = EstatisticasDeRotas()
+
+
+class _Coletor:
+    """execute_wrapper que mede cada consulta e conta repetições do mesmo SQL."""
+
+    def __init__(self):
+        self.tempo = 0.0
+        self.consultas = 0
+        self.textos = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo += time.perf_counter() - inicio
+            self.consultas += 1
+            # O SQL ainda tem os marcadores (%s): mesma consulta com parâmetros diferentes = N+1
+            self.textos[sql] += 1
+
+
+# Coletor da requisição em andamento. As conexões são por thread, e as
+# consultas do ORM assíncrono rodam na conexão da thread do sync_to_async, não
+# na do event loop; essa thread herda o contexto, então o wrapper abaixo,
+# instalado em toda conexão aberta, lê daqui a quem atribuir cada consulta.
+_coletor_atual = contextvars.ContextVar('biblioteca_perfil_coletor', default=None)
+
+
+def _medir(execute, sql, params, many, context):
+    coletor = _coletor_atual.get()
+    if coletor is None:
+        return execute(sql, params, many, context)
+    return coletor(execute, sql, params, many, context)
+
+
+def _instalar(connection, **kwargs):
+    """Receptor do connection_created: põe _medir (uma vez) na conexão."""
+    if _medir not in connection.execute_wrappers:
+        # No início da lista: o execute_wrapper() do Django remove o último
+        # da lista ao sair, e este fica instalado para sempre
+        connection.execute_wrappers.insert(0, _medir)
+
+
+class PerfilMiddleware:
+    """
+    Mede cada requisição: tempo total, tempo no banco, número de consultas e
+    consultas repetidas (sinal de N+1). Publica os valores em cabeçalhos da
+    resposta e no agregado por rota exibido em /perfil/.
+
+    Só fica ativo com BIBLIOTECA_PERFIL = True; desligado, o Django nem o
+    coloca na cadeia de middlewares (MiddlewareNotUsed), então o custo é zero.
+    Funciona nos dois modos (WSGI e ASGI) sem forçar as views async para o
+    pool de threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BIBLIOTECA_PERFIL', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.limite_n_mais_um = getattr(settings, 'BIBLIOTECA_PERFIL_LIMITE_N_MAIS_UM', 5)
+        # Conexões abertas daqui em diante, em qualquer thread
+        connection_created.connect(_instalar)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Conexões desta thread que já estavam abertas (ex: CONN_MAX_AGE)
+        for conexao in connections.all():
+            _instalar(conexao)
+        coletor = _Coletor()
+        inicio = time.perf_counter()
+        token = _coletor_atual.set(coletor)
+        try:
+            response = self.get_response(request)
+        finally:
+            _coletor_atual.reset(token)
+        return self._registrar(request, response, coletor, inicio)
+
+    async def __acall__(self, request):
+        coletor = _Coletor()
+        inicio = time.perf_counter()
+        token = _coletor_atual.set(coletor)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _coletor_atual.reset(token)
+        return self._registrar(request, response, coletor, inicio)
+
+    def _registrar(self, request, response, coletor, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        banco_ms = coletor.tempo * 1000
+
+        repetidas = {sql: n for sql, n in coletor.textos.items() if n > 1}
+        duplicadas = sum(n - 1 for n in repetidas.values())
+        response['X-Consultas'] = str(coletor.consultas)
+        response['X-Consultas-Duplicadas'] = str(duplicadas)
+        response['Server-Timing'] = f'db;dur={banco_ms:.2f}, total;dur={total_ms:.2f}'
+
+        rota = getattr(request.resolver_match, 'view_name', None) or 'sem_rota'
+        if repetidas and max(repetidas.values()) >= self.limite_n_mais_um:
+            sql, vezes = max(repetidas.items(), key=lambda item: item[1])
+            logger.warning('Possível N+1 em %s: consulta repetida %d vezes: %s', rota, vezes, sql)
+
+        ESTATISTICAS.registrar(rota, total_ms, banco_ms, coletor.consultas, duplicadas)
+        return response
+
+
+class EstaticosMiddleware:
+    """
+    Serve o STATIC_ROOT gerado pelo collectstatic (ver estaticos.py) de
+    dentro do processo, antes de sessão, autenticação e URLs: versão .br ou
+    .gz conforme o Accept-Encoding, cache de um ano para os nomes com hash
+    e 304 pelo ETag para os demais.
+
+    Só fica ativo com BIBLIOTECA_ESTATICOS_SERVIR = True; o índice dos
+    arquivos é montado uma vez, na subida, e um arquivo novo só aparece
+    depois de reiniciar (como num deploy). Caminhos fora do índice seguem
+    para o Django normalmente.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BIBLIOTECA_ESTATICOS_SERVIR', False):
+            raise MiddlewareNotUsed
+        # Import local: storage e índice só quando o middleware está em uso
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        from . import estaticos
+
+        self.get_response = get_response
+        self.prefixo = settings.STATIC_URL
+        if not settings.STATIC_ROOT or not self.prefixo.startswith('/'):
+            # Sem diretório gerado, ou estáticos numa CDN: nada a servir aqui
+            raise MiddlewareNotUsed
+        imutaveis = getattr(staticfiles_storage, 'hashed_files', {}).values()
+        self.arquivos = estaticos.indexar(settings.STATIC_ROOT, imutaveis)
+        self.aceitas = estaticos.aceitas
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self._servir(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self._servir(request)
+        return response if response is not None else await self.get_response(request)
+
+    def _servir(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefixo):
+            return None
+        estatico = self.arquivos.get(request.path_info[len(self.prefixo):])
+        if estatico is None:
+            return None
+
+        caminho, tamanho, etag, codificacao = estatico.caminho, estatico.tamanho, estatico.etag, None
+        aceitas = self.aceitas(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for nome, (caminho_comprimido, tamanho_comprimido, etag_comprimido) in estatico.comprimidos.items():
+            if nome in aceitas:
+                caminho, tamanho, etag, codificacao = caminho_comprimido, tamanho_comprimido, etag_comprimido, nome
+                break
+
+        pedidas = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if '*' in pedidas or etag in (pedida.removeprefix('W/') for pedida in pedidas):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=estatico.tipo)
+            response['Content-Length'] = tamanho
+        else:
+            response = FileResponse(open(caminho, 'rb'), content_type=estatico.tipo)
+            # O FileResponse põe o nome do arquivo (.gz/.br) num Content-Disposition
+            del response['Content-Disposition']
+        response['ETag'] = etag
+        response['Last-Modified'] = estatico.modificado
+        response['Cache-Control'] = estatico.cache_control
+        if codificacao:
+            response['Content-Encoding'] = codificacao
+        if estatico.comprimidos:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='livro',
+            constraint=models.CheckConstraint(condition=models.Q(('quantidade_disponivel__gte', 0)), name='livro_estoque_nao_negativo'),
+        ),
+        migrations.AddConstraint(
+            model_name='livro',
+            constraint=models.CheckConstraint(condition=models.Q(('quantidade_disponivel__lte', models.F('quantidade_total'))), name='livro_estoque_ate_total'),
+        ),
+    ]
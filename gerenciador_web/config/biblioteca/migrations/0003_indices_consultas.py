@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0002_livro_constraints_estoque'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['status', 'data_prevista'], name='emprestimo_status_prevista_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(condition=models.Q(('data_devolucao__isnull', True)), fields=['data_prevista'], name='emprestimo_aberto_prevista_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['-data_saida', '-id'], name='emprestimo_saida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['status', 'data_saida'], name='emprestimo_status_saida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livro',
+            index=models.Index(fields=['titulo', 'id'], name='livro_titulo_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livro',
+            index=models.Index(fields=['ano'], name='livro_ano_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livro',
+            index=models.Index(fields=['editora'], name='livro_editora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membro',
+            index=models.Index(fields=['tipo'], name='membro_tipo_idx'),
+        ),
+    ]
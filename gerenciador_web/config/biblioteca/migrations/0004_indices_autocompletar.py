@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:36
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0003_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='livro',
+            index=models.Index(django.db.models.functions.comparison.Collate('titulo', 'NOCASE'), models.F('id'), name='livro_titulo_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membro',
+            index=models.Index(django.db.models.functions.comparison.Collate('nome', 'NOCASE'), models.F('id'), name='membro_nome_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membro',
+            index=models.Index(django.db.models.functions.comparison.Collate('contato', 'NOCASE'), models.F('id'), name='membro_contato_nocase_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Índice de busca textual (SQLite FTS5) para o acervo
+
+from django.db import migrations
+
+
+TABELA = 'biblioteca_livro_busca'
+
+# Triggers: o índice acompanha qualquer escrita, inclusive bulk_create e update().
+# Migrações que recriam as tabelas de Livro ou Autor no SQLite (AddField, AlterField...)
+# apagam os triggers: elas devem rodar REMOVER_TRIGGERS antes e TRIGGERS depois.
+TRIGGERS = [
+    f"""CREATE TRIGGER {TABELA}_ai AFTER INSERT ON biblioteca_livro BEGIN
+        INSERT INTO {TABELA} (rowid, titulo, autor, editora, ano)
+        SELECT NEW.id, NEW.titulo, a.nome, NEW.editora, NEW.ano
+        FROM biblioteca_autor a WHERE a.id = NEW.autor_id;
+    END""",
+    f"""CREATE TRIGGER {TABELA}_ad AFTER DELETE ON biblioteca_livro BEGIN
+        DELETE FROM {TABELA} WHERE rowid = OLD.id;
+    END""",
+    # Só colunas indexadas: baixas e devoluções de estoque não mexem no índice
+    f"""CREATE TRIGGER {TABELA}_au AFTER UPDATE OF titulo, autor_id, editora, ano ON biblioteca_livro BEGIN
+        DELETE FROM {TABELA} WHERE rowid = OLD.id;
+        INSERT INTO {TABELA} (rowid, titulo, autor, editora, ano)
+        SELECT NEW.id, NEW.titulo, a.nome, NEW.editora, NEW.ano
+        FROM biblioteca_autor a WHERE a.id = NEW.autor_id;
+    END""",
+    f"""CREATE TRIGGER {TABELA}_autor_au AFTER UPDATE OF nome ON biblioteca_autor BEGIN
+        UPDATE {TABELA} SET autor = NEW.nome
+        WHERE rowid IN (SELECT id FROM biblioteca_livro WHERE autor_id = NEW.id);
+    END""",
+]
+
+CRIAR = [
+    # remove_diacritics 2: "memorias" encontra "Memórias"
+    f"""CREATE VIRTUAL TABLE {TABELA} USING fts5(
+        titulo, autor, editora, ano, tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""INSERT INTO {TABELA} (rowid, titulo, autor, editora, ano)
+        SELECT l.id, l.titulo, a.nome, l.editora, l.ano
+        FROM biblioteca_livro l JOIN biblioteca_autor a ON a.id = l.autor_id""",
+    *TRIGGERS,
+]
+
+REMOVER_TRIGGERS = [
+    f"DROP TRIGGER IF EXISTS {TABELA}_autor_au",
+    f"DROP TRIGGER IF EXISTS {TABELA}_au",
+    f"DROP TRIGGER IF EXISTS {TABELA}_ad",
+    f"DROP TRIGGER IF EXISTS {TABELA}_ai",
+]
+
+REMOVER = [
+    *REMOVER_TRIGGERS,
+    f"DROP TABLE IF EXISTS {TABELA}",
+]
+
+
+def executar(comandos):
+    def operacao(apps, schema_editor):
+        # FTS5 é específico do SQLite; nos outros bancos a busca cai no LIKE
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in comandos:
+            schema_editor.execute(sql)
+    return operacao
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0004_indices_autocompletar'),
+    ]
+
+    operations = [
+        migrations.RunPython(executar(CRIAR), executar(REMOVER)),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:51
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# AddField recria a tabela de Livro no SQLite, o que apagaria os triggers da busca
+busca_fts = import_module('biblioteca.migrations.0005_livro_busca_fts')
+
+
+def _contagem(emprestimos, campo):
+    return Coalesce(Subquery(
+        emprestimos.filter(**{campo: OuterRef('pk')}).order_by()
+        .values(campo).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def preencher_contadores(apps, schema_editor):
+    """Calcula os contadores a partir do histórico (um UPDATE por tabela)."""
+    Emprestimo = apps.get_model('biblioteca', 'Emprestimo')
+    todos = Emprestimo.objects.all()
+    abertos = todos.filter(status__in=["Ativo", "Atrasado"])
+    apps.get_model('biblioteca', 'Livro').objects.update(
+        emprestimos_ativos=_contagem(abertos, 'livro'),
+        vezes_emprestado=_contagem(todos, 'livro'),
+    )
+    apps.get_model('biblioteca', 'Membro').objects.update(
+        emprestimos_ativos=_contagem(abertos, 'membro'),
+        total_emprestimos=_contagem(todos, 'membro'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0005_livro_busca_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            busca_fts.executar(busca_fts.REMOVER_TRIGGERS), busca_fts.executar(busca_fts.TRIGGERS)
+        ),
+        migrations.AddField(
+            model_name='livro',
+            name='emprestimos_ativos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='livro',
+            name='vezes_emprestado',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='membro',
+            name='emprestimos_ativos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='membro',
+            name='total_emprestimos',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+        migrations.RunPython(
+            busca_fts.executar(busca_fts.TRIGGERS), busca_fts.executar(busca_fts.REMOVER_TRIGGERS)
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# View dos empréstimos em uso + arquivados (modelo HistoricoEmprestimo).
+# Migrações que recriam a tabela de Emprestimo no SQLite (AddField, AlterField...)
+# devem rodar REMOVER_VISAO antes e CRIAR_VISAO depois, como os triggers da busca.
+CRIAR_VISAO = """
+    CREATE VIEW biblioteca_historico_emprestimo AS
+    SELECT id, membro_id, livro_id, data_saida, data_prevista, data_devolucao, status,
+           FALSE AS arquivado
+    FROM biblioteca_emprestimo
+    UNION ALL
+    SELECT id, membro_id, livro_id, data_saida, data_prevista, data_devolucao, 'Devolvido',
+           TRUE
+    FROM biblioteca_emprestimoarquivado
+"""
+
+REMOVER_VISAO = "DROP VIEW IF EXISTS biblioteca_historico_emprestimo"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0006_contadores_circulacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoEmprestimo',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('data_saida', models.DateField()),
+                ('data_prevista', models.DateField()),
+                ('data_devolucao', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('arquivado', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'biblioteca_historico_emprestimo',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='EmprestimoArquivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('data_saida', models.DateField()),
+                ('data_prevista', models.DateField()),
+                ('data_devolucao', models.DateField()),
+                ('livro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emprestimos_arquivados', to='biblioteca.livro')),
+                ('membro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emprestimos_arquivados', to='biblioteca.membro')),
+            ],
+        ),
+        migrations.RunSQL(CRIAR_VISAO, REMOVER_VISAO),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:06
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+
+def preencher_resumos(apps, schema_editor):
+    """
+    Monta os resumos a partir dos empréstimos já registrados, em uso e
+    arquivados, como o comando recalcular_estatisticas (que usa os modelos
+    atuais e por isso não é chamado daqui).
+    """
+    Livro = apps.get_model('biblioteca', 'Livro')
+    CirculacaoDiaria = apps.get_model('biblioteca', 'CirculacaoDiaria')
+    EmprestimosDoLivroNoDia = apps.get_model('biblioteca', 'EmprestimosDoLivroNoDia')
+    EstoquePorEditora = apps.get_model('biblioteca', 'EstoquePorEditora')
+
+    emprestimos, devolucoes, atrasadas = Counter(), Counter(), Counter()
+    por_livro, emprestadas = Counter(), Counter()
+    for nome in ('Emprestimo', 'EmprestimoArquivado'):
+        historico = apps.get_model('biblioteca', nome).objects.order_by()
+        for dia, tipo, editora, n in historico.values_list(
+            'data_saida', 'membro__tipo', 'livro__editora',
+        ).annotate(n=Count('pk')):
+            emprestimos[dia, tipo, editora] += n
+        for dia, tipo, editora, n, atrasos in historico.filter(data_devolucao__isnull=False).values_list(
+            'data_devolucao', 'membro__tipo', 'livro__editora',
+        ).annotate(n=Count('pk'), atrasos=Count('pk', filter=Q(data_devolucao__gt=F('data_prevista')))):
+            devolucoes[dia, tipo, editora] += n
+            atrasadas[dia, tipo, editora] += atrasos
+        for dia, livro_id, n in historico.values_list('data_saida', 'livro_id').annotate(n=Count('pk')):
+            por_livro[dia, livro_id] += n
+        for editora, n in historico.filter(data_devolucao__isnull=True).values_list(
+            'livro__editora',
+        ).annotate(n=Count('pk')):
+            emprestadas[editora] += n
+
+    CirculacaoDiaria.objects.bulk_create([
+        CirculacaoDiaria(
+            dia=dia, tipo_membro=tipo, editora=editora, emprestimos=emprestimos[dia, tipo, editora],
+            devolucoes=devolucoes[dia, tipo, editora], devolucoes_atrasadas=atrasadas[dia, tipo, editora],
+        )
+        for dia, tipo, editora in sorted(emprestimos.keys() | devolucoes.keys())
+    ], batch_size=500)
+    EmprestimosDoLivroNoDia.objects.bulk_create([
+        EmprestimosDoLivroNoDia(dia=dia, livro_id=livro_id, emprestimos=n)
+        for (dia, livro_id), n in sorted(por_livro.items())
+    ], batch_size=500)
+    copias = dict(Livro.objects.order_by().values_list('editora').annotate(copias=Sum('quantidade_total')))
+    EstoquePorEditora.objects.bulk_create([
+        EstoquePorEditora(editora=editora, copias=copias.get(editora, 0), emprestadas=emprestadas[editora])
+        for editora in sorted(copias.keys() | emprestadas.keys())
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0007_arquivo_emprestimos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstoquePorEditora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('editora', models.CharField(max_length=100, unique=True)),
+                ('copias', models.IntegerField(default=0)),
+                ('emprestadas', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CirculacaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo_membro', models.CharField(max_length=30)),
+                ('editora', models.CharField(max_length=100)),
+                ('emprestimos', models.IntegerField(default=0)),
+                ('devolucoes', models.IntegerField(default=0)),
+                ('devolucoes_atrasadas', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'tipo_membro', 'editora'), name='circulacao_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmprestimosDoLivroNoDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('emprestimos', models.IntegerField(default=0)),
+                ('livro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='biblioteca.livro')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'livro'), name='emprestimos_livro_dia_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0008_estatisticas_circulacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(default='Aguardando', max_length=20)),
+                ('separada_ate', models.DateField(blank=True, null=True)),
+                ('notificada', models.BooleanField(default=False, editable=False)),
+                ('livro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='biblioteca.livro')),
+                ('membro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='biblioteca.membro')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['livro', 'status', 'id'], name='reserva_fila_idx'), models.Index(fields=['status', 'separada_ate'], name='reserva_status_prazo_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['Aguardando', 'Separada'])), fields=('membro', 'livro'), name='reserva_em_andamento_unica', violation_error_message='Este membro já tem uma reserva em andamento para este livro.')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0009_reservas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('chave', models.CharField(blank=True, max_length=200, null=True)),
+                ('prioridade', models.SmallIntegerField(default=0)),
+                ('status', models.CharField(default='Pendente', max_length=20)),
+                ('tentativas', models.IntegerField(default=0)),
+                ('max_tentativas', models.IntegerField(default=3)),
+                ('executar_apos', models.DateTimeField(default=django.utils.timezone.now)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('trabalhador', models.CharField(blank=True, max_length=100)),
+                ('erro', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', '-prioridade', 'id'], name='tarefa_fila_idx'), models.Index(fields=['status', 'iniciada_em'], name='tarefa_status_inicio_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'Pendente')), fields=('chave',), name='tarefa_chave_pendente_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0010_fila_de_tarefas'),
+    ]
+
+    operations = [
+        migrations.AlterConstraint(
+            model_name='livro',
+            name='livro_estoque_nao_negativo',
+            constraint=models.CheckConstraint(condition=models.Q(('quantidade_disponivel__gte', 0)), name='livro_estoque_nao_negativo', violation_error_message='A quantidade disponível não pode ser negativa.'),
+        ),
+        migrations.AlterConstraint(
+            model_name='livro',
+            name='livro_estoque_ate_total',
+            constraint=models.CheckConstraint(condition=models.Q(('quantidade_disponivel__lte', models.F('quantidade_total'))), name='livro_estoque_ate_total', violation_error_message='A quantidade disponível não pode ser maior que a quantidade total.'),
+        ),
+    ]
@@ -1,6 +1,11 @@
 # biblioteca/models.py
 
+import operator
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Collate
+from django.utils import timezone
 from datetime import timedelta, date
 
 
@@ -10,6 +15,47 @@ def data_retorno_padrao():
     return date.today() + timedelta(days=7)
 
 
+# Operadores de comparação que _avaliar_condicao() sabe conferir em Python
+_COMPARACOES = {
+    'exact': operator.eq, 'gt': operator.gt, 'gte': operator.ge, 'lt': operator.lt, 'lte': operator.le,
+}
+
+
+def _avaliar_condicao(condicao, instancia):
+    """
+    Avalia em Python a condição de uma CheckConstraint feita só de
+    comparações entre campos da instância e valores ou F('campo'), sem
+    consultar o banco. Retorna (válida, campos usados), ou None se a
+    condição tiver algo além disso (e aí quem decide é o banco).
+    """
+    resultados, campos = [], set()
+    for filho in condicao.children:
+        if isinstance(filho, models.Q):
+            avaliacao = _avaliar_condicao(filho, instancia)
+            if avaliacao is None:
+                return None
+            resultado, usados = avaliacao
+            campos |= usados
+        else:
+            caminho, valor = filho
+            campo, _, lookup = caminho.partition('__')
+            comparar = _COMPARACOES.get(lookup or 'exact')
+            if comparar is None:
+                return None
+            campos.add(campo)
+            if isinstance(valor, models.F):
+                campos.add(valor.name)
+                valor = getattr(instancia, valor.name)
+            elif hasattr(valor, 'resolve_expression'):
+                return None
+            atual = getattr(instancia, campo)
+            # Com NULL o CHECK do banco não falha
+            resultado = atual is None or valor is None or comparar(atual, valor)
+        resultados.append(resultado)
+    valida = any(resultados) if condicao.connector == models.Q.OR else all(resultados)
+    return valida != condicao.negated, campos
+
+
 class Autor(models.Model):
     """Modelo para representar um Autor de livros."""
     nome = models.CharField(max_length=100)
@@ -27,6 +73,70 @@ class Livro(models.Model):
     ano = models.IntegerField()
     quantidade_total = models.IntegerField()
     quantidade_disponivel = models.IntegerField()
+    # Contadores de circulação: mantidos pelos serviços de empréstimo/devolução
+    # (nunca editados à mão) e conferidos pelo comando reconciliar_contadores
+    emprestimos_ativos = models.IntegerField(default=0, editable=False)
+    vezes_emprestado = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Listagem do acervo: ORDER BY titulo, id e paginação por cursor (titulo, id)
+            models.Index(fields=['titulo', 'id'], name='livro_titulo_id_idx'),
+            # Filtros laterais do admin (list_filter)
+            models.Index(fields=['ano'], name='livro_ano_idx'),
+            models.Index(fields=['editora'], name='livro_editora_idx'),
+            # Autocompletar por prefixo: istartswith vira LIKE 'x%', que no SQLite
+            # só usa índice com collation NOCASE (o LIKE não diferencia maiúsculas)
+            models.Index(Collate('titulo', 'NOCASE'), 'id', name='livro_titulo_nocase_idx'),
+        ]
+        constraints = [
+            # A regra do estoque fica no banco, não só na validação do formulário
+            models.CheckConstraint(
+                condition=models.Q(quantidade_disponivel__gte=0),
+                name='livro_estoque_nao_negativo',
+                violation_error_message="A quantidade disponível não pode ser negativa.",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(quantidade_disponivel__lte=models.F('quantidade_total')),
+                name='livro_estoque_ate_total',
+                violation_error_message="A quantidade disponível não pode ser maior que a quantidade total.",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        livro = super().from_db(db, field_names, values)
+        # Editora como está no banco: se um save() a trocar, signals.livro_alterado
+        # passa as cópias e os empréstimos em aberto do resumo da antiga para a nova
+        livro._editora_no_banco = livro.__dict__.get('editora')
+        return livro
+
+    def validate_constraints(self, exclude=None):
+        """
+        As CheckConstraints simples (como as de estoque) são conferidas em
+        Python a partir da própria condição: o padrão do Django (Q.check) faz
+        um SELECT por constraint a cada validação de formulário, o que pesa em
+        formsets do admin e na importação em lote. As demais vão para o banco.
+        """
+        erros = []
+        for constraint in self._meta.constraints:
+            avaliacao = None
+            if isinstance(constraint, models.CheckConstraint):
+                avaliacao = _avaliar_condicao(constraint.condition, self)
+            if avaliacao is None:
+                try:
+                    constraint.validate(Livro, self, exclude=exclude)
+                except ValidationError as e:
+                    erros.append(e)
+                continue
+            valida, campos = avaliacao
+            # Como no Django: campo excluído (já com erro) não é conferido de novo
+            if not valida and not (exclude and campos & set(exclude)):
+                erros.append(ValidationError(
+                    constraint.get_violation_error_message(), code=constraint.violation_error_code
+                ))
+        if erros:
+            raise ValidationError(erros)
 
     def __str__(self):
         return self.titulo
@@ -37,11 +147,64 @@ class Membro(models.Model):
     nome = models.CharField(max_length=100)
     contato = models.EmailField()
     tipo = models.CharField(max_length=30)
+    # Contadores de circulação (ver Livro)
+    emprestimos_ativos = models.IntegerField(default=0, editable=False)
+    total_emprestimos = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo'], name='membro_tipo_idx'),
+            models.Index(Collate('nome', 'NOCASE'), 'id', name='membro_nome_nocase_idx'),
+            models.Index(Collate('contato', 'NOCASE'), 'id', name='membro_contato_nocase_idx'),
+        ]
 
     def __str__(self):
         return self.nome
 
 
+class EmprestimoQuerySet(models.QuerySet):
+    """Consultas reutilizáveis sobre empréstimos (situação e processamento em lote)."""
+
+    def em_aberto(self):
+        """
+        Empréstimos ainda não devolvidos ("Ativo" ou "Atrasado"). Filtra por
+        data_devolucao IS NULL, a condição do índice parcial
+        emprestimo_aberto_prevista_idx: com status IN (...) o SQLite não o usa.
+        """
+        return self.filter(data_devolucao__isnull=True)
+
+    def atrasados(self, hoje=None):
+        """Empréstimos em aberto cuja data prevista de devolução já passou."""
+        return self.em_aberto().filter(data_prevista__lt=hoje or date.today())
+
+    def marcar_atrasados(self, hoje=None):
+        """Muda de "Ativo" para "Atrasado" com um único UPDATE; retorna quantos mudaram."""
+        # Import local: cache.py importa este módulo
+        from . import cache
+
+        marcados = self.filter(
+            status="Ativo", data_prevista__lt=hoje or date.today()
+        ).update(status="Atrasado")
+        if marcados:
+            cache.invalidar_apos_commit(cache.EMPRESTIMOS)
+        return marcados
+
+    def em_lotes(self, tamanho=2000):
+        """
+        Percorre o queryset em listas de até `tamanho` objetos usando um cursor
+        do banco (iterator), sem carregar a tabela inteira na memória.
+        Combine com select_related() para trazer membro e livro no mesmo SELECT.
+        """
+        lote = []
+        for emprestimo in self.iterator(chunk_size=tamanho):
+            lote.append(emprestimo)
+            if len(lote) == tamanho:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+
 class Emprestimo(models.Model):
     """Modelo para registrar o histórico e status dos empréstimos."""
     membro = models.ForeignKey(Membro, on_delete=models.CASCADE)
@@ -52,13 +215,213 @@ class Emprestimo(models.Model):
     data_devolucao = models.DateField(blank=True, null=True)
     status = models.CharField(max_length=20, default="Ativo")
 
+    objects = EmprestimoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Empréstimos ativos ordenados pela data prevista (detecção de atrasos)
+            models.Index(fields=['status', 'data_prevista'], name='emprestimo_status_prevista_idx'),
+            # Índice parcial: só empréstimos em aberto (ainda sem devolução), por data prevista.
+            # A condição usa IS NULL (e não status = 'Ativo') porque o SQLite só aproveita
+            # índice parcial quando a condição aparece literal na consulta, sem parâmetros.
+            models.Index(
+                fields=['data_prevista'],
+                condition=models.Q(data_devolucao__isnull=True),
+                name='emprestimo_aberto_prevista_idx',
+            ),
+            # Changelist do admin: ordering = ('-data_saida',) com desempate por id
+            models.Index(fields=['-data_saida', '-id'], name='emprestimo_saida_idx'),
+            # Filtro por status combinado com o período de saída
+            models.Index(fields=['status', 'data_saida'], name='emprestimo_status_saida_idx'),
+        ]
+
     def salvar_devolucao(self):
         """Método para registrar a devolução de um livro e atualizar o estoque."""
-        self.data_devolucao = date.today()
-        self.status = "Devolvido"
-        self.livro.quantidade_disponivel += 1 
-        self.livro.save()
-        self.save()
+        # Import local: services.py importa este módulo
+        from .services import registrar_devolucao
+
+        if registrar_devolucao(self, date.today()) and Emprestimo.livro.is_cached(self):
+            # O estoque foi alterado no banco; atualiza a cópia em memória
+            self.livro.refresh_from_db(fields=['quantidade_disponivel', 'emprestimos_ativos'])
+
+    def __str__(self):
+        return f"{self.livro.titulo} - {self.membro.nome}"
+
+
+# --- Reservas (fila de espera por livro) ---
+#
+# Um membro que encontra o livro esgotado entra na fila (status "Aguardando").
+# Cada cópia devolvida vai primeiro para a reserva mais antiga da fila, que
+# passa a "Separada" até separada_ate; a cópia separada não volta ao estoque
+# (quantidade_disponivel) e só sai da estante no empréstimo desse membro. A
+# ordem da fila é a do id, e o índice (livro, status, id) entrega o próximo da
+# vez com uma busca, seja a fila de 1 ou de 10 mil reservas.
+
+class Reserva(models.Model):
+    """Reserva de um livro por um membro: "Aguardando", "Separada", "Atendida", "Expirada" ou "Cancelada"."""
+    membro = models.ForeignKey(Membro, on_delete=models.CASCADE, related_name='reservas')
+    livro = models.ForeignKey(Livro, on_delete=models.CASCADE, related_name='reservas')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, default="Aguardando")
+    # Até quando a cópia separada espera pelo membro (só nas reservas "Separada")
+    separada_ate = models.DateField(blank=True, null=True)
+    # Aviso de cópia separada já enviado (comando processar_reservas)
+    notificada = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # Próximo da fila: WHERE livro_id = ? AND status = 'Aguardando' ORDER BY id LIMIT n
+            models.Index(fields=['livro', 'status', 'id'], name='reserva_fila_idx'),
+            # Expiração e avisos em lote: separadas por prazo
+            models.Index(fields=['status', 'separada_ate'], name='reserva_status_prazo_idx'),
+        ]
+        constraints = [
+            # Uma reserva em andamento por membro e livro
+            models.UniqueConstraint(
+                fields=['membro', 'livro'],
+                condition=models.Q(status__in=["Aguardando", "Separada"]),
+                name='reserva_em_andamento_unica',
+                violation_error_message="Este membro já tem uma reserva em andamento para este livro.",
+            ),
+        ]
+
+    def posicao_na_fila(self):
+        """Posição (1, 2, ...) da reserva "Aguardando" na fila do livro; None nos outros status."""
+        if self.status != "Aguardando":
+            return None
+        return Reserva.objects.filter(livro_id=self.livro_id, status="Aguardando", pk__lte=self.pk).count()
+
+    def __str__(self):
+        return f"{self.livro.titulo} - {self.membro.nome} ({self.status})"
+
+
+# --- Arquivo de empréstimos antigos ---
+#
+# Empréstimos devolvidos há mais tempo que BIBLIOTECA_ARQUIVAR_APOS_DIAS saem
+# da tabela de Emprestimo (arquivamento.arquivar_emprestimos), que fica só com
+# os recentes e os em aberto: changelist do admin, filtros por data e buscas
+# de empréstimos ativos não crescem com os anos de histórico.
+
+class EmprestimoArquivado(models.Model):
+    """Empréstimo devolvido e arquivado: mesmo id, sem status (é sempre "Devolvido")."""
+    id = models.IntegerField(primary_key=True)
+    membro = models.ForeignKey(Membro, on_delete=models.CASCADE, related_name='emprestimos_arquivados')
+    livro = models.ForeignKey(Livro, on_delete=models.CASCADE, related_name='emprestimos_arquivados')
+    data_saida = models.DateField()
+    data_prevista = models.DateField()
+    data_devolucao = models.DateField()
+
+    def __str__(self):
+        return f"{self.livro.titulo} - {self.membro.nome} (arquivado)"
+
+
+class HistoricoEmprestimo(models.Model):
+    """
+    Todos os empréstimos, em uso e arquivados: view SQL (UNION ALL das duas
+    tabelas), só leitura. Relatórios de histórico consultam este modelo como
+    qualquer outro (filter, select_related, values_list) sem saber onde a
+    linha está guardada.
+    """
+    id = models.IntegerField(primary_key=True)
+    membro = models.ForeignKey(
+        Membro, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    livro = models.ForeignKey(
+        Livro, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    data_saida = models.DateField()
+    data_prevista = models.DateField()
+    data_devolucao = models.DateField(blank=True, null=True)
+    status = models.CharField(max_length=20)
+    arquivado = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'biblioteca_historico_emprestimo'
+
+    def __str__(self):
+        return f"{self.livro.titulo} - {self.membro.nome}"
+
+
+# --- Estatísticas de circulação (resumos diários) ---
+#
+# Mantidos pelos serviços de empréstimo/devolução na mesma transação do evento
+# (estatisticas.py) e reconstruídos do histórico pelo comando
+# recalcular_estatisticas. O painel lê só estas tabelas: o tempo do relatório
+# depende do período mostrado, não do tamanho do histórico.
+
+class CirculacaoDiaria(models.Model):
+    """Empréstimos, devoluções e devoluções em atraso de um dia, por tipo de membro e editora."""
+    dia = models.DateField()
+    tipo_membro = models.CharField(max_length=30)
+    editora = models.CharField(max_length=100)
+    emprestimos = models.IntegerField(default=0)
+    devolucoes = models.IntegerField(default=0)
+    devolucoes_atrasadas = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'tipo_membro', 'editora'], name='circulacao_diaria_unica'),
+        ]
+
+
+class EmprestimosDoLivroNoDia(models.Model):
+    """Quantos empréstimos o livro teve no dia (ranking dos mais emprestados)."""
+    dia = models.DateField()
+    livro = models.ForeignKey(Livro, on_delete=models.CASCADE, related_name='+')
+    emprestimos = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'livro'], name='emprestimos_livro_dia_unico'),
+        ]
+
+
+class EstoquePorEditora(models.Model):
+    """Situação atual do estoque de cada editora: cópias no acervo e cópias emprestadas."""
+    editora = models.CharField(max_length=100, unique=True)
+    copias = models.IntegerField(default=0)
+    emprestadas = models.IntegerField(default=0)
+
+
+# --- Fila de tarefas ---
+#
+# Trabalho que não precisa acontecer dentro da requisição (avisos por e-mail,
+# recálculos, relatórios) vira uma linha de Tarefa, gravada na mesma transação
+# que a originou, e é executado pelo comando processar_tarefas (tarefas.py).
+# Sem broker externo: a fila é o próprio banco.
+
+class Tarefa(models.Model):
+    """Execução adiada de uma função registrada em tarefas.py: "Pendente", "Executando", "Concluida" ou "Falhou"."""
+    nome = models.CharField(max_length=100)
+    parametros = models.JSONField(default=dict, blank=True)
+    # Tarefas pendentes com a mesma chave são uma só (a segunda não é enfileirada)
+    chave = models.CharField(max_length=200, blank=True, null=True)
+    # Maior primeiro; empates por ordem de chegada (id)
+    prioridade = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=20, default="Pendente")
+    tentativas = models.IntegerField(default=0)
+    max_tentativas = models.IntegerField(default=3)
+    executar_apos = models.DateTimeField(default=timezone.now)
+    criada_em = models.DateTimeField(auto_now_add=True)
+    iniciada_em = models.DateTimeField(blank=True, null=True)
+    concluida_em = models.DateTimeField(blank=True, null=True)
+    # Quem reivindicou a tarefa (host:pid do processar_tarefas)
+    trabalhador = models.CharField(max_length=100, blank=True)
+    erro = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Reivindicação: WHERE status = 'Pendente' ORDER BY prioridade DESC, id LIMIT n
+            models.Index(fields=['status', '-prioridade', 'id'], name='tarefa_fila_idx'),
+            # Tarefas interrompidas (Executando há muito tempo) e limpeza das concluídas
+            models.Index(fields=['status', 'iniciada_em'], name='tarefa_status_inicio_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['chave'], condition=models.Q(status="Pendente"), name='tarefa_chave_pendente_unica',
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.livro.titulo} - {self.membro.nome}"
\ No newline at end of file
+        return f"{self.nome} #{self.pk} ({self.status})"
@@ -0,0 +1,136 @@
+# biblioteca/paginacao.py
+
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+
+class CursorInvalido(ValueError):
+    """Erro levantado quando o cursor recebido na URL não pode ser decodificado."""
+
+
+def codificar_cursor(valores, direcao='proxima'):
+    """Transforma os valores da chave (ex: titulo, id) em um token seguro para URL."""
+    bruto = json.dumps({'d': direcao, 'v': list(valores)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Operação inversa de codificar_cursor(); devolve (direcao, valores)."""
+    try:
+        preenchido = token + '=' * (-len(token) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(preenchido.encode()))
+        direcao, valores = dados['d'], dados['v']
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise CursorInvalido(token) from exc
+    if direcao not in ('proxima', 'anterior') or not isinstance(valores, list):
+        raise CursorInvalido(token)
+    # Só escalares: uma lista ou um objeto no lugar de um valor quebraria o
+    # get_prep_value do campo com TypeError
+    if not all(isinstance(valor, (str, int, float)) for valor in valores):
+        raise CursorInvalido(token)
+    return direcao, valores
+
+
+def _filtro_apos(campos, valores, operador):
+    """
+    Monta a condição de "linha depois da chave" em forma expandida:
+    (a > x) OR (a = x AND b > y) ...
+    Assim o banco consegue usar o índice composto nos campos da ordenação.
+    """
+    filtro = Q()
+    for i, campo in enumerate(campos):
+        termo = Q(**{f'{campo}__{operador}': valores[i]})
+        for anterior, valor in zip(campos[:i], valores[:i]):
+            termo &= Q(**{anterior: valor})
+        filtro |= termo
+    return filtro
+
+
+class Pagina:
+    """Uma página de resultados com os cursores para navegar ao redor dela."""
+
+    def __init__(self, itens, proximo_cursor=None, cursor_anterior=None):
+        self.itens = itens
+        self.proximo_cursor = proximo_cursor
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __getitem__(self, indice):
+        return self.itens[indice]
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def tem_anterior(self):
+        return self.cursor_anterior is not None
+
+
+def _preparar(queryset, campos, cursor):
+    """Ordena e filtra o queryset a partir do cursor; devolve (queryset, direcao, valores)."""
+    direcao, valores = ('proxima', None)
+    if cursor:
+        direcao, valores = decodificar_cursor(cursor)
+        if len(valores) != len(campos):
+            raise CursorInvalido(cursor)
+
+    if direcao == 'anterior':
+        queryset = queryset.order_by(*[f'-{c}' for c in campos])
+        if valores is not None:
+            queryset = queryset.filter(_filtro_apos(campos, valores, 'lt'))
+    else:
+        queryset = queryset.order_by(*campos)
+        if valores is not None:
+            queryset = queryset.filter(_filtro_apos(campos, valores, 'gt'))
+    return queryset, direcao, valores
+
+
+def _montar_pagina(itens, campos, tamanho, direcao, valores):
+    """Recebe até tamanho + 1 itens já buscados e calcula os cursores vizinhos."""
+    ha_mais = len(itens) > tamanho
+    itens = itens[:tamanho]
+    if direcao == 'anterior':
+        itens.reverse()
+
+    def chave(obj):
+        return [getattr(obj, c) for c in campos]
+
+    proximo = anterior = None
+    if itens:
+        if direcao == 'proxima':
+            proximo = codificar_cursor(chave(itens[-1])) if ha_mais else None
+            anterior = codificar_cursor(chave(itens[0]), 'anterior') if valores is not None else None
+        else:
+            proximo = codificar_cursor(chave(itens[-1]))
+            anterior = codificar_cursor(chave(itens[0]), 'anterior') if ha_mais else None
+    return Pagina(itens, proximo, anterior)
+
+
+def paginar_por_cursor(queryset, campos, cursor=None, tamanho=50):
+    """
+    Paginação por chave (keyset): em vez de OFFSET, filtra a partir da última
+    linha vista. O custo de qualquer página é o mesmo da primeira, desde que
+    exista um índice sobre `campos` (o último campo deve ser único, ex: 'id').
+    """
+    campos = tuple(campos)
+    queryset, direcao, valores = _preparar(queryset, campos, cursor)
+    # Busca um item a mais só para saber se existe outra página naquela direção
+    itens = list(queryset[:tamanho + 1])
+    return _montar_pagina(itens, campos, tamanho, direcao, valores)
+
+
+async def apaginar_por_cursor(queryset, campos, cursor=None, tamanho=50):
+    """Versão assíncrona de paginar_por_cursor() (ORM assíncrono, para views async)."""
+    campos = tuple(campos)
+    queryset, direcao, valores = _preparar(queryset, campos, cursor)
+    itens = [obj async for obj in queryset[:tamanho + 1]]
+    return _montar_pagina(itens, campos, tamanho, direcao, valores)
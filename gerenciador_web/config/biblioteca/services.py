@@ -0,0 +1,486 @@
+# biblioteca/services.py
+
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, Count, ExpressionWrapper, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from . import cache, estatisticas, tarefas
+from .cache import invalidar_disponibilidade
+from .models import Emprestimo, HistoricoEmprestimo, Livro, Membro, Reserva
+
+
+class EstoqueIndisponivel(Exception):
+    """Levantada quando o livro não tem mais cópias disponíveis no momento do empréstimo."""
+
+    def __init__(self, mensagem, livros=()):
+        super().__init__(mensagem)
+        # Livros sem cópias suficientes (no empréstimo em lote pode haver vários)
+        self.livros = list(livros)
+
+
+class ReservaIndisponivel(Exception):
+    """Levantada quando a reserva não está mais em andamento (já atendida, expirada ou cancelada)."""
+
+
+# --- Empréstimo e Devolução ---
+#
+# O estoque é sempre alterado no banco com UPDATE condicional (F() +/- 1),
+# nunca lendo o valor em Python e salvando a linha inteira. Assim duas
+# requisições simultâneas não perdem atualizações nem deixam o estoque
+# negativo; as CheckConstraints de Livro são a última barreira. Os contadores
+# de circulação (emprestimos_ativos, vezes_emprestado, total_emprestimos) mudam
+# nos mesmos UPDATEs, e os resumos diários (estatisticas.py) na mesma transação
+# do empréstimo/devolução. Cópias separadas para reservas ficam fora do estoque
+# (ver a seção Reservas).
+
+def registrar_emprestimo(membro, livro, **campos):
+    """
+    Baixa uma cópia do estoque e cria o Empréstimo, tudo ou nada. Se o membro
+    tem uma cópia separada do livro, a reserva é atendida e o estoque não muda.
+    """
+    with transaction.atomic():
+        # No máximo uma linha (reserva_em_andamento_unica)
+        atendidas = Reserva.objects.filter(membro=membro, livro=livro, status="Separada").update(status="Atendida")
+        livros = Livro.objects.filter(pk=livro.pk)
+        if not atendidas:
+            livros = livros.filter(quantidade_disponivel__gt=0)
+        baixados = livros.update(
+            quantidade_disponivel=F('quantidade_disponivel') - (1 - atendidas),
+            emprestimos_ativos=F('emprestimos_ativos') + 1,
+            vezes_emprestado=F('vezes_emprestado') + 1,
+        )
+        if not baixados:
+            raise EstoqueIndisponivel(f'"{livro}" não possui cópias disponíveis.')
+        Membro.objects.filter(pk=membro.pk).update(
+            emprestimos_ativos=F('emprestimos_ativos') + 1,
+            total_emprestimos=F('total_emprestimos') + 1,
+        )
+        invalidar_disponibilidade([livro.pk])
+        # O novo Empréstimo invalida o grupo EMPRESTIMOS pelo signal de post_save
+        cache.invalidar_apos_commit(cache.MEMBROS)
+        emprestimo = Emprestimo.objects.create(membro=membro, livro=livro, **campos)
+        estatisticas.registrar_emprestimos([(emprestimo.data_saida, membro.tipo, livro.editora, livro.pk)])
+        return emprestimo
+
+
+def registrar_devolucao(emprestimo, data_devolucao=None):
+    """
+    Marca o Empréstimo como devolvido e devolve a cópia ao estoque, ou a
+    separa para a primeira reserva da fila do livro.
+    Retorna False (sem alterar nada) se o empréstimo já estava devolvido.
+    """
+    data_devolucao = data_devolucao or date.today()
+    with transaction.atomic():
+        marcados = Emprestimo.objects.filter(pk=emprestimo.pk).exclude(
+            status="Devolvido"
+        ).update(status="Devolvido", data_devolucao=data_devolucao)
+        if not marcados:
+            return False
+        separadas = _separar_proxima_reserva(emprestimo.livro_id, data_devolucao)
+        if separadas:
+            _avisar_reservas()
+        # Nunca ultrapassa a quantidade total, mesmo com estoque editado à mão
+        Livro.objects.filter(pk=emprestimo.livro_id).update(
+            quantidade_disponivel=Least(F('quantidade_total'), F('quantidade_disponivel') + (1 - separadas)),
+            emprestimos_ativos=Greatest(F('emprestimos_ativos') - 1, 0),
+        )
+        Membro.objects.filter(pk=emprestimo.membro_id).update(
+            emprestimos_ativos=Greatest(F('emprestimos_ativos') - 1, 0),
+        )
+        invalidar_disponibilidade([emprestimo.livro_id])
+        cache.invalidar_apos_commit(cache.MEMBROS, cache.EMPRESTIMOS)
+        tipo_membro, editora, prevista = Emprestimo.objects.filter(pk=emprestimo.pk).values_list(
+            'membro__tipo', 'livro__editora', 'data_prevista'
+        ).get()
+        estatisticas.registrar_devolucoes([(data_devolucao, tipo_membro, editora, data_devolucao > prevista, 1)])
+
+    emprestimo.status = "Devolvido"
+    emprestimo.data_devolucao = data_devolucao
+    return True
+
+
+# Quantidade de livros por UPDATE agrupado (limita o tamanho do CASE e dos parâmetros)
+LOTE_ESTOQUE = 500
+
+
+def _em_lotes_por_pk(contagem):
+    """Divide {pk: n} em lotes e devolve (pks, CASE pk WHEN ... THEN n) de cada um."""
+    pks = sorted(contagem)
+    for inicio in range(0, len(pks), LOTE_ESTOQUE):
+        lote = pks[inicio:inicio + LOTE_ESTOQUE]
+        yield lote, Case(*[When(pk=pk, then=Value(contagem[pk])) for pk in lote], default=Value(0))
+
+
+def repor_estoque_em_lote(contagem_por_livro, hoje=None, devolvidas=True):
+    """
+    Libera as cópias ({livro_id: n}): primeiro separa as que as filas de
+    reserva pedem (_separar_reservas_em_lote), depois soma o resto ao estoque
+    com um único UPDATE ... CASE por lote, sem passar da quantidade total.
+    Com devolvidas=True as cópias voltam de empréstimos e saem também de
+    emprestimos_ativos. Retorna {livro_id: cópias separadas}.
+    """
+    separadas = _separar_reservas_em_lote(contagem_por_livro, hoje or date.today())
+    para_estoque = {pk: n - separadas[pk] for pk, n in contagem_por_livro.items()}
+    for (lote, liberadas), (_, incremento) in zip(
+        _em_lotes_por_pk(contagem_por_livro), _em_lotes_por_pk(para_estoque)
+    ):
+        campos = {'quantidade_disponivel': Least(F('quantidade_total'), F('quantidade_disponivel') + incremento)}
+        if devolvidas:
+            campos['emprestimos_ativos'] = Greatest(F('emprestimos_ativos') - liberadas, 0)
+        Livro.objects.filter(pk__in=lote).update(**campos)
+    invalidar_disponibilidade(sorted(contagem_por_livro))
+    return separadas
+
+
+def registrar_emprestimos_em_lote(membro, livros, **campos):
+    """
+    Empresta vários livros ao mesmo membro numa única transação, tudo ou nada:
+    um UPDATE condicional por lote baixa o estoque de todos os livros de uma
+    vez (só nas linhas que têm cópias suficientes), um UPDATE soma os
+    contadores do membro e um único bulk_create cria os Empréstimos. As cópias
+    separadas para reservas do membro são usadas primeiro (sem baixar o
+    estoque). Se algum livro não tiver cópias, nada é gravado e
+    EstoqueIndisponivel lista quais.
+    """
+    contagem = Counter(livro.pk for livro in livros)
+    if not contagem:
+        return []
+    with transaction.atomic():
+        reservadas = Reserva.objects.filter(membro=membro, livro__in=contagem, status="Separada")
+        separadas = set(reservadas.values_list('livro_id', flat=True))
+        if separadas:
+            reservadas.update(status="Atendida")
+        do_estoque = {pk: n - (pk in separadas) for pk, n in contagem.items()}
+        baixados = 0
+        for (lote, quantidade), (_, baixa) in zip(_em_lotes_por_pk(contagem), _em_lotes_por_pk(do_estoque)):
+            # O próprio UPDATE é a verificação: linhas sem estoque ficam de fora
+            baixados += Livro.objects.filter(
+                pk__in=lote, quantidade_disponivel__gte=baixa
+            ).update(
+                quantidade_disponivel=F('quantidade_disponivel') - baixa,
+                emprestimos_ativos=F('emprestimos_ativos') + quantidade,
+                vezes_emprestado=F('vezes_emprestado') + quantidade,
+            )
+        if baixados == len(contagem):
+            total = sum(contagem.values())
+            Membro.objects.filter(pk=membro.pk).update(
+                emprestimos_ativos=F('emprestimos_ativos') + total,
+                total_emprestimos=F('total_emprestimos') + total,
+            )
+            invalidar_disponibilidade(sorted(contagem))
+            # bulk_create não dispara post_save: o grupo EMPRESTIMOS é invalidado aqui
+            cache.invalidar_apos_commit(cache.MEMBROS, cache.EMPRESTIMOS)
+            emprestimos = Emprestimo.objects.bulk_create([
+                Emprestimo(membro=membro, livro=livro, **campos) for livro in livros
+            ])
+            estatisticas.registrar_emprestimos(
+                (emprestimo.data_saida, membro.tipo, livro.editora, livro.pk)
+                for emprestimo, livro in zip(emprestimos, livros)
+            )
+            return emprestimos
+        # Desfaz os lotes já baixados
+        transaction.set_rollback(True)
+
+    # Depois do rollback: consulta quais livros ficaram sem cópias suficientes
+    em_falta = [
+        livro for livro in Livro.objects.filter(pk__in=contagem).order_by('titulo', 'pk')
+        if livro.quantidade_disponivel < do_estoque[livro.pk]
+    ]
+    titulos = ', '.join(f'"{livro}"' for livro in em_falta)
+    raise EstoqueIndisponivel(f'Sem cópias disponíveis: {titulos}.', em_falta)
+
+
+def encerrar_ativos_de_membros(contagem_por_membro):
+    """Desconta dos membros ({membro_id: n}) os empréstimos devolvidos, um UPDATE por lote."""
+    for lote, devolvidos in _em_lotes_por_pk(contagem_por_membro):
+        Membro.objects.filter(pk__in=lote).update(
+            emprestimos_ativos=Greatest(F('emprestimos_ativos') - devolvidos, 0),
+        )
+    cache.invalidar_apos_commit(cache.MEMBROS)
+
+
+def devolver_em_lote(queryset, data_devolucao=None):
+    """
+    Devolve de uma vez todos os empréstimos ainda não devolvidos do queryset:
+    um SELECT agrupado por livro e membro, um UPDATE nos empréstimos, as
+    reservas atendidas pelas cópias devolvidas, um UPDATE agrupado no estoque
+    e nos membros e os resumos das estatísticas, dentro de uma única transação.
+    Retorna a quantidade de empréstimos devolvidos.
+    """
+    data_devolucao = data_devolucao or date.today()
+    with transaction.atomic():
+        pendentes = queryset.exclude(status="Devolvido").order_by()
+        if connection.features.has_select_for_update:
+            # Trava as linhas para que uma devolução paralela não seja contada duas vezes
+            pendentes = Emprestimo.objects.filter(
+                pk__in=list(pendentes.select_for_update().values_list('pk', flat=True))
+            )
+
+        por_livro, por_membro = Counter(), Counter()
+        eventos = []
+        atrasada = ExpressionWrapper(Q(data_prevista__lt=data_devolucao), output_field=BooleanField())
+        for livro_id, membro_id, editora, tipo_membro, em_atraso, n in (
+            pendentes.annotate(em_atraso=atrasada)
+            .values_list('livro_id', 'membro_id', 'livro__editora', 'membro__tipo', 'em_atraso')
+            .annotate(n=Count('pk')).order_by()
+        ):
+            por_livro[livro_id] += n
+            por_membro[membro_id] += n
+            eventos.append((data_devolucao, tipo_membro, editora, em_atraso, n))
+        if not por_livro:
+            return 0
+        devolvidos = pendentes.update(status="Devolvido", data_devolucao=data_devolucao)
+        cache.invalidar_apos_commit(cache.EMPRESTIMOS)
+        repor_estoque_em_lote(por_livro, data_devolucao)
+        encerrar_ativos_de_membros(por_membro)
+        estatisticas.registrar_devolucoes(eventos)
+    return devolvidos
+
+
+# --- Reservas ---
+#
+# A cópia liberada (devolução, reserva expirada ou cancelada) vai para a
+# reserva "Aguardando" mais antiga do livro. Cada busca na fila é um
+# ORDER BY id LIMIT n sobre o índice reserva_fila_idx: o custo depende das
+# cópias liberadas, não do tamanho da fila.
+
+# Livros por consulta às filas (cada livro é um termo do UNION ALL; o SQLite
+# aceita no máximo 500 termos por instrução composta)
+LOTE_FILA = 200
+# Reservas expiradas por transação
+LOTE_RESERVAS = 500
+
+
+def prazo_da_reserva(hoje=None):
+    """Último dia em que a cópia separada espera pelo membro."""
+    dias = getattr(settings, 'BIBLIOTECA_RESERVA_PRAZO_DIAS', 3)
+    return (hoje or date.today()) + timedelta(days=dias)
+
+
+def _fila(livro_id):
+    return Reserva.objects.filter(livro_id=livro_id, status="Aguardando").order_by('pk')
+
+
+def _separar_proxima_reserva(livro_id, hoje):
+    """Separa uma cópia para a primeira reserva da fila do livro (um UPDATE). Retorna 1 ou 0."""
+    proxima = _fila(livro_id).values('pk')[:1]
+    return Reserva.objects.filter(pk=Subquery(proxima), status="Aguardando").update(
+        status="Separada", separada_ate=prazo_da_reserva(hoje),
+    )
+
+
+def _separar_reservas_em_lote(contagem_por_livro, hoje):
+    """
+    Separa até n cópias ({livro_id: n}) para as primeiras reservas da fila de
+    cada livro: um SELECT (UNION ALL de um LIMIT n por livro) e um UPDATE por
+    lote de livros. Retorna {livro_id: cópias separadas}.
+    """
+    separadas = Counter()
+    pks = sorted(pk for pk, n in contagem_por_livro.items() if n > 0)
+    for inicio in range(0, len(pks), LOTE_FILA):
+        partes, params = [], []
+        for livro_id in pks[inicio:inicio + LOTE_FILA]:
+            # O Django não gera LIMIT dentro de UNION: cada termo vira uma subconsulta
+            sql, p = _fila(livro_id).values_list('pk', 'livro_id')[:contagem_por_livro[livro_id]].query.sql_with_params()
+            partes.append(f'SELECT * FROM ({sql})')
+            params.extend(p)
+        with connection.cursor() as cursor:
+            cursor.execute(' UNION ALL '.join(partes), params)
+            escolhidas = cursor.fetchall()
+        if escolhidas:
+            Reserva.objects.filter(pk__in=[pk for pk, _ in escolhidas], status="Aguardando").update(
+                status="Separada", separada_ate=prazo_da_reserva(hoje),
+            )
+            separadas.update(livro_id for _, livro_id in escolhidas)
+    if separadas:
+        _avisar_reservas()
+    return separadas
+
+
+def reservar(membro, livro, hoje=None):
+    """
+    Cria a reserva do membro. Com cópia no estoque ela já nasce "Separada"
+    (a cópia sai do estoque e espera pelo membro); sem cópia, entra no fim da
+    fila do livro.
+    """
+    with transaction.atomic():
+        separou = Livro.objects.filter(pk=livro.pk, quantidade_disponivel__gt=0).update(
+            quantidade_disponivel=F('quantidade_disponivel') - 1,
+        )
+        if separou:
+            invalidar_disponibilidade([livro.pk])
+            _avisar_reservas()
+            return Reserva.objects.create(
+                membro=membro, livro=livro, status="Separada", separada_ate=prazo_da_reserva(hoje),
+            )
+        return Reserva.objects.create(membro=membro, livro=livro)
+
+
+def cancelar_reserva(reserva, hoje=None):
+    """Cancela a reserva; a cópia que estava separada passa ao próximo da fila (ou volta ao estoque)."""
+    with transaction.atomic():
+        if Reserva.objects.filter(pk=reserva.pk, status="Separada").update(status="Cancelada"):
+            repor_estoque_em_lote({reserva.livro_id: 1}, hoje, devolvidas=False)
+        elif not Reserva.objects.filter(pk=reserva.pk, status="Aguardando").update(status="Cancelada"):
+            raise ReservaIndisponivel(f'A reserva {reserva.pk} não está mais em andamento.')
+    reserva.status = "Cancelada"
+
+
+def expirar_reservas(hoje=None, lote=LOTE_RESERVAS):
+    """
+    Marca como "Expirada", em lotes de `lote` por transação, as reservas
+    separadas cujo prazo passou, e passa as cópias aos próximos das filas
+    (ou de volta ao estoque). Retorna quantas expiraram.
+    """
+    hoje = hoje or date.today()
+    vencidas = Reserva.objects.filter(status="Separada", separada_ate__lt=hoje)
+    expiradas = 0
+    while True:
+        with transaction.atomic():
+            linhas = list(vencidas.order_by('pk').values_list('pk', 'livro_id')[:lote])
+            if not linhas:
+                break
+            Reserva.objects.filter(pk__in=[pk for pk, _ in linhas]).update(status="Expirada")
+            # As novas separadas vencem depois de hoje: o laço não as pega de novo
+            repor_estoque_em_lote(Counter(livro_id for _, livro_id in linhas), hoje, devolvidas=False)
+        expiradas += len(linhas)
+    return expiradas
+
+
+def _avisar_reservas():
+    """Agenda o aviso das cópias separadas: uma tarefa pendente atende todas as separações até ela rodar."""
+    tarefas.enfileirar('avisar_reservas', chave='avisar_reservas')
+
+
+def avisar_reservas_separadas(lote=LOTE_RESERVAS):
+    """
+    Envia, em lotes de `lote`, o e-mail de cada reserva separada ainda não
+    avisada e a marca como notificada. Retorna quantos e-mails saíram.
+    """
+    pendentes = Reserva.objects.filter(status="Separada", notificada=False).select_related('membro', 'livro')
+    conexao = get_connection()
+    enviados = 0
+    while True:
+        reservas = list(pendentes.order_by('pk')[:lote])
+        if not reservas:
+            return enviados
+        enviados += conexao.send_messages(mensagens_de_reserva(reservas)) or 0
+        # Marca o lote inteiro, enviado ou não: um endereço inválido não trava a fila de avisos
+        Reserva.objects.filter(pk__in=[reserva.pk for reserva in reservas]).update(notificada=True)
+
+
+def mensagens_de_reserva(reservas):
+    """Monta um e-mail por reserva separada (membro e livro já carregados)."""
+    remetente = getattr(settings, 'BIBLIOTECA_EMAIL_REMETENTE', settings.DEFAULT_FROM_EMAIL)
+    return [
+        EmailMessage(
+            subject=f'Reserva disponível: "{reserva.livro.titulo}"',
+            body=(
+                f'Olá, {reserva.membro.nome}.\n\n'
+                f'Uma cópia de "{reserva.livro.titulo}" foi separada para você e fica '
+                f'reservada até {reserva.separada_ate:%d/%m/%Y}.\n'
+                'Depois dessa data ela passa para o próximo da fila.'
+            ),
+            from_email=remetente,
+            to=[reserva.membro.contato],
+        )
+        for reserva in reservas
+    ]
+
+
+# --- Reconciliação dos contadores de circulação ---
+
+def _contagem_de_emprestimos(emprestimos, campo):
+    """Subquery correlacionada: quantos empréstimos do queryset apontam para a linha."""
+    return Coalesce(Subquery(
+        emprestimos.filter(**{campo: OuterRef('pk')}).order_by()
+        .values(campo).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def _contadores_reais():
+    """Expressão SQL do valor correto de cada contador, por modelo."""
+    # Os totais contam também os empréstimos já arquivados
+    todos = HistoricoEmprestimo.objects.all()
+    abertos = Emprestimo.objects.em_aberto()
+    separadas = Reserva.objects.filter(status="Separada")
+    return {
+        Livro: {
+            'emprestimos_ativos': _contagem_de_emprestimos(abertos, 'livro'),
+            'vezes_emprestado': _contagem_de_emprestimos(todos, 'livro'),
+            # Estoque = total menos as cópias emprestadas e as separadas para
+            # reservas (desfaz edições manuais)
+            'quantidade_disponivel': Greatest(
+                F('quantidade_total') - _contagem_de_emprestimos(abertos, 'livro')
+                - _contagem_de_emprestimos(separadas, 'livro'), 0
+            ),
+        },
+        Membro: {
+            'emprestimos_ativos': _contagem_de_emprestimos(abertos, 'membro'),
+            'total_emprestimos': _contagem_de_emprestimos(todos, 'membro'),
+        },
+    }
+
+
+def reconciliar_contadores(corrigir=False):
+    """
+    Recalcula os contadores a partir dos empréstimos, com uma consulta
+    agregada por modelo, e devolve as divergências:
+    {modelo: [(pk, {campo: (gravado, correto)}), ...]}.
+    Com corrigir=True regrava as linhas divergentes (UPDATEs em lote).
+    """
+    divergencias = {}
+    with transaction.atomic():
+        for modelo, contadores in _contadores_reais().items():
+            corretos = {f'{campo}_correto': expressao for campo, expressao in contadores.items()}
+            divergente = Q()
+            for campo in contadores:
+                divergente |= ~Q(**{campo: F(f'{campo}_correto')})
+            linhas = modelo.objects.annotate(**corretos).filter(divergente).order_by('pk').values(
+                'pk', *contadores, *corretos
+            )
+            divergencias[modelo] = [
+                (linha['pk'], {
+                    campo: (linha[campo], linha[f'{campo}_correto'])
+                    for campo in contadores if linha[campo] != linha[f'{campo}_correto']
+                })
+                for linha in linhas
+            ]
+
+            if corrigir and divergencias[modelo]:
+                pks = [pk for pk, _ in divergencias[modelo]]
+                for inicio in range(0, len(pks), LOTE_ESTOQUE):
+                    modelo.objects.filter(pk__in=pks[inicio:inicio + LOTE_ESTOQUE]).update(**contadores)
+                if modelo is Livro:
+                    invalidar_disponibilidade(pks)
+                else:
+                    cache.invalidar_apos_commit(cache.MEMBROS)
+    return divergencias
+
+
+# --- Atrasos ---
+
+def mensagens_de_atraso(emprestimos, hoje=None):
+    """Monta um e-mail de lembrete por empréstimo atrasado (membro e livro já carregados)."""
+    hoje = hoje or date.today()
+    remetente = getattr(settings, 'BIBLIOTECA_EMAIL_REMETENTE', settings.DEFAULT_FROM_EMAIL)
+    mensagens = []
+    for emprestimo in emprestimos:
+        dias = (hoje - emprestimo.data_prevista).days
+        mensagens.append(EmailMessage(
+            subject=f'Devolução atrasada: "{emprestimo.livro.titulo}"',
+            body=(
+                f'Olá, {emprestimo.membro.nome}.\n\n'
+                f'O livro "{emprestimo.livro.titulo}" deveria ter sido devolvido em '
+                f'{emprestimo.data_prevista:%d/%m/%Y} ({dias} dia(s) de atraso).\n'
+                'Por favor, devolva-o assim que possível.'
+            ),
+            from_email=remetente,
+            to=[emprestimo.membro.contato],
+        ))
+    return mensagens
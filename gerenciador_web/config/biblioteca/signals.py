@@ -0,0 +1,38 @@
+# biblioteca/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, estatisticas
+from .models import Autor, Emprestimo, Livro, Membro
+
+
+@receiver([post_save, post_delete], sender=Autor)
+def autor_alterado(sender, instance, **kwargs):
+    # O nome do autor aparece nas páginas do acervo
+    cache.invalidar_apos_commit(cache.ACERVO)
+
+
+@receiver([post_save, post_delete], sender=Livro)
+def livro_alterado(sender, instance, **kwargs):
+    # save() grava a linha inteira, inclusive o estoque (ex: list_editable do admin)
+    cache.invalidar_apos_commit(cache.ACERVO)
+    cache.invalidar_disponibilidade([instance.pk])
+    # Cópias (e empréstimos em aberto, se o livro trocou de editora) por
+    # editora do painel de estatísticas
+    anterior = getattr(instance, '_editora_no_banco', None)
+    if kwargs.get('created') is False and anterior is not None and anterior != instance.editora:
+        estatisticas.trocar_editora(instance.pk, anterior, instance.editora)
+    else:
+        estatisticas.atualizar_copias([instance.editora])
+    instance._editora_no_banco = instance.editora
+
+
+@receiver([post_save, post_delete], sender=Membro)
+def membro_alterado(sender, instance, **kwargs):
+    cache.invalidar_apos_commit(cache.MEMBROS)
+
+
+@receiver([post_save, post_delete], sender=Emprestimo)
+def emprestimo_alterado(sender, instance, **kwargs):
+    cache.invalidar_apos_commit(cache.EMPRESTIMOS)
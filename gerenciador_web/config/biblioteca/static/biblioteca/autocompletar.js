@@ -0,0 +1,50 @@
+/*
+ * Arquivo: biblioteca/autocompletar.js
+ * Liga um campo de busca a cada <select data-autocompletar="URL">: ao digitar,
+ * busca as opções no endpoint JSON em vez de carregar a tabela inteira na página.
+ */
+(function () {
+    function ligar(select) {
+        var busca = document.createElement('input');
+        busca.type = 'search';
+        busca.className = 'form-control mb-1';
+        busca.placeholder = 'Digite para buscar...';
+        busca.autocomplete = 'off';
+        select.parentNode.insertBefore(busca, select);
+
+        var espera = null;
+        busca.addEventListener('input', function () {
+            clearTimeout(espera);
+            espera = setTimeout(function () {
+                var url = select.dataset.autocompletar + '?q=' + encodeURIComponent(busca.value);
+                fetch(url, {headers: {'Accept': 'application/json'}})
+                    .then(function (resposta) { return resposta.json(); })
+                    .then(function (dados) {
+                        // Mantém a opção vazia e as já escolhidas (no select múltiplo
+                        // os itens se acumulam entre uma busca e outra)
+                        var escolhidos = {};
+                        for (var i = select.length - 1; i >= 0; i--) {
+                            var atual = select.options[i];
+                            if (atual.value && !atual.selected) {
+                                select.remove(i);
+                            } else {
+                                escolhidos[atual.value] = true;
+                            }
+                        }
+                        dados.resultados.forEach(function (item) {
+                            if (!escolhidos[String(item.id)]) {
+                                select.add(new Option(item.texto, item.id));
+                            }
+                        });
+                        if (dados.resultados.length === 1 && !select.multiple) {
+                            select.value = dados.resultados[0].id;
+                        }
+                    });
+            }, 250);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocompletar]').forEach(ligar);
+    });
+})();
@@ -0,0 +1,43 @@
+/*
+ * Arquivo: biblioteca/filtro_autocompletar.js
+ * Filtros da changelist do admin por chave estrangeira (FiltroAutocompletar):
+ * ao digitar, busca os itens no autocompletar do admin e mostra cada um como
+ * um link que aplica o filtro, em vez de listar a tabela inteira na página.
+ */
+(function () {
+    function ligar(busca) {
+        var lista = busca.nextElementSibling;
+        var espera = null;
+        busca.addEventListener('input', function () {
+            clearTimeout(espera);
+            espera = setTimeout(function () {
+                if (!busca.value) {
+                    lista.innerHTML = '';
+                    return;
+                }
+                var url = busca.dataset.filtroAutocompletar + '&term=' + encodeURIComponent(busca.value);
+                fetch(url, {headers: {'Accept': 'application/json'}})
+                    .then(function (resposta) { return resposta.json(); })
+                    .then(function (dados) {
+                        lista.innerHTML = '';
+                        dados.results.forEach(function (item) {
+                            // Mantém os outros filtros e volta para a primeira página
+                            var parametros = new URLSearchParams(window.location.search);
+                            parametros.set(busca.dataset.parametro, item.id);
+                            parametros.delete('p');
+                            var link = document.createElement('a');
+                            link.href = '?' + parametros.toString();
+                            link.textContent = item.text;
+                            var linha = document.createElement('li');
+                            linha.appendChild(link);
+                            lista.appendChild(linha);
+                        });
+                    });
+            }, 250);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('input[data-filtro-autocompletar]').forEach(ligar);
+    });
+})();
@@ -0,0 +1,199 @@
+# biblioteca/tarefas.py
+
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tarefa
+
+
+# Fila de tarefas no próprio banco. Quem produz chama enfileirar() dentro da
+# transação que originou o trabalho (a tarefa só existe se o resto foi
+# gravado); o comando processar_tarefas reivindica lotes com reivindicar() e
+# roda cada tarefa com executar(), num pool de threads ou de processos.
+
+
+class TipoDeTarefa:
+    """Uma função que pode ser enfileirada: nome na fila, prioridade e tentativas padrão."""
+
+    def __init__(self, funcao, nome, prioridade=0, max_tentativas=3):
+        self.funcao = funcao
+        self.nome = nome
+        self.prioridade = prioridade
+        self.max_tentativas = max_tentativas
+
+
+REGISTRO = {}
+
+# Tarefas reivindicadas por consulta (o worker usa o dobro do tamanho do pool)
+LOTE_TAREFAS = 20
+# Tarefas concluídas apagadas por transação
+LOTE_LIMPEZA = 2000
+
+
+def tarefa(nome, prioridade=0, max_tentativas=3):
+    """Decorador: registra a função (que recebe só argumentos nomeados, serializáveis em JSON)."""
+    def registrar(funcao):
+        REGISTRO[nome] = TipoDeTarefa(funcao, nome, prioridade, max_tentativas)
+        return funcao
+    return registrar
+
+
+def enfileirar(nome, chave=None, prioridade=None, atraso=0, **parametros):
+    """
+    Grava a tarefa `nome` para o worker executar com `parametros`. Com
+    `chave`, não cria outra se já houver uma pendente com a mesma chave (o
+    INSERT é ignorado no banco, sem SELECT antes): um lote de eventos vira
+    uma tarefa só. `atraso` (segundos) adia a primeira execução.
+    """
+    tipo = REGISTRO[nome]
+    Tarefa.objects.bulk_create([Tarefa(
+        nome=nome,
+        parametros=parametros,
+        chave=chave,
+        prioridade=tipo.prioridade if prioridade is None else prioridade,
+        max_tentativas=tipo.max_tentativas,
+        executar_apos=timezone.now() + timedelta(seconds=atraso),
+    )], ignore_conflicts=chave is not None)
+
+
+def reivindicar(trabalhador, limite=LOTE_TAREFAS):
+    """
+    Marca como "Executando" até `limite` tarefas prontas, as de maior
+    prioridade primeiro, e as devolve: um SELECT ... LIMIT e um UPDATE
+    condicional (status ainda "Pendente"). Se outro worker levar alguma
+    entre os dois, ela fica de fora do resultado.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        prontas = Tarefa.objects.filter(status="Pendente", executar_apos__lte=agora).order_by('-prioridade', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            # Bancos com lock por linha: workers paralelos pegam lotes diferentes
+            prontas = prontas.select_for_update(skip_locked=True)
+        ids = list(prontas.values_list('pk', flat=True)[:limite])
+        if not ids:
+            return []
+        Tarefa.objects.filter(pk__in=ids, status="Pendente").update(
+            status="Executando", trabalhador=trabalhador, iniciada_em=agora, tentativas=F('tentativas') + 1,
+        )
+        return list(
+            Tarefa.objects.filter(pk__in=ids, status="Executando", trabalhador=trabalhador, iniciada_em=agora)
+            .order_by('-prioridade', 'pk')
+        )
+
+
+def espera_para_nova_tentativa(tentativas):
+    """Segundos até repetir uma tarefa que falhou: dobra a cada tentativa."""
+    base = getattr(settings, 'BIBLIOTECA_TAREFAS_ESPERA_BASE', 30)
+    return base * 2 ** (tentativas - 1)
+
+
+def executar(tarefa):
+    """
+    Roda uma tarefa reivindicada e grava o resultado: "Concluida", de volta
+    a "Pendente" (com espera crescente) se falhou e ainda tem tentativas, ou
+    "Falhou". Retorna o status gravado.
+    """
+    minha = Tarefa.objects.filter(pk=tarefa.pk, status="Executando", trabalhador=tarefa.trabalhador)
+    tipo = REGISTRO.get(tarefa.nome)
+    try:
+        if tipo is None:
+            raise LookupError(f'Tarefa desconhecida: "{tarefa.nome}".')
+        tipo.funcao(**tarefa.parametros)
+    except Exception:
+        agora = timezone.now()
+        erro = traceback.format_exc()
+        if tipo is not None and tarefa.tentativas < tarefa.max_tentativas:
+            espera = timedelta(seconds=espera_para_nova_tentativa(tarefa.tentativas))
+            status = _devolver_a_fila(minha, agora, erro, executar_apos=agora + espera)
+        else:
+            status = "Falhou"
+            minha.update(status=status, erro=erro, concluida_em=agora)
+    else:
+        status = "Concluida"
+        minha.update(status=status, concluida_em=timezone.now(), erro='')
+    return status
+
+
+def executar_no_pool(tarefa):
+    """executar() numa thread ou processo do worker, que reaproveita a conexão como uma requisição."""
+    close_old_connections()
+    try:
+        return executar(tarefa)
+    finally:
+        close_old_connections()
+
+
+def _devolver_a_fila(consulta, agora, erro, **campos):
+    """
+    Volta a tarefa de `consulta` para "Pendente". Se já houver outra
+    pendente com a mesma chave (o índice único não deixa existirem duas),
+    é ela que fará o trabalho: esta fica como "Falhou", com o erro. Retorna
+    o status gravado.
+    """
+    try:
+        with transaction.atomic():
+            consulta.update(status="Pendente", erro=erro, **campos)
+        return "Pendente"
+    except IntegrityError:
+        consulta.update(
+            status="Falhou", concluida_em=agora,
+            erro=f"{erro}\nNão voltou à fila: já há uma tarefa pendente com a mesma chave.",
+        )
+        return "Falhou"
+
+
+def recuperar_interrompidas(apos_segundos):
+    """
+    Devolve à fila as tarefas "Executando" há mais de `apos_segundos` (o
+    worker que as pegou caiu). A tentativa perdida conta: as que já usaram
+    todas as tentativas, e as com chave que já tem outra pendente, ficam
+    como "Falhou". Retorna quantas voltaram à fila.
+    """
+    agora = timezone.now()
+    erro = "Interrompida: o worker parou antes de concluir."
+    interrompidas = Tarefa.objects.filter(status="Executando", iniciada_em__lt=agora - timedelta(seconds=apos_segundos))
+    interrompidas.filter(tentativas__gte=F('max_tentativas')).update(status="Falhou", concluida_em=agora, erro=erro)
+    recuperadas = interrompidas.filter(chave__isnull=True).update(status="Pendente", erro=erro)
+    # Com chave, uma a uma: duas interrompidas (ou uma e uma nova) podem disputar a mesma vaga de pendente
+    for pk in interrompidas.filter(chave__isnull=False).values_list('pk', flat=True):
+        if _devolver_a_fila(Tarefa.objects.filter(pk=pk), agora, erro) == "Pendente":
+            recuperadas += 1
+    return recuperadas
+
+
+def limpar_concluidas(dias, lote=LOTE_LIMPEZA):
+    """Apaga, em lotes, as tarefas concluídas há mais de `dias` dias (as que falharam ficam). Retorna quantas."""
+    antigas = Tarefa.objects.filter(status="Concluida", iniciada_em__lt=timezone.now() - timedelta(days=dias))
+    apagadas = 0
+    while True:
+        with transaction.atomic():
+            ids = list(antigas.values_list('pk', flat=True)[:lote])
+            if not ids:
+                return apagadas
+            Tarefa.objects.filter(pk__in=ids).delete()
+        apagadas += len(ids)
+
+
+# --- Tarefas da biblioteca ---
+#
+# Imports locais: services.py importa este módulo para enfileirar.
+
+@tarefa('avisar_reservas', prioridade=10)
+def avisar_reservas():
+    """Avisa por e-mail os membros com cópia separada ainda não avisados."""
+    from .services import avisar_reservas_separadas
+
+    avisar_reservas_separadas()
+
+
+@tarefa('recalcular_estatisticas', prioridade=-10, max_tentativas=1)
+def recalcular_estatisticas():
+    """Refaz os resumos do painel a partir do histórico (pesado: só no worker)."""
+    from .estatisticas import recalcular
+
+    recalcular()
@@ -0,0 +1,55 @@
+# biblioteca/templatetags/acervo.py
+
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+
+register = template.Library()
+
+
+# Linha da tabela do acervo já "compilada": um str.format no lugar dos nós do
+# {% for %} (cada {{ }}, {% url %} e {% if %} custa uma resolução de variável
+# e um render de nó por linha). A marcação é a mesma do laço antigo em
+# listar_livros.html; o benchmark_templates compara as duas saídas.
+LINHA_LIVRO = (
+    '<tr>'
+    '<td><a href="{url}">{titulo}</a></td>'
+    '<td>{autor}</td>'
+    '<td>{editora}</td>'
+    '<td>{ano}</td>'
+    '<td>{total}</td>'
+    '<td>{disponivel}</td>'
+    '<td>{status}</td>'
+    '</tr>\n'
+).format
+DISPONIVEL = '<span class="badge bg-success">Disponível</span>'
+ESGOTADO = '<span class="badge bg-danger">Esgotado</span>'
+
+# Marcador numérico para montar a URL do detalhe com um só reverse() por tabela
+_PK_MARCADOR = 987654321
+
+
+@register.simple_tag
+def linhas_do_acervo(livros):
+    """
+    As linhas <tr> da listagem do acervo, com o autor já carregado
+    (select_related). Equivale ao {% for livro in livros %} do template,
+    bem mais rápido em tabelas grandes.
+    """
+    antes, depois = reverse('biblioteca:detalhe_livro', args=[_PK_MARCADOR]).split(str(_PK_MARCADOR))
+    escapar = conditional_escape
+    return mark_safe(''.join(
+        LINHA_LIVRO(
+            url=f'{antes}{livro.pk}{depois}',
+            titulo=escapar(livro.titulo),
+            autor=escapar(livro.autor.nome),
+            editora=escapar(livro.editora),
+            ano=livro.ano,
+            total=livro.quantidade_total,
+            disponivel=livro.quantidade_disponivel,
+            status=DISPONIVEL if livro.quantidade_disponivel > 0 else ESGOTADO,
+        )
+        for livro in livros
+    ))
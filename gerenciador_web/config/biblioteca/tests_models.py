@@ -1,11 +1,14 @@
 # biblioteca/test_models.py
 
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Collate
 from django.test import TestCase
 from datetime import timedelta, date
 from unittest.mock import patch 
 
 # Importando Modelos (certifique-se de que os imports estão corretos)
 from .models import Autor, Livro, Membro, Emprestimo, data_retorno_padrao
+from .paginacao import _filtro_apos
 
 
 class ModelTests(TestCase):
@@ -49,6 +52,33 @@ class ModelTests(TestCase):
         self.assertEqual(livro.quantidade_disponivel, 3)
         self.assertEqual(str(livro), "1984")
 
+    def test_validacao_de_estoque_sem_consultas(self):
+        """As regras de estoque saem das condições de Meta.constraints e são validadas sem SELECT."""
+        livro = Livro(titulo="X", autor=self.autor, editora="Y", ano=2000,
+                      quantidade_total=1, quantidade_disponivel=2)
+        with self.assertNumQueries(0):
+            with self.assertRaisesMessage(ValidationError, "A quantidade disponível não pode ser maior que a quantidade total."):
+                livro.validate_constraints()
+            livro.quantidade_disponivel = 1
+            livro.validate_constraints()
+            # Campo com erro (excluído) não é conferido de novo
+            livro.quantidade_disponivel = -1
+            livro.validate_constraints(exclude={'quantidade_disponivel'})
+
+        # Mesmo veredito que a validação padrão do Django (Q.check no banco)
+        def mensagens(validar):
+            try:
+                validar()
+            except ValidationError as e:
+                return e.messages
+            return []
+
+        for total, disponivel in [(1, 2), (1, 1), (3, 0), (0, -1), (2, None)]:
+            livro.quantidade_total, livro.quantidade_disponivel = total, disponivel
+            esperado = [m for c in Livro._meta.constraints for m in mensagens(lambda: c.validate(Livro, livro))]
+            with self.assertNumQueries(0):
+                self.assertEqual(mensagens(livro.validate_constraints), esperado, (total, disponivel))
+
     # --- Testes de Membro ---
 
     def test_criacao_membro(self):
@@ -93,4 +123,83 @@ class ModelTests(TestCase):
         self.assertEqual(self.emprestimo.data_devolucao, data_devolucao_fixa)
         
         # 2. Estoque (3 + 1 = 4)
-        self.assertEqual(self.livro.quantidade_disponivel, estoque_antes + 1)
\ No newline at end of file
+        self.assertEqual(self.livro.quantidade_disponivel, estoque_antes + 1)
+
+class PlanoDeConsultaTests(TestCase):
+    """
+    Regressão de plano de consulta: as consultas mais frequentes do app e do
+    admin devem usar os índices das migrações 0003/0004, nunca varrer a tabela inteira.
+    """
+
+    def assertUsaIndice(self, queryset, indice=None):
+        """Falha se o EXPLAIN mostrar SCAN sem índice ou ordenação em árvore temporária."""
+        plano = queryset.explain()
+        for linha in plano.splitlines():
+            detalhe = linha.split(maxsplit=3)[-1]
+            if detalhe.startswith('SCAN') and 'USING' not in detalhe:
+                self.fail(f"Varredura completa de tabela:\n{plano}")
+            if 'TEMP B-TREE' in detalhe:
+                self.fail(f"Ordenação sem índice:\n{plano}")
+        if indice:
+            self.assertIn(indice, plano)
+
+    def test_listagem_do_acervo(self):
+        """Primeira página da listagem: ORDER BY titulo, id pelo índice composto."""
+        self.assertUsaIndice(
+            Livro.objects.select_related('autor').order_by('titulo', 'id')[:51],
+            'livro_titulo_id_idx',
+        )
+
+    def test_pagina_profunda_do_acervo(self):
+        """Página seguinte por cursor (titulo, id) continua no índice composto."""
+        self.assertUsaIndice(
+            Livro.objects.select_related('autor')
+            .filter(_filtro_apos(('titulo', 'id'), ['M', 10], 'gt'))
+            .order_by('titulo', 'id')[:51],
+            'livro_titulo_id_idx',
+        )
+
+    def test_emprestimos_ativos_por_data_prevista(self):
+        """Atrasados (status Ativo e data_prevista < hoje) usam o índice (status, data_prevista)."""
+        self.assertUsaIndice(
+            Emprestimo.objects.filter(status="Ativo", data_prevista__lt=date.today())
+            .order_by('data_prevista'),
+            'emprestimo_status_prevista_idx',
+        )
+
+    def test_queryset_de_atrasados(self):
+        """A API Emprestimo.objects.atrasados() (em aberto) usa o índice parcial dos não devolvidos."""
+        self.assertUsaIndice(Emprestimo.objects.atrasados(), 'emprestimo_aberto_prevista_idx')
+        self.assertUsaIndice(Emprestimo.objects.em_aberto().order_by('data_prevista'), 'emprestimo_aberto_prevista_idx')
+
+    def test_emprestimos_em_aberto(self):
+        """Empréstimos ainda não devolvidos usam o índice parcial por data prevista."""
+        self.assertUsaIndice(
+            Emprestimo.objects.filter(data_devolucao__isnull=True).order_by('data_prevista'),
+            'emprestimo_aberto_prevista_idx',
+        )
+
+    def test_changelist_de_emprestimos(self):
+        """Ordenação padrão do admin (-data_saida, -id) sem ordenação temporária."""
+        self.assertUsaIndice(
+            Emprestimo.objects.order_by('-data_saida', '-id')[:100],
+            'emprestimo_saida_idx',
+        )
+
+    def test_filtros_do_admin(self):
+        """Filtros por status, tipo de membro, ano e editora usam índice."""
+        self.assertUsaIndice(Emprestimo.objects.filter(status="Devolvido"), 'emprestimo_status_saida_idx')
+        self.assertUsaIndice(Membro.objects.filter(tipo="Estudante"), 'membro_tipo_idx')
+        self.assertUsaIndice(Livro.objects.filter(ano=1949), 'livro_ano_idx')
+        self.assertUsaIndice(Livro.objects.filter(editora="Rocco"), 'livro_editora_idx')
+
+    def test_autocompletar_por_prefixo(self):
+        """istartswith (LIKE 'x%') usa os índices NOCASE, inclusive para ordenar."""
+        self.assertUsaIndice(
+            Livro.objects.filter(titulo__istartswith="dom").order_by(Collate('titulo', 'NOCASE'), 'id')[:20],
+            'livro_titulo_nocase_idx',
+        )
+        self.assertUsaIndice(
+            Membro.objects.filter(contato__istartswith="ana").order_by(Collate('contato', 'NOCASE'), 'id')[:20],
+            'membro_contato_nocase_idx',
+        )
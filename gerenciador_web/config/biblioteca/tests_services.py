@@ -0,0 +1,937 @@
+# biblioteca/tests_services.py
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .arquivamento import arquivar_emprestimos
+from .dados_sinteticos import gerar
+from .estatisticas import painel, recalcular
+from .forms import EmprestimoForm
+from .importacao import importar_csv
+from .models import (
+    Autor, CirculacaoDiaria, Emprestimo, EmprestimoArquivado, EmprestimosDoLivroNoDia, EstoquePorEditora,
+    HistoricoEmprestimo, Livro, Membro, Reserva, Tarefa,
+)
+from .tarefas import enfileirar, executar, recuperar_interrompidas, reivindicar, tarefa
+from .services import (
+    EstoqueIndisponivel, ReservaIndisponivel, cancelar_reserva, devolver_em_lote, expirar_reservas,
+    reconciliar_contadores, registrar_devolucao, registrar_emprestimo, registrar_emprestimos_em_lote, reservar,
+)
+
+
+class EstoqueServiceTests(TestCase):
+    """
+    Testes do serviço de empréstimo/devolução: o estoque é alterado com
+    UPDATE condicional no banco e protegido por CheckConstraints.
+    """
+
+    def setUp(self):
+        self.autor = Autor.objects.create(nome="Machado de Assis")
+        self.livro = Livro.objects.create(
+            titulo="Dom Casmurro",
+            autor=self.autor,
+            editora="Garnier",
+            ano=1899,
+            quantidade_total=2,
+            quantidade_disponivel=1,
+        )
+        self.membro = Membro.objects.create(nome="Bia", contato="bia@exemplo.com", tipo="Estudante")
+
+    def test_emprestimo_baixa_estoque(self):
+        """Um empréstimo cria o registro e baixa uma cópia no banco."""
+        emprestimo = registrar_emprestimo(self.membro, self.livro)
+        self.livro.refresh_from_db()
+        self.assertEqual(self.livro.quantidade_disponivel, 0)
+        self.assertEqual(emprestimo.status, "Ativo")
+
+    def test_emprestimo_sem_estoque_nao_cria_registro(self):
+        """Sem cópias, o serviço levanta EstoqueIndisponivel e não cria nada."""
+        registrar_emprestimo(self.membro, self.livro)
+        with self.assertRaises(EstoqueIndisponivel):
+            registrar_emprestimo(self.membro, self.livro)
+        self.assertEqual(Emprestimo.objects.count(), 1)
+
+    def test_formularios_concorrentes_nao_vendem_a_mais(self):
+        """Dois formulários validados com a mesma última cópia: só um empréstimo passa."""
+        dados = {'membro': self.membro.pk, 'livro': self.livro.pk}
+        form_a, form_b = EmprestimoForm(dados), EmprestimoForm(dados)
+        # Os dois passam pela pré-checagem antes de qualquer gravação
+        self.assertTrue(form_a.is_valid())
+        self.assertTrue(form_b.is_valid())
+
+        form_a.save()
+        with self.assertRaises(EstoqueIndisponivel):
+            form_b.save()
+
+        self.livro.refresh_from_db()
+        self.assertEqual(self.livro.quantidade_disponivel, 0)
+        self.assertEqual(Emprestimo.objects.count(), 1)
+
+    def test_devolucao_repoe_estoque_uma_unica_vez(self):
+        """Devolver duas vezes o mesmo empréstimo só repõe uma cópia."""
+        emprestimo = registrar_emprestimo(self.membro, self.livro)
+        self.assertTrue(registrar_devolucao(emprestimo, date(2025, 1, 10)))
+        self.assertFalse(registrar_devolucao(emprestimo))
+
+        self.livro.refresh_from_db()
+        emprestimo.refresh_from_db()
+        self.assertEqual(self.livro.quantidade_disponivel, 1)
+        self.assertEqual(emprestimo.status, "Devolvido")
+        self.assertEqual(emprestimo.data_devolucao, date(2025, 1, 10))
+
+    def test_constraint_impede_estoque_negativo(self):
+        """Mesmo um UPDATE direto não consegue deixar o estoque negativo."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=-1)
+
+    def test_constraint_impede_estoque_acima_do_total(self):
+        """O disponível nunca passa da quantidade total."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=3)
+
+
+class DevolucaoEmLoteTests(TestCase):
+    """
+    Testes da devolução em lote (action do admin e comando devolver_emprestimos):
+    número de consultas constante e estoque agregado por livro.
+    """
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Clarice Lispector")
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Livro {i}", autor=autor, editora="Rocco", ano=1970,
+                quantidade_total=10, quantidade_disponivel=10,
+            )
+            for i in range(3)
+        ]
+        self.membro = Membro.objects.create(nome="Caio", contato="caio@exemplo.com", tipo="Comum")
+        # 3 empréstimos do primeiro livro, 2 do segundo, 1 do terceiro
+        for livro, quantidade in zip(self.livros, (3, 2, 1)):
+            for _ in range(quantidade):
+                registrar_emprestimo(self.membro, livro)
+
+    def _estoques(self):
+        return list(
+            Livro.objects.order_by('pk').values_list('quantidade_disponivel', flat=True)
+        )
+
+    def test_devolucao_em_lote_agrega_estoque(self):
+        """Cada livro recebe de volta exatamente as cópias devolvidas."""
+        self.assertEqual(self._estoques(), [7, 8, 9])
+        # savepoint + SELECT agrupado + UPDATE nos empréstimos + filas de reserva
+        # + 2 UPDATEs (livros, membros) + 2 resumos das estatísticas + release
+        with self.assertNumQueries(9):
+            devolvidos = devolver_em_lote(Emprestimo.objects.all(), date(2025, 3, 1))
+
+        self.assertEqual(devolvidos, 6)
+        self.assertEqual(self._estoques(), [10, 10, 10])
+        self.assertFalse(Emprestimo.objects.exclude(status="Devolvido").exists())
+        self.assertEqual(
+            set(Emprestimo.objects.values_list('data_devolucao', flat=True)), {date(2025, 3, 1)}
+        )
+
+    def test_devolucao_em_lote_ignora_ja_devolvidos(self):
+        """Empréstimos já devolvidos não repõem estoque de novo."""
+        registrar_devolucao(Emprestimo.objects.filter(livro=self.livros[2]).get())
+        devolvidos = devolver_em_lote(Emprestimo.objects.all())
+        self.assertEqual(devolvidos, 5)
+        self.assertEqual(self._estoques(), [10, 10, 10])
+        self.assertEqual(devolver_em_lote(Emprestimo.objects.all()), 0)
+
+    def test_action_do_admin(self):
+        """A action marcar_como_devolvido usa a devolução em lote."""
+        User.objects.create_superuser('admin', 'admin@exemplo.com', 'senha')
+        self.client.login(username='admin', password='senha')
+        selecionados = Emprestimo.objects.filter(livro=self.livros[0]).values_list('pk', flat=True)
+        response = self.client.post(
+            reverse('admin:biblioteca_emprestimo_changelist'),
+            {'action': 'marcar_como_devolvido', '_selected_action': list(selecionados)},
+            follow=True,
+        )
+        self.assertContains(response, "3 empréstimo(s) foram marcados como Devolvidos")
+        self.assertEqual(self._estoques(), [10, 8, 9])
+
+    def test_comando_devolver_emprestimos(self):
+        """O comando devolve por livro e informa o total."""
+        saida = StringIO()
+        call_command('devolver_emprestimos', '--livro', str(self.livros[1].pk), stdout=saida)
+        self.assertIn("2 empréstimo(s) devolvido(s).", saida.getvalue())
+        self.assertEqual(self._estoques(), [7, 10, 9])
+
+
+class EmprestimoEmLoteTests(TestCase):
+    """
+    Testes do empréstimo em lote: estoque baixado por UPDATE agrupado,
+    Empréstimos criados com um bulk_create e nada gravado se faltar um livro.
+    """
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Cecília Meireles")
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Livro {i}", autor=autor, editora="Global", ano=1960,
+                quantidade_total=2, quantidade_disponivel=2,
+            )
+            for i in range(5)
+        ]
+        self.membro = Membro.objects.create(nome="Davi", contato="davi@exemplo.com", tipo="Comum")
+
+    def test_lote_com_consultas_constantes(self):
+        # savepoint + reservas separadas + UPDATE nos livros + UPDATE no membro
+        # + INSERT + 3 resumos das estatísticas + release
+        with self.assertNumQueries(9):
+            emprestimos = registrar_emprestimos_em_lote(self.membro, self.livros)
+
+        self.assertEqual(len(emprestimos), 5)
+        self.assertTrue(all(emprestimo.pk for emprestimo in emprestimos))
+        self.assertEqual(
+            list(Livro.objects.values_list('quantidade_disponivel', 'emprestimos_ativos', 'vezes_emprestado')),
+            [(1, 1, 1)] * 5,
+        )
+        self.membro.refresh_from_db()
+        self.assertEqual((self.membro.emprestimos_ativos, self.membro.total_emprestimos), (5, 5))
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_livro_repetido_baixa_as_duas_copias(self):
+        registrar_emprestimos_em_lote(self.membro, [self.livros[0], self.livros[0]])
+        self.livros[0].refresh_from_db()
+        self.assertEqual(self.livros[0].quantidade_disponivel, 0)
+        self.assertEqual(Emprestimo.objects.filter(livro=self.livros[0]).count(), 2)
+
+    def test_tudo_ou_nada(self):
+        """Um livro sem cópias desfaz o lote inteiro e é apontado no erro."""
+        Livro.objects.filter(pk=self.livros[3].pk).update(quantidade_disponivel=0)
+        with self.assertRaises(EstoqueIndisponivel) as erro:
+            registrar_emprestimos_em_lote(self.membro, self.livros)
+
+        self.assertEqual(erro.exception.livros, [self.livros[3]])
+        self.assertIn('"Livro 3"', str(erro.exception))
+        self.assertFalse(Emprestimo.objects.exists())
+        self.assertEqual(
+            list(Livro.objects.order_by('pk').values_list('quantidade_disponivel', flat=True)),
+            [2, 2, 2, 0, 2],
+        )
+        self.membro.refresh_from_db()
+        self.assertEqual(self.membro.total_emprestimos, 0)
+
+
+class ReservaTests(TestCase):
+    """
+    Testes das reservas: fila FIFO por livro, cópia devolvida separada para o
+    primeiro da fila com consultas constantes e expiração em lote.
+    """
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Lygia Fagundes Telles")
+        self.livro = Livro.objects.create(
+            titulo="As Meninas", autor=autor, editora="Rocco", ano=1973,
+            quantidade_total=2, quantidade_disponivel=0,
+        )
+        self.membros = [
+            Membro.objects.create(nome=f"Membro {i}", contato=f"m{i}@exemplo.com", tipo="Comum")
+            for i in range(4)
+        ]
+        # As duas cópias emprestadas ao último membro
+        Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=2)
+        self.emprestimos = [registrar_emprestimo(self.membros[3], self.livro) for _ in range(2)]
+
+    def _estoque(self):
+        self.livro.refresh_from_db()
+        return self.livro.quantidade_disponivel
+
+    def test_fila_por_ordem_de_chegada(self):
+        reservas = [reservar(membro, self.livro) for membro in self.membros[:3]]
+        self.assertEqual([r.status for r in reservas], ["Aguardando"] * 3)
+        self.assertEqual([r.posicao_na_fila() for r in reservas], [1, 2, 3])
+
+        registrar_devolucao(self.emprestimos[0], date(2025, 3, 1))
+        self.assertEqual(
+            list(Reserva.objects.order_by('pk').values_list('status', 'separada_ate')),
+            [("Separada", date(2025, 3, 4)), ("Aguardando", None), ("Aguardando", None)],
+        )
+        # A cópia espera pelo membro: não volta ao estoque
+        self.assertEqual(self._estoque(), 0)
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+        # Só o dono da reserva leva a cópia separada
+        with self.assertRaises(EstoqueIndisponivel):
+            registrar_emprestimo(self.membros[1], self.livro)
+        registrar_emprestimo(self.membros[0], self.livro)
+        self.assertEqual(Reserva.objects.get(pk=reservas[0].pk).status, "Atendida")
+        self.assertEqual(self._estoque(), 0)
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_devolucao_com_consultas_constantes(self):
+        """O tamanho da fila não muda o número de consultas da devolução."""
+        reservar(self.membros[0], self.livro)
+        # savepoint + UPDATE no empréstimo + UPDATE na fila + aviso na fila de tarefas
+        # + UPDATEs em livro e membro + SELECT dos dados do resumo
+        # + 2 resumos das estatísticas + release
+        with self.assertNumQueries(10):
+            registrar_devolucao(self.emprestimos[0])
+
+        for i in range(200):
+            membro = Membro.objects.create(nome=f"Fila {i}", contato=f"f{i}@exemplo.com", tipo="Comum")
+            reservar(membro, self.livro)
+        with self.assertNumQueries(10):
+            registrar_devolucao(self.emprestimos[1])
+        self.assertEqual(Reserva.objects.filter(status="Separada").count(), 2)
+        # Os avisos das duas separações são uma tarefa só
+        self.assertEqual(Tarefa.objects.filter(nome='avisar_reservas').count(), 1)
+
+    def test_devolucao_em_lote_atende_a_fila_e_devolve_o_resto(self):
+        reservar(self.membros[0], self.livro)
+        devolver_em_lote(Emprestimo.objects.all())
+        self.assertEqual(Reserva.objects.get().status, "Separada")
+        self.assertEqual(self._estoque(), 1)
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+        # Com cópia na estante, a reserva já nasce separada
+        self.assertEqual(reservar(self.membros[1], self.livro).status, "Separada")
+        self.assertEqual(self._estoque(), 0)
+
+    def test_emprestimo_em_lote_usa_a_copia_separada(self):
+        reservar(self.membros[0], self.livro)
+        registrar_devolucao(self.emprestimos[0])
+        registrar_emprestimos_em_lote(self.membros[0], [self.livro])
+        self.assertEqual(Reserva.objects.get().status, "Atendida")
+        self.assertEqual(self._estoque(), 0)
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_expiracao_passa_a_copia_adiante(self):
+        for membro in self.membros[:2]:
+            reservar(membro, self.livro)
+        registrar_devolucao(self.emprestimos[0], date(2025, 3, 1))
+
+        # Ainda no prazo
+        self.assertEqual(expirar_reservas(date(2025, 3, 4)), 0)
+        self.assertEqual(expirar_reservas(date(2025, 3, 5), lote=1), 1)
+        self.assertEqual(
+            list(Reserva.objects.order_by('pk').values_list('status', 'separada_ate')),
+            [("Expirada", date(2025, 3, 4)), ("Separada", date(2025, 3, 8))],
+        )
+        # Fila vazia: a cópia volta ao estoque
+        self.assertEqual(expirar_reservas(date(2025, 3, 9)), 1)
+        self.assertEqual(self._estoque(), 1)
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_cancelamento(self):
+        primeira, segunda = (reservar(membro, self.livro) for membro in self.membros[:2])
+        registrar_devolucao(self.emprestimos[0])
+        cancelar_reserva(primeira)
+        self.assertEqual(Reserva.objects.get(pk=segunda.pk).status, "Separada")
+        cancelar_reserva(segunda)
+        self.assertEqual(self._estoque(), 1)
+        with self.assertRaises(ReservaIndisponivel):
+            cancelar_reserva(segunda)
+
+    def test_comando_processar_reservas_avisa_uma_vez(self):
+        reservar(self.membros[0], self.livro)
+        registrar_devolucao(self.emprestimos[0])
+        saida = StringIO()
+        call_command('processar_reservas', stdout=saida)
+        call_command('processar_reservas', stdout=saida)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["m0@exemplo.com"])
+        self.assertIn('Reserva disponível: "As Meninas"', mail.outbox[0].subject)
+        self.assertIn("1 aviso(s) de reserva enviado(s).", saida.getvalue())
+
+
+# Tarefas de teste: falham enquanto a lista tiver itens
+FALHAS = []
+
+
+@tarefa('teste_falha_n_vezes', max_tentativas=2)
+def _falha_n_vezes():
+    if FALHAS:
+        FALHAS.pop()
+        raise RuntimeError("falha de teste")
+
+
+class TarefasTests(TestCase):
+    """Testes da fila de tarefas: deduplicação, prioridade, novas tentativas e o worker."""
+
+    def test_chave_deduplica_so_as_pendentes(self):
+        for _ in range(3):
+            enfileirar('avisar_reservas', chave='avisar_reservas')
+        self.assertEqual(Tarefa.objects.count(), 1)
+
+        reivindicar('teste')
+        # A pendente virou "Executando": um novo evento precisa de outra tarefa
+        enfileirar('avisar_reservas', chave='avisar_reservas')
+        self.assertEqual(list(Tarefa.objects.order_by('pk').values_list('status', flat=True)), ["Executando", "Pendente"])
+
+    def test_reivindica_por_prioridade_em_lotes(self):
+        enfileirar('recalcular_estatisticas')  # prioridade -10
+        enfileirar('avisar_reservas')  # prioridade 10
+        enfileirar('teste_falha_n_vezes', atraso=60)  # ainda não está pronta
+        enfileirar('teste_falha_n_vezes', prioridade=5)
+        # savepoint + SELECT ... LIMIT + UPDATE + SELECT das reivindicadas + release
+        with self.assertNumQueries(5):
+            lote = reivindicar('teste', limite=2)
+        self.assertEqual([(t.nome, t.prioridade, t.tentativas) for t in lote],
+                         [('avisar_reservas', 10, 1), ('teste_falha_n_vezes', 5, 1)])
+        self.assertEqual([t.nome for t in reivindicar('outro')], ['recalcular_estatisticas'])
+        self.assertEqual(reivindicar('outro'), [])
+
+    def test_novas_tentativas_com_espera_e_falha_final(self):
+        FALHAS[:] = [1, 1]
+        enfileirar('teste_falha_n_vezes')
+        (primeira,) = reivindicar('teste')
+        self.assertEqual(executar(primeira), "Pendente")
+        tarefa_ = Tarefa.objects.get()
+        self.assertIn("falha de teste", tarefa_.erro)
+        self.assertGreaterEqual((tarefa_.executar_apos - primeira.iniciada_em).total_seconds(), 30)
+        self.assertEqual(reivindicar('teste'), [])
+
+        Tarefa.objects.update(executar_apos=tarefa_.criada_em)
+        (segunda,) = reivindicar('teste')
+        self.assertEqual(executar(segunda), "Falhou")
+        self.assertEqual(Tarefa.objects.get().tentativas, 2)
+
+    def test_tarefa_desconhecida_falha_sem_repetir(self):
+        Tarefa.objects.create(nome='nao_existe')
+        (desconhecida,) = reivindicar('teste')
+        self.assertEqual(executar(desconhecida), "Falhou")
+
+    def test_interrompida_volta_para_a_fila(self):
+        enfileirar('avisar_reservas')
+        reivindicar('teste')
+        self.assertEqual(recuperar_interrompidas(600), 0)
+        self.assertEqual(recuperar_interrompidas(-1), 1)
+        self.assertEqual(Tarefa.objects.get().status, "Pendente")
+
+    def test_interrompida_sem_tentativas_restantes_falha(self):
+        enfileirar('teste_falha_n_vezes')  # max_tentativas=2
+        reivindicar('teste')
+        self.assertEqual(recuperar_interrompidas(-1), 1)
+        Tarefa.objects.update(executar_apos=timezone.now())
+        reivindicar('teste')
+        self.assertEqual(recuperar_interrompidas(-1), 0)
+        tarefa_ = Tarefa.objects.get()
+        self.assertEqual((tarefa_.status, tarefa_.tentativas), ("Falhou", 2))
+        self.assertIsNotNone(tarefa_.concluida_em)
+
+    def test_nova_tentativa_com_chave_ja_pendente(self):
+        """Falha ou interrupção com outra tarefa da mesma chave já na fila: não viola o índice único."""
+        FALHAS[:] = [1]
+        enfileirar('teste_falha_n_vezes', chave='aviso')
+        (falhou,) = reivindicar('teste')
+        enfileirar('teste_falha_n_vezes', chave='aviso')  # evento novo durante a execução
+        self.assertEqual(executar(falhou), "Falhou")
+        self.assertIn("mesma chave", Tarefa.objects.get(pk=falhou.pk).erro)
+
+        (interrompida,) = reivindicar('teste')
+        enfileirar('teste_falha_n_vezes', chave='aviso')
+        self.assertEqual(recuperar_interrompidas(-1), 0)
+        self.assertEqual(Tarefa.objects.get(pk=interrompida.pk).status, "Falhou")
+        self.assertEqual(Tarefa.objects.filter(status="Pendente", chave='aviso').count(), 1)
+
+    def test_worker_envia_os_avisos_de_reserva(self):
+        autor = Autor.objects.create(nome="Rachel de Queiroz")
+        livro = Livro.objects.create(titulo="O Quinze", autor=autor, editora="José Olympio", ano=1930,
+                                     quantidade_total=1, quantidade_disponivel=1)
+        membro = Membro.objects.create(nome="Ana", contato="ana@exemplo.com", tipo="Comum")
+        reservar(membro, livro)
+        self.assertEqual(len(mail.outbox), 0)
+
+        saida = StringIO()
+        call_command('processar_tarefas', '--trabalhadores', '0', '--uma-vez', stdout=saida)
+        self.assertIn("1 tarefa(s) concluída(s), 0 para nova tentativa, 0 com falha.", saida.getvalue())
+        self.assertEqual([m.to for m in mail.outbox], [["ana@exemplo.com"]])
+        self.assertTrue(Reserva.objects.get().notificada)
+
+    def test_painel_agenda_o_recalculo(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', None))
+        url = reverse('biblioteca:painel_estatisticas')
+        self.client.post(url)
+        self.assertRedirects(self.client.post(url), url)
+        self.assertEqual(list(Tarefa.objects.values_list('nome', 'status')), [('recalcular_estatisticas', "Pendente")])
+
+
+class ContadoresCirculacaoTests(TestCase):
+    """
+    Testes dos contadores de circulação em Livro e Membro: mantidos pelos
+    serviços e reconciliados a partir dos empréstimos.
+    """
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Graciliano Ramos")
+        self.livro = Livro.objects.create(
+            titulo="Vidas Secas", autor=autor, editora="Record", ano=1938,
+            quantidade_total=3, quantidade_disponivel=3,
+        )
+        self.membros = [
+            Membro.objects.create(nome=f"Membro {i}", contato=f"m{i}@exemplo.com", tipo="Comum")
+            for i in range(2)
+        ]
+
+    def _contadores(self):
+        self.livro.refresh_from_db()
+        return (
+            (self.livro.emprestimos_ativos, self.livro.vezes_emprestado),
+            list(Membro.objects.order_by('pk').values_list('emprestimos_ativos', 'total_emprestimos')),
+        )
+
+    def test_emprestimo_e_devolucoes_atualizam_contadores(self):
+        primeiro = registrar_emprestimo(self.membros[0], self.livro)
+        registrar_emprestimo(self.membros[0], self.livro)
+        registrar_emprestimo(self.membros[1], self.livro)
+        self.assertEqual(self._contadores(), ((3, 3), [(2, 2), (1, 1)]))
+
+        registrar_devolucao(primeiro)
+        self.assertEqual(self._contadores(), ((2, 3), [(1, 2), (1, 1)]))
+
+        devolver_em_lote(Emprestimo.objects.all())
+        self.assertEqual(self._contadores(), ((0, 3), [(0, 2), (0, 1)]))
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_reconciliacao_aponta_e_corrige_divergencias(self):
+        registrar_emprestimo(self.membros[0], self.livro)
+        # Edições fora dos serviços (estoque à mão, empréstimo criado direto)
+        Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=3)
+        Emprestimo.objects.create(membro=self.membros[1], livro=self.livro)
+
+        divergencias = reconciliar_contadores()
+        self.assertEqual(divergencias[Livro], [(self.livro.pk, {
+            'emprestimos_ativos': (1, 2), 'vezes_emprestado': (1, 2), 'quantidade_disponivel': (3, 1),
+        })])
+        self.assertEqual(divergencias[Membro], [(self.membros[1].pk, {
+            'emprestimos_ativos': (0, 1), 'total_emprestimos': (0, 1),
+        })])
+
+        saida = StringIO()
+        call_command('reconciliar_contadores', '--corrigir', stdout=saida)
+        self.assertIn("2 linha(s) corrigida(s).", saida.getvalue())
+        self.assertEqual(self._contadores(), ((2, 2), [(1, 1), (1, 1)]))
+        self.assertEqual(self.livro.quantidade_disponivel, 1)
+
+        saida = StringIO()
+        call_command('reconciliar_contadores', stdout=saida)
+        self.assertIn("Contadores em dia.", saida.getvalue())
+
+
+class ArquivamentoTests(TestCase):
+    """
+    Testes do arquivo de empréstimos: devolvidos antigos saem da tabela em
+    uso em lotes e continuam visíveis pelo HistoricoEmprestimo.
+    """
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Jorge Amado")
+        self.livro = Livro.objects.create(
+            titulo="Capitães da Areia", autor=autor, editora="Record", ano=1937,
+            quantidade_total=10, quantidade_disponivel=10,
+        )
+        self.membro = Membro.objects.create(nome="Eva", contato="eva@exemplo.com", tipo="Comum")
+        emprestimos = [registrar_emprestimo(self.membro, self.livro) for _ in range(6)]
+        # 5 devolvidos em 2023 (um deles recente demais para o corte), 1 em aberto
+        for i, emprestimo in enumerate(emprestimos[:5]):
+            registrar_devolucao(emprestimo, date(2023, 1, 10 + i))
+        self.aberto = emprestimos[5]
+
+    def test_arquiva_em_lotes_e_historico_continua_completo(self):
+        arquivados = arquivar_emprestimos(date(2023, 1, 14), lote=2)
+
+        self.assertEqual(arquivados, 4)
+        self.assertEqual(
+            sorted(Emprestimo.objects.values_list('data_devolucao', flat=True), key=str),
+            [date(2023, 1, 14), None],
+        )
+        self.assertEqual(EmprestimoArquivado.objects.count(), 4)
+        self.assertEqual(arquivar_emprestimos(date(2023, 1, 14)), 0)
+
+        historico = HistoricoEmprestimo.objects.select_related('livro', 'membro').order_by('pk')
+        self.assertEqual(len(historico), 6)
+        self.assertEqual([h.arquivado for h in historico], [True] * 4 + [False] * 2)
+        self.assertEqual({h.status for h in historico[:4]}, {"Devolvido"})
+        self.assertEqual(historico[5].pk, self.aberto.pk)
+        self.assertEqual(historico[0].livro.titulo, "Capitães da Areia")
+        # Os totais de circulação contam os arquivados
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_comando_e_exportacao_do_historico(self):
+        saida = StringIO()
+        call_command('arquivar_emprestimos', '--antes-de', '2024-01-01', stdout=saida)
+        self.assertIn("5 empréstimo(s) devolvido(s) antes de 01/01/2024 arquivado(s).", saida.getvalue())
+        self.assertEqual(list(Emprestimo.objects.all()), [self.aberto])
+
+        saida = StringIO()
+        call_command('exportar_dados', 'historico', stdout=saida)
+        linhas = saida.getvalue().splitlines()
+        self.assertEqual(len(linhas), 7)
+        self.assertTrue(linhas[0].endswith('status,arquivado'))
+        self.assertTrue(linhas[1].endswith('Devolvido,True'))
+
+
+class EstatisticasTests(TestCase):
+    """
+    Testes dos resumos diários de circulação: atualizados pelos serviços,
+    iguais aos reconstruídos do histórico e lidos pelo painel.
+    """
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Rachel de Queiroz")
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Livro {editora}", autor=autor, editora=editora, ano=1930,
+                quantidade_total=4, quantidade_disponivel=4,
+            )
+            for editora in ("Alfa", "Beta")
+        ]
+        self.estudante = Membro.objects.create(nome="Gil", contato="gil@exemplo.com", tipo="Estudante")
+        self.professora = Membro.objects.create(nome="Ana", contato="ana@exemplo.com", tipo="Professor")
+        self.hoje = date.today()
+
+    def _resumos(self):
+        return (
+            list(CirculacaoDiaria.objects.order_by('dia', 'tipo_membro', 'editora').values_list(
+                'dia', 'tipo_membro', 'editora', 'emprestimos', 'devolucoes', 'devolucoes_atrasadas')),
+            list(EmprestimosDoLivroNoDia.objects.order_by('dia', 'livro').values_list('dia', 'livro', 'emprestimos')),
+            list(EstoquePorEditora.objects.order_by('editora').values_list('editora', 'copias', 'emprestadas')),
+        )
+
+    def _circular(self):
+        alfa, beta = self.livros
+        atrasado = registrar_emprestimo(self.estudante, alfa, data_prevista=self.hoje - timedelta(days=1))
+        registrar_emprestimos_em_lote(self.professora, [alfa, beta, beta])
+        registrar_emprestimo(self.estudante, beta)
+        registrar_devolucao(atrasado)
+        devolver_em_lote(Emprestimo.objects.filter(membro=self.professora, livro=beta))
+
+    def test_servicos_atualizam_os_resumos(self):
+        self._circular()
+        circulacao, por_livro, por_editora = self._resumos()
+        self.assertEqual(circulacao, [
+            (self.hoje, "Estudante", "Alfa", 1, 1, 1),
+            (self.hoje, "Estudante", "Beta", 1, 0, 0),
+            (self.hoje, "Professor", "Alfa", 1, 0, 0),
+            (self.hoje, "Professor", "Beta", 2, 2, 0),
+        ])
+        self.assertEqual(por_livro, [(self.hoje, self.livros[0].pk, 2), (self.hoje, self.livros[1].pk, 3)])
+        self.assertEqual(por_editora, [("Alfa", 4, 1), ("Beta", 4, 1)])
+
+    def test_recalcular_reproduz_os_resumos_incrementais(self):
+        self._circular()
+        incrementais = self._resumos()
+        recalcular()
+        self.assertEqual(self._resumos(), incrementais)
+
+        # Cadastro de livro atualiza as cópias da editora
+        Livro.objects.create(titulo="Outro", autor=self.livros[0].autor, editora="Alfa", ano=1931,
+                             quantidade_total=6, quantidade_disponivel=6)
+        self.assertEqual(EstoquePorEditora.objects.get(editora="Alfa").copias, 10)
+
+    def test_livro_que_troca_de_editora(self):
+        """Cópias e empréstimos em aberto saem da editora antiga e vão para a nova."""
+        self._circular()
+        livro = Livro.objects.get(pk=self.livros[0].pk)
+        livro.editora = "Gama"
+        livro.save()
+        estoque = dict((e, (c, n)) for e, c, n in self._resumos()[2])
+        self.assertEqual(estoque, {"Alfa": (0, 0), "Beta": (4, 1), "Gama": (4, 1)})
+        recalcular()
+        self.assertEqual(self._resumos()[2], [("Beta", 4, 1), ("Gama", 4, 1)])
+
+    def test_painel_le_so_os_resumos(self):
+        self._circular()
+        with self.assertNumQueries(4):
+            dados = painel(hoje=self.hoje)
+        self.assertEqual([(l['livro_id'], l['total']) for l in dados['mais_emprestados']],
+                         [(self.livros[1].pk, 3), (self.livros[0].pk, 2)])
+        self.assertEqual(dados['por_mes'][-1]['emprestimos'], 5)
+        self.assertEqual(
+            [(l['tipo_membro'], l['taxa']) for l in dados['atraso_por_tipo']],
+            [("Estudante", 100.0), ("Professor", 0.0)],
+        )
+        self.assertEqual([(e.editora, e.taxa) for e in dados['utilizacao_por_editora']],
+                         [("Alfa", 25.0), ("Beta", 25.0)])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', None))
+        response = self.client.get(reverse('biblioteca:painel_estatisticas'))
+        self.assertContains(response, "Livro Beta")
+        self.assertContains(response, "100.0%")
+
+
+class AtrasosTests(TestCase):
+    """Testes da API de atrasos (EmprestimoQuerySet) e do comando verificar_atrasos."""
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Jorge Amado")
+        self.livro = Livro.objects.create(
+            titulo="Capitães da Areia", autor=autor, editora="Record", ano=1937,
+            quantidade_total=20, quantidade_disponivel=20,
+        )
+        self.membros = [
+            Membro.objects.create(nome=f"Membro {i}", contato=f"m{i}@exemplo.com", tipo="Comum")
+            for i in range(5)
+        ]
+        self.hoje = date(2025, 6, 15)
+        # 3 atrasados, 1 vencendo hoje (não atrasado) e 1 atrasado porém já devolvido
+        for i, prevista in enumerate([date(2025, 6, 1), date(2025, 6, 10), date(2025, 6, 14), self.hoje]):
+            registrar_emprestimo(self.membros[i], self.livro, data_prevista=prevista)
+        devolvido = registrar_emprestimo(self.membros[4], self.livro, data_prevista=date(2025, 5, 1))
+        registrar_devolucao(devolvido)
+
+    def test_atrasados(self):
+        """Só entram os empréstimos em aberto com data prevista antes da referência."""
+        self.assertEqual(Emprestimo.objects.atrasados(self.hoje).count(), 3)
+
+    def test_marcar_atrasados_com_um_update(self):
+        """A marcação é um único UPDATE e os marcados continuam na lista de atrasados."""
+        with self.assertNumQueries(1):
+            marcados = Emprestimo.objects.marcar_atrasados(self.hoje)
+        self.assertEqual(marcados, 3)
+        self.assertEqual(Emprestimo.objects.filter(status="Atrasado").count(), 3)
+        self.assertEqual(Emprestimo.objects.atrasados(self.hoje).count(), 3)
+        self.assertEqual(Emprestimo.objects.marcar_atrasados(self.hoje), 0)
+
+    def test_em_lotes_com_relacionados_carregados(self):
+        """Os lotes respeitam o tamanho e já trazem membro e livro (uma consulta no total)."""
+        with self.assertNumQueries(1):
+            lotes = list(
+                Emprestimo.objects.atrasados(self.hoje).select_related('membro', 'livro').em_lotes(2)
+            )
+            nomes = [str(e) for lote in lotes for e in lote]
+        self.assertEqual([len(lote) for lote in lotes], [2, 1])
+        self.assertEqual(len(nomes), 3)
+
+    def test_devolucao_de_emprestimo_atrasado(self):
+        """Um empréstimo marcado como 'Atrasado' ainda pode ser devolvido e repõe o estoque."""
+        Emprestimo.objects.marcar_atrasados(self.hoje)
+        self.assertEqual(devolver_em_lote(Emprestimo.objects.filter(status="Atrasado")), 3)
+        self.livro.refresh_from_db()
+        self.assertEqual(self.livro.quantidade_disponivel, 19)
+
+    def test_comando_verificar_atrasos(self):
+        """O comando envia um lembrete por atraso e marca os vencidos."""
+        saida = StringIO()
+        call_command(
+            'verificar_atrasos', '--data', '2025-06-15', '--lembretes', '--marcar', '--lote', '2',
+            stdout=saida,
+        )
+        self.assertIn("3 empréstimo(s) atrasado(s)", saida.getvalue())
+        self.assertIn("3 empréstimo(s) marcado(s) como 'Atrasado'", saida.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        lembretes = {m.to[0]: m for m in mail.outbox}
+        self.assertEqual(sorted(lembretes), ["m0@exemplo.com", "m1@exemplo.com", "m2@exemplo.com"])
+        self.assertIn("14 dia(s) de atraso", lembretes["m0@exemplo.com"].body)
+
+
+class ImportacaoTests(TestCase):
+    """Testes da importação em lote por CSV (serviço, comando e upload no admin)."""
+
+    CSV_LIVROS = (
+        "titulo,autor,editora,ano,quantidade_total,quantidade_disponivel\n"
+        "Vidas Secas,Graciliano Ramos,José Olympio,1938,3,3\n"
+        "São Bernardo,graciliano ramos ,José Olympio,1934,2,2\n"
+        "Sem Ano,Graciliano Ramos,José Olympio,,2,2\n"
+        "Estoque Errado,Rachel de Queiroz,José Olympio,1930,1,5\n"
+        "O Quinze,Rachel de Queiroz,José Olympio,1930,4,1\n"
+        "Sem Autor,,Editora,1950,1,1\n"
+    )
+
+    def test_importar_livros(self):
+        """Linhas válidas entram, autores são resolvidos pelo nome e os erros vêm por linha."""
+        existente = Autor.objects.create(nome="Graciliano Ramos")
+        resultado = importar_csv('livros', StringIO(self.CSV_LIVROS), tamanho_lote=2)
+
+        self.assertEqual(resultado.criados, 3)
+        self.assertEqual(resultado.autores_criados, 1)
+        self.assertEqual([linha for linha, _ in resultado.erros], [4, 5, 7])
+        self.assertIn('ano', resultado.erros[0][1])
+        self.assertEqual(
+            resultado.erros[1][1],
+            {'__all__': ["A quantidade disponível não pode ser maior que a quantidade total."]},
+        )
+        self.assertIn('autor', resultado.erros[2][1])
+        # "graciliano ramos " casa com o autor já existente
+        self.assertEqual(Livro.objects.filter(autor=existente).count(), 2)
+        self.assertEqual(Autor.objects.filter(nome="Rachel de Queiroz").count(), 1)
+
+    def test_importar_membros_em_lotes(self):
+        """O número de consultas cresce com os lotes, não com as linhas."""
+        linhas = ["nome,contato,tipo"] + [f"Membro {i},m{i}@exemplo.com,Comum" for i in range(50)]
+        with self.assertNumQueries(6):  # 2 lotes x (savepoint + INSERT + release)
+            resultado = importar_csv('membros', StringIO("\n".join(linhas)), tamanho_lote=25)
+        self.assertEqual(resultado.criados, 50)
+        self.assertEqual(Membro.objects.count(), 50)
+
+    def test_comando_importar_csv(self):
+        """O comando lê o arquivo, mostra o resumo e lista os erros."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as arquivo:
+            arquivo.write("nome;nacionalidade\nCora Coralina;Brasileira\n;Brasileira\n")
+        self.addCleanup(os.remove, arquivo.name)
+        saida, erros = StringIO(), StringIO()
+        call_command('importar_csv', 'autores', arquivo.name, '--delimitador', ';', stdout=saida, stderr=erros)
+
+        self.assertIn("1 registro(s) importado(s), 1 linha(s) com erro.", saida.getvalue())
+        self.assertIn("linha 3: nome:", erros.getvalue())
+
+    def test_upload_no_admin(self):
+        """A página 'Importar CSV' do admin de Membro importa o arquivo enviado."""
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', None))
+        arquivo = SimpleUploadedFile('membros.csv', "nome,contato,tipo\nEva,eva@exemplo.com,Comum\n".encode())
+        response = self.client.post(
+            reverse('admin:biblioteca_membro_importar'),
+            {'arquivo': arquivo, 'delimitador': ','},
+        )
+        self.assertContains(response, "1 registro(s) importado(s), 0 linha(s) com erro.")
+        self.assertTrue(Membro.objects.filter(nome="Eva").exists())
+
+    def test_colunas_a_mais_e_arquivo_fora_de_utf8(self):
+        """Coluna a mais é erro da linha; arquivo que não é UTF-8 vira erro do comando e do formulário."""
+        csv_autores = "nome,nacionalidade\nCora Coralina,Brasileira\nManuel Bandeira,Brasileira,extra\n"
+        resultado = importar_csv('autores', StringIO(csv_autores))
+        self.assertEqual(resultado.criados, 1)
+        self.assertEqual(resultado.erros, [(3, {'linha': ["1 coluna(s) a mais que o cabeçalho."]})])
+
+        latin1 = "nome,nacionalidade\nJoão Cabral,Brasileiro\n".encode('latin-1')
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as arquivo:
+            arquivo.write(latin1)
+        self.addCleanup(os.remove, arquivo.name)
+        with self.assertRaisesMessage(CommandError, "não está em UTF-8"):
+            call_command('importar_csv', 'autores', arquivo.name, stdout=StringIO())
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', None))
+        response = self.client.post(
+            reverse('admin:biblioteca_autor_importar'),
+            {'arquivo': SimpleUploadedFile('autores.csv', latin1), 'delimitador': ','},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'arquivo', [
+            "O arquivo não está em UTF-8: a leitura parou perto da linha 1; 0 registro(s) importado(s) antes dela.",
+        ])
+
+
+class BenchmarkTests(TestCase):
+    """Testes do gerador de dados sintéticos e do comando benchmark (escala mínima)."""
+
+    def test_gerar_dados_coerentes(self):
+        """O estoque disponível de cada livro desconta exatamente os empréstimos ativos."""
+        criados = gerar(autores=5, livros=20, membros=10, anos=1, emprestimos_por_dia=2, hoje=date(2025, 6, 30))
+        self.assertEqual(Livro.objects.count(), 20)
+        self.assertEqual(Emprestimo.objects.count(), criados['emprestimos'])
+        self.assertEqual(Emprestimo.objects.filter(status="Ativo").count(), criados['emprestimos_ativos'])
+        for livro in Livro.objects.all():
+            ativos = Emprestimo.objects.filter(livro=livro, status="Ativo").count()
+            self.assertEqual(livro.quantidade_disponivel, livro.quantidade_total - ativos)
+        self.assertEqual(reconciliar_contadores(), {Livro: [], Membro: []})
+
+    def test_comando_benchmark_no_banco_atual(self):
+        """O relatório traz percentis, consultas e memória por cenário, sem alterar o banco."""
+        gerar(autores=5, livros=30, membros=10, anos=1, emprestimos_por_dia=3)
+        emprestimos_antes = Emprestimo.objects.count()
+        saida = StringIO()
+        call_command('benchmark', '--banco-atual', '--iteracoes', '2', stdout=saida)
+
+        relatorio = json.loads(saida.getvalue())
+        self.assertEqual(set(relatorio['cenarios']), {
+            'listar_livros', 'listar_livros_pagina_profunda', 'registrar_emprestimo_get',
+            'registrar_emprestimo_post', 'admin_livros', 'admin_membros', 'admin_emprestimos',
+            'admin_devolucao_em_lote',
+        })
+        listar = relatorio['cenarios']['listar_livros']
+        self.assertEqual(set(listar['latencia_ms']), {'p50', 'p90', 'p95', 'p99'})
+        self.assertGreater(listar['pico_memoria_kb'], 0)
+        self.assertEqual(Emprestimo.objects.count(), emprestimos_antes)
+        self.assertFalse(User.objects.filter(username='benchmark').exists())
+
+
+class ExecucaoEnxutaTests(SimpleTestCase):
+    """A execução enxuta sobe sem admin nem mensagens, e o benchmark de inicialização mostra isso."""
+
+    def test_benchmark_inicializacao(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            historico = os.path.join(pasta, 'inicializacao.jsonl')
+            saida = StringIO()
+            call_command('benchmark_inicializacao', '--repeticoes', '1', '--historico', historico, stdout=saida)
+            call_command('benchmark_inicializacao', '--repeticoes', '1', '--historico', historico, stdout=StringIO())
+            with open(historico, encoding='utf-8') as arquivo:
+                linhas = [json.loads(linha) for linha in arquivo]
+
+        relatorio = json.loads(saida.getvalue())
+        completa, enxuta = relatorio['execucoes']['completa'], relatorio['execucoes']['enxuta']
+        self.assertIn('django.contrib.admin', completa['pesados_carregados'])
+        # O autodiscover não puxa mais formulários, importação (csv) e serviços
+        self.assertNotIn('biblioteca.forms', completa['pesados_carregados'])
+        self.assertEqual(enxuta['pesados_carregados'], [])
+        self.assertLess(enxuta['modulos'], completa['modulos'])
+        self.assertGreater(completa['imports_ms'], 0)
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(set(linhas[0]['enxuta']), {'processo_ms', 'processo_min_ms', 'imports_ms', 'modulos'})
+
+    def test_api_e_comandos_na_execucao_enxuta(self):
+        """O check do Django passa; a API resolve, o admin e as páginas do site não existem."""
+        script = "\n".join([
+            "import django",
+            "django.setup()",
+            "from django.core.management import call_command",
+            "call_command('check')",
+            "from django.urls import Resolver404, resolve",
+            "print(resolve('/api/livros/').url_name)",
+            "for url in ('/admin/', '/livros/'):",
+            "    try:",
+            "        resolve(url)",
+            "    except Resolver404:",
+            "        print('404', url)",
+        ])
+        processo = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings', 'BIBLIOTECA_EXECUCAO': 'enxuta',
+                 'BIBLIOTECA_CACHE_DIR': str(settings.CACHES['default']['LOCATION'])},
+        )
+        self.assertEqual(processo.returncode, 0, processo.stderr)
+        self.assertEqual(processo.stdout.splitlines()[-3:], ['api_lista', '404 /admin/', '404 /livros/'])
+
+
+class BenchmarkTemplatesTests(SimpleTestCase):
+    """O fragmento pré-compilado gera as mesmas linhas que o laço do template."""
+
+    def test_comando_benchmark_templates(self):
+        saida = StringIO()
+        call_command('benchmark_templates', '--linhas', '200', '--repeticoes', '1', stdout=saida)
+        relatorio = json.loads(saida.getvalue())
+        self.assertTrue(relatorio['saidas_iguais'])
+        self.assertEqual(set(relatorio['render_ms_por_10k_linhas']), {'laco', 'fragmento'})
+        self.assertEqual(set(relatorio['carregar_template_us']), {'desenvolvimento', 'producao'})
+
+
+class PerfilProducaoSQLiteTests(SimpleTestCase):
+    """O perfil de produção liga WAL e os pragmas em cada conexão nova."""
+
+    def test_pragmas_e_begin_immediate(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            conexao = connections['default'].__class__(
+                {**connections['default'].settings_dict, **settings.BIBLIOTECA_SQLITE_PRODUCAO,
+                 'NAME': os.path.join(pasta, 'producao.sqlite3')},
+                alias='producao',
+            )
+            try:
+                with conexao.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 20000)
+                self.assertEqual(conexao.transaction_mode, 'IMMEDIATE')
+            finally:
+                conexao.close()
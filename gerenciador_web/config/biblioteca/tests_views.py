@@ -1,10 +1,30 @@
 # biblioteca/test_views.py
 
-from django.test import TestCase, Client
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.test import AsyncClient, TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 # Importando Modelos (necessário para criar dados de teste)
 from .models import Autor, Livro, Membro, Emprestimo
+from .middleware import ESTATISTICAS, PerfilMiddleware
+from .paginacao import codificar_cursor
+from .services import devolver_em_lote, registrar_emprestimo
 # Importando Forms (não são usados diretamente, mas necessários para o contexto)
 from .forms import LivroForm, AutorForm, MembroForm, EmprestimoForm 
 
@@ -16,6 +36,7 @@ class ViewsTests(TestCase):
 
     def setUp(self):
         self.client = Client()
+        cache.clear()
         
         # Criação de dados base para testes de view
         self.autor = Autor.objects.create(nome="Autor View")
@@ -141,4 +162,747 @@ class ViewsTests(TestCase):
         self.assertContains(response, 'Erro ao registrar empréstimo.') # Verifica a mensagem de erro
         
         # 2. Nenhuma criação
-        self.assertEqual(Emprestimo.objects.count(), 0)
\ No newline at end of file
+        self.assertEqual(Emprestimo.objects.count(), 0)
+
+    def test_emprestimo_em_lote_POST(self):
+        """Vários livros num POST só; sem estoque de um deles, nenhum é registrado."""
+        url = reverse('biblioteca:registrar_emprestimos_lote')
+        outro = Livro.objects.create(
+            titulo="Outro", autor=self.autor, editora="Editora", ano=2001,
+            quantidade_total=1, quantidade_disponivel=1,
+        )
+        response = self.client.post(url, {'membro': self.membro.pk, 'livros': [self.livro.pk, outro.pk]})
+        self.assertRedirects(response, url)
+        self.assertEqual(Emprestimo.objects.count(), 2)
+
+        response = self.client.post(url, {'membro': self.membro.pk, 'livros': [self.livro.pk, outro.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Nenhum empréstimo foi registrado.')
+        self.assertEqual(Emprestimo.objects.count(), 2)
+
+    def test_reserva_POST_e_emprestimo_da_copia_separada(self):
+        """Livro esgotado: a ficha oferece a reserva, o membro entra na fila e leva a cópia separada."""
+        url = reverse('biblioteca:reservar_livro')
+        Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=0)
+        response = self.client.get(reverse('biblioteca:detalhe_livro', args=[self.livro.pk]))
+        self.assertContains(response, f'{url}?livro={self.livro.pk}')
+
+        response = self.client.post(url, {'membro': self.membro.pk, 'livro': self.livro.pk}, follow=True)
+        self.assertContains(response, "entrou na fila de &quot;Livro Teste View&quot; (posição 1)")
+        # Segunda reserva do mesmo membro: barrada pela constraint, validada no formulário
+        response = self.client.post(url, {'membro': self.membro.pk, 'livro': self.livro.pk})
+        self.assertContains(response, "Este membro já tem uma reserva em andamento para este livro.")
+
+        outro = Membro.objects.create(nome="Outro", contato="o@exemplo.com", tipo="Comum")
+        emprestimo = registrar_emprestimo(outro, Livro.objects.create(
+            titulo="X", autor=self.autor, editora="ET", ano=2020, quantidade_total=1, quantidade_disponivel=1,
+        ))
+        # Devolução de outro livro não mexe na fila; a do livro reservado separa a cópia
+        emprestimo.salvar_devolucao()
+        Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=1)
+        self.client.post(self.emprestimo_url, {'membro': outro.pk, 'livro': self.livro.pk})
+        Emprestimo.objects.get(membro=outro, livro=self.livro).salvar_devolucao()
+
+        response = self.client.post(self.emprestimo_url, {'membro': self.membro.pk, 'livro': self.livro.pk})
+        self.assertRedirects(response, self.emprestimo_url)
+        self.assertEqual(self.membro.reservas.get().status, "Atendida")
+
+class ListagemPaginadaTests(TestCase):
+    """
+    Testes da listagem do acervo paginada por cursor (titulo, id):
+    número fixo de consultas por página e navegação entre páginas.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.listar_livros_url = reverse('biblioteca:listar_livros')
+        cache.clear()
+
+        autores = [Autor.objects.create(nome=f"Autor {i}") for i in range(3)]
+        # Títulos repetidos garantem que o desempate por 'id' funciona
+        for i in range(12):
+            Livro.objects.create(
+                titulo=f"Livro {i // 2:02d}",
+                autor=autores[i % 3],
+                editora="ET",
+                ano=2000 + i,
+                quantidade_total=2,
+                quantidade_disponivel=i % 2,
+            )
+
+    def _todas_as_paginas(self):
+        """Percorre a listagem seguindo os cursores e devolve os ids na ordem."""
+        ids, cursor = [], None
+        while True:
+            url = self.listar_livros_url + (f'?cursor={cursor}' if cursor else '')
+            response = self.client.get(url)
+            pagina = response.context['pagina']
+            ids.extend(livro.pk for livro in pagina)
+            if not pagina.tem_proxima:
+                return ids
+            cursor = pagina.proximo_cursor
+
+    def test_numero_fixo_de_consultas_por_pagina(self):
+        """Cada página (inclusive as profundas) faz uma única consulta, com o autor no JOIN."""
+        with self.settings(BIBLIOTECA_LIVROS_POR_PAGINA=5):
+            with self.assertNumQueries(1):
+                response = self.client.get(self.listar_livros_url)
+            self.assertContains(response, "Autor 0")
+
+            cursor = response.context['pagina'].proximo_cursor
+            with self.assertNumQueries(1):
+                response = self.client.get(self.listar_livros_url, {'cursor': cursor})
+            self.assertEqual(len(response.context['livros']), 5)
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        """Seguindo os cursores, cada livro aparece uma única vez e na ordem (titulo, id)."""
+        esperado = list(Livro.objects.order_by('titulo', 'id').values_list('pk', flat=True))
+        with self.settings(BIBLIOTECA_LIVROS_POR_PAGINA=5):
+            self.assertEqual(self._todas_as_paginas(), esperado)
+
+    def test_pagina_anterior(self):
+        """O cursor 'anterior' volta exatamente para a página de onde se veio."""
+        with self.settings(BIBLIOTECA_LIVROS_POR_PAGINA=5):
+            primeira = self.client.get(self.listar_livros_url).context['pagina']
+            segunda = self.client.get(
+                self.listar_livros_url, {'cursor': primeira.proximo_cursor}
+            ).context['pagina']
+            voltou = self.client.get(
+                self.listar_livros_url, {'cursor': segunda.cursor_anterior}
+            ).context['pagina']
+
+        self.assertEqual([l.pk for l in voltou], [l.pk for l in primeira])
+        self.assertFalse(primeira.tem_anterior)
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        """Um cursor corrompido não gera erro 500; mostra a primeira página."""
+        response = self.client.get(self.listar_livros_url, {'cursor': 'lixo!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['livros'][0].titulo, "Livro 00")
+
+    def test_linhas_da_tabela(self):
+        """As linhas montadas pela tag linhas_do_acervo: link, texto escapado e selo de estoque."""
+        livro = Livro.objects.create(
+            titulo="<b>Dom</b> & Casmurro", autor=Autor.objects.create(nome="Machado <Assis>"),
+            editora="ET", ano=1899, quantidade_total=1, quantidade_disponivel=0,
+        )
+        response = self.client.get(self.listar_livros_url)
+        self.assertContains(
+            response,
+            f'<td><a href="{reverse("biblioteca:detalhe_livro", args=[livro.pk])}">'
+            '&lt;b&gt;Dom&lt;/b&gt; &amp; Casmurro</a></td><td>Machado &lt;Assis&gt;</td>',
+            html=False,
+        )
+        self.assertContains(response, '<span class="badge bg-danger">Esgotado</span>', html=True)
+        self.assertContains(response, '<span class="badge bg-success">Disponível</span>', html=True)
+
+    def test_acervo_vazio(self):
+        Livro.objects.all().delete()
+        self.assertContains(self.client.get(self.listar_livros_url), "Nenhum livro encontrado no acervo.")
+
+
+class ExportacaoTests(TestCase):
+    """Testes da exportação em CSV/JSON por streaming (views e comando exportar_dados)."""
+
+    def setUp(self):
+        autor = Autor.objects.create(nome="Cecília Meireles", nacionalidade="Brasileira")
+        self.livro = Livro.objects.create(
+            titulo="Romanceiro da Inconfidência", autor=autor, editora="Nova Fronteira",
+            ano=1953, quantidade_total=3, quantidade_disponivel=2,
+        )
+        membro = Membro.objects.create(nome="Davi", contato="davi@exemplo.com", tipo="Professor")
+        Emprestimo.objects.create(membro=membro, livro=self.livro)
+
+        self.client.force_login(User.objects.create_user('equipe', is_staff=True))
+
+    def _conteudo(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_exportar_livros_csv_com_autor(self):
+        """O CSV de livros traz o nome do autor na mesma linha (JOIN)."""
+        response = self.client.get(reverse('biblioteca:exportar', args=['livros', 'csv']))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        linhas = self._conteudo(response).splitlines()
+        self.assertEqual(linhas[0].split(',')[:3], ['id', 'titulo', 'autor'])
+        self.assertIn('Romanceiro da Inconfidência,Cecília Meireles,Brasileira', linhas[1])
+
+    def test_exportar_emprestimos_json(self):
+        """O JSON é um array válido, com livro, autor e membro em cada objeto."""
+        response = self.client.get(reverse('biblioteca:exportar', args=['emprestimos', 'json']))
+        dados = json.loads(self._conteudo(response))
+        self.assertEqual(len(dados), 1)
+        self.assertEqual(dados[0]['membro'], "Davi")
+        self.assertEqual(dados[0]['autor'], "Cecília Meireles")
+        self.assertEqual(dados[0]['status'], "Ativo")
+
+    def test_exportar_csv_comprimido_em_streaming(self):
+        """Com Accept-Encoding: gzip o CSV continua em streaming, comprimido bloco a bloco."""
+        url = reverse('biblioteca:exportar', args=['livros', 'csv'])
+        esperado = self._conteudo(self.client.get(url))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response)
+        self.assertTrue(response.streaming)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), esperado)
+
+    def test_exportacao_vazia_e_invalida(self):
+        """Tabela vazia gera '[]'; nomes desconhecidos retornam 404."""
+        Emprestimo.objects.all().delete()
+        response = self.client.get(reverse('biblioteca:exportar', args=['emprestimos', 'json']))
+        self.assertEqual(json.loads(self._conteudo(response)), [])
+        response = self.client.get(reverse('biblioteca:exportar', args=['senhas', 'csv']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_exportacao_exige_equipe(self):
+        """Visitantes sem login são mandados para o login do admin."""
+        self.client.logout()
+        response = self.client.get(reverse('biblioteca:exportar', args=['membros', 'csv']))
+        self.assertEqual(response.status_code, 302)
+
+    def test_comando_exportar_dados(self):
+        """O comando escreve a mesma exportação na saída padrão."""
+        saida = StringIO()
+        call_command('exportar_dados', 'membros', '--formato', 'csv', stdout=saida)
+        self.assertIn('Davi,davi@exemplo.com,Professor', saida.getvalue())
+
+
+class AutocompletarTests(TestCase):
+    """Testes do endpoint de autocompletar e dos selects do formulário de empréstimo."""
+
+    def setUp(self):
+        self.client = Client()
+        self.emprestimo_url = reverse('biblioteca:registrar_emprestimo')
+        autor = Autor.objects.create(nome="Lygia Fagundes Telles")
+        self.livros = [
+            Livro.objects.create(
+                titulo=titulo, autor=autor, editora="Companhia", ano=1973,
+                quantidade_total=2, quantidade_disponivel=disponivel,
+            )
+            for titulo, disponivel in [("As Meninas", 2), ("Antes do Baile Verde", 1), ("Ciranda de Pedra", 0)]
+        ]
+        self.ana = Membro.objects.create(nome="Ana", contato="ana@exemplo.com", tipo="Comum")
+        self.bruno = Membro.objects.create(nome="Bruno", contato="anabru@exemplo.com", tipo="Comum")
+
+    def _buscar(self, tipo, termo):
+        response = self.client.get(reverse('biblioteca:autocompletar', args=[tipo]), {'q': termo})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['resultados']
+
+    def test_get_do_emprestimo_nao_carrega_tabelas(self):
+        """A página de empréstimo não consulta membros nem livros para montar os selects."""
+        with self.assertNumQueries(0):
+            response = self.client.get(self.emprestimo_url)
+        self.assertNotContains(response, "As Meninas")
+        self.assertContains(response, 'data-autocompletar="/autocompletar/livros/"')
+        self.assertContains(response, 'biblioteca/autocompletar.js')
+
+    def test_busca_livros_por_prefixo_sem_diferenciar_maiusculas(self):
+        """Prefixo 'a' acha os dois títulos com A, em ordem, com a disponibilidade."""
+        resultados = self._buscar('livros', 'a')
+        self.assertEqual([r['id'] for r in resultados], [self.livros[1].pk, self.livros[0].pk])
+        self.assertEqual(resultados[1]['texto'], "As Meninas (2 disp.)")
+
+    def test_busca_membros_por_nome_ou_contato(self):
+        """'ana' casa com o nome de Ana e com o e-mail de Bruno, sem repetir e sem expor o e-mail."""
+        self.client.force_login(User.objects.create_user('equipe', is_staff=True))
+        resultados = self._buscar('membros', 'ana')
+        self.assertEqual([r['id'] for r in resultados], [self.ana.pk, self.bruno.pk])
+        self.assertEqual([r['texto'] for r in resultados], ["Ana", "Bruno"])
+
+    def test_busca_membros_exige_equipe(self):
+        """Visitantes e usuários comuns não listam membros."""
+        url = reverse('biblioteca:autocompletar', args=['membros'])
+        self.assertEqual(self.client.get(url, {'q': 'ana'}).status_code, 403)
+        self.client.force_login(User.objects.create_user('leitor'))
+        self.assertEqual(self.client.get(url, {'q': 'ana'}).status_code, 403)
+
+    def test_tipo_desconhecido(self):
+        """Tipos fora de livros/membros retornam 404."""
+        response = self.client.get(reverse('biblioteca:autocompletar', args=['senhas']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_formulario_reexibido_mostra_so_o_escolhido(self):
+        """Com erro de validação, o select mostra apenas a opção já escolhida."""
+        response = self.client.post(self.emprestimo_url, {'membro': self.ana.pk, 'livro': self.livros[2].pk})
+        self.assertContains(response, "Este livro não possui mais cópias disponíveis no estoque.")
+        self.assertContains(response, f'<option value="{self.livros[2].pk}" selected>Ciranda de Pedra</option>', html=True)
+        self.assertNotContains(response, "As Meninas")
+
+
+class BuscaTests(TestCase):
+    """Testes da busca textual no acervo (índice FTS5 mantido por triggers)."""
+
+    def setUp(self):
+        self.client = Client()
+        self.buscar_url = reverse('biblioteca:buscar')
+        self.machado = Autor.objects.create(nome="Machado de Assis")
+        self.memorias = Livro.objects.create(
+            titulo="Memórias Póstumas de Brás Cubas", autor=self.machado, editora="Garnier",
+            ano=1881, quantidade_total=2, quantidade_disponivel=2,
+        )
+        self.livro_cubas = Livro.objects.create(
+            titulo="Ensaio sobre Brás", autor=Autor.objects.create(nome="Outro Autor"),
+            editora="Cubas Editora", ano=1990, quantidade_total=1, quantidade_disponivel=1,
+        )
+
+    def _ids(self, termo, **params):
+        response = self.client.get(self.buscar_url, {'q': termo, **params})
+        self.assertEqual(response.status_code, 200)
+        return [livro.pk for livro in response.context['resultado']]
+
+    def test_busca_sem_acentos_e_por_prefixo(self):
+        """'memorias postu' encontra 'Memórias Póstumas'."""
+        self.assertEqual(self._ids('memorias postu'), [self.memorias.pk])
+
+    def test_busca_por_autor_editora_e_ano(self):
+        """Autor, editora e ano também são indexados."""
+        self.assertEqual(self._ids('machado'), [self.memorias.pk])
+        self.assertEqual(self._ids('garnier 1881'), [self.memorias.pk])
+
+    def test_ranking_prefere_titulo(self):
+        """'cubas' no título pesa mais do que 'cubas' na editora."""
+        self.assertEqual(self._ids('brás cubas'), [self.memorias.pk, self.livro_cubas.pk])
+
+    def test_indice_acompanha_alteracoes(self):
+        """Triggers mantêm o índice após update(), renomear o autor e excluir o livro."""
+        Livro.objects.filter(pk=self.memorias.pk).update(titulo="Quincas Borba")
+        self.assertEqual(self._ids('quincas'), [self.memorias.pk])
+        self.assertEqual(self._ids('memorias'), [])
+
+        self.machado.nome = "Joaquim Maria"
+        self.machado.save()
+        self.assertEqual(self._ids('joaquim'), [self.memorias.pk])
+
+        self.memorias.delete()
+        self.assertEqual(self._ids('quincas'), [])
+
+    def test_paginacao_e_termos_invalidos(self):
+        """Páginas respeitam o tamanho; aspas e operadores não quebram a consulta."""
+        with self.settings(BIBLIOTECA_LIVROS_POR_PAGINA=1):
+            paginas = self._ids('brás') + self._ids('brás', pagina=2)
+        self.assertCountEqual(paginas, [self.memorias.pk, self.livro_cubas.pk])
+        self.assertEqual(self._ids('"brás" OR * NEAR('), [])
+        self.assertEqual(self._ids(''), [])
+        self.assertEqual(self._ids('!!'), [])
+        for pagina in ('0', 'x', str(10 ** 30)):
+            self.assertEqual(self.client.get(self.buscar_url, {'q': 'brás', 'pagina': pagina}).status_code, 404)
+
+    def test_busca_do_admin_usa_o_indice(self):
+        """A busca do changelist de Livro usa o mesmo índice textual."""
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', None))
+        response = self.client.get(reverse('admin:biblioteca_livro_changelist'), {'q': 'memorias'})
+        self.assertContains(response, "Memórias Póstumas de Brás Cubas")
+        self.assertNotContains(response, "Ensaio sobre Brás")
+        # Só pontuação: nenhum resultado, sem erro de sintaxe do FTS5
+        response = self.client.get(reverse('admin:biblioteca_livro_changelist'), {'q': '!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Memórias Póstumas de Brás Cubas")
+
+
+class AdminChangelistTests(TestCase):
+    """
+    Número de consultas das changelists do admin: constante com o tamanho da
+    página (colunas relacionadas no mesmo SELECT) e sem carregar tabelas
+    inteiras nos filtros.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@exemplo.com', None))
+        self.autores = []
+
+    def _criar(self, quantidade):
+        for _ in range(quantidade):
+            autor = Autor.objects.create(nome=f"Autor {len(self.autores)}")
+            self.autores.append(autor)
+            membro = Membro.objects.create(nome=f"Membro {autor.pk}", contato="m@exemplo.com", tipo="Comum")
+            livro = Livro.objects.create(
+                titulo=f"Livro {autor.pk}", autor=autor, editora="Editora", ano=2000,
+                quantidade_total=1, quantidade_disponivel=1,
+            )
+            registrar_emprestimo(membro, livro)
+
+    def _consultas(self, url, **params):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(consultas), response
+
+    def test_consultas_constantes_por_changelist(self):
+        # sessão + usuário + COUNT + página, mais um SELECT DISTINCT por filtro de valores
+        esperado = {'autor': 4, 'livro': 6, 'membro': 5, 'emprestimo': 5}
+        self._criar(3)
+        for modelo, quantidade in esperado.items():
+            url = reverse(f'admin:biblioteca_{modelo}_changelist')
+            with self.subTest(modelo=modelo):
+                self.assertEqual(self._consultas(url)[0], quantidade)
+        self._criar(6)
+        for modelo, quantidade in esperado.items():
+            url = reverse(f'admin:biblioteca_{modelo}_changelist')
+            with self.subTest(modelo=modelo, linhas=9):
+                self.assertEqual(self._consultas(url)[0], quantidade)
+
+    def test_filtro_autocompletar_mostra_so_o_escolhido(self):
+        self._criar(3)
+        url = reverse('admin:biblioteca_livro_changelist')
+        consultas, response = self._consultas(url)
+        self.assertNotContains(response, '>Autor 0</a>')
+        self.assertContains(response, 'data-filtro-autocompletar=')
+
+        # Com o filtro ativo: mais uma consulta, só pelo autor escolhido
+        consultas_filtradas, response = self._consultas(url, autor__id__exact=self.autores[1].pk)
+        self.assertEqual(consultas_filtradas, consultas + 1)
+        self.assertContains(response, '>Autor 1</a>')
+        self.assertNotContains(response, '>Autor 0</a>')
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    def test_contagem_aproximada_reaproveitada(self):
+        """Acima do limiar o COUNT(*) da paginação vem do cache na próxima visita."""
+        self._criar(3)
+        url = reverse('admin:biblioteca_emprestimo_changelist')
+        with self.settings(BIBLIOTECA_ADMIN_CONTAGEM_LIMIAR=2):
+            primeira, _ = self._consultas(url)
+            segunda, response = self._consultas(url)
+        self.assertEqual(segunda, primeira - 1)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        # O total da tabela inteira ("3 de N") nunca é calculado
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+
+class CacheAcervoTests(TestCase):
+    """
+    Testes do cache da listagem: páginas guardadas sob a versão do acervo e
+    disponibilidade por livro invalidada a cada empréstimo/devolução.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.listar_livros_url = reverse('biblioteca:listar_livros')
+        cache.clear()
+        self.autor = Autor.objects.create(nome="Rubem Braga")
+        self.livro = Livro.objects.create(
+            titulo="Ai de ti, Copacabana", autor=self.autor, editora="Record",
+            ano=1960, quantidade_total=2, quantidade_disponivel=1,
+        )
+        self.membro = Membro.objects.create(nome="Gil", contato="gil@exemplo.com", tipo="Comum")
+
+    def _disponivel(self):
+        return self.client.get(self.listar_livros_url).context['livros'][0].quantidade_disponivel
+
+    def test_pagina_em_cache_nao_consulta_o_banco(self):
+        """Com página e disponibilidade em cache, a listagem não faz consultas."""
+        with self.assertNumQueries(1):
+            self.client.get(self.listar_livros_url)
+        with self.assertNumQueries(1):  # página em cache; disponibilidade lida pela primeira vez
+            self.client.get(self.listar_livros_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.listar_livros_url)
+        self.assertContains(response, "Ai de ti, Copacabana")
+
+    def test_emprestimo_e_devolucao_invalidam_disponibilidade(self):
+        """Depois de um empréstimo concluído, a listagem nunca mostra o estoque antigo."""
+        for _ in range(3):
+            self.assertEqual(self._disponivel(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_emprestimo(self.membro, self.livro)
+        # A página continua em cache; só a disponibilidade do livro é relida
+        with self.assertNumQueries(1):
+            self.assertEqual(self._disponivel(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            devolver_em_lote(Emprestimo.objects.all())
+        self.assertEqual(self._disponivel(), 1)
+
+    def test_alteracoes_de_catalogo_invalidam_paginas(self):
+        """Salvar um livro ou autor gera uma nova versão do acervo."""
+        self.client.get(self.listar_livros_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.autor.nome = "Rubem Braga (cronista)"
+            self.autor.save()
+        self.assertContains(self.client.get(self.listar_livros_url), "Rubem Braga (cronista)")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.livro.quantidade_disponivel = 2
+            self.livro.save()
+        self.assertEqual(self._disponivel(), 2)
+
+    def test_invalidacao_feita_por_outro_processo(self):
+        """Um comando (outro processo) que altera o estoque invalida o cache visto pelo site."""
+        self.assertEqual(self._disponivel(), 1)
+        self._disponivel()  # disponibilidade agora em cache
+        # A baixa em si, feita "pelo outro processo" no banco de teste
+        Livro.objects.filter(pk=self.livro.pk).update(quantidade_disponivel=0)
+        self.assertEqual(self._disponivel(), 1)
+
+        script = (
+            "import django; django.setup(); from biblioteca import cache; "
+            f"cache.invalidar_disponibilidade([{self.livro.pk}])"
+        )
+        processo = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings',
+                 'BIBLIOTECA_CACHE_DIR': str(settings.CACHES['default']['LOCATION'])},
+        )
+        self.assertEqual(processo.returncode, 0, processo.stderr)
+        self.assertEqual(self._disponivel(), 0)
+
+
+class PerfilMiddlewareTests(TestCase):
+    """Testes do middleware de perfil (cabeçalhos por requisição e agregado por rota)."""
+
+    def setUp(self):
+        cache.clear()
+        ESTATISTICAS.zerar()
+        autor = Autor.objects.create(nome="Lima Barreto")
+        for i in range(3):
+            Livro.objects.create(
+                titulo=f"Triste Fim {i}", autor=autor, editora="Penguin",
+                ano=1915, quantidade_total=1, quantidade_disponivel=1,
+            )
+
+    def test_desligado_nao_adiciona_cabecalhos(self):
+        """Com BIBLIOTECA_PERFIL = False o middleware fica fora da cadeia."""
+        with self.settings(BIBLIOTECA_PERFIL=False):
+            response = Client().get(reverse('biblioteca:listar_livros'))
+        self.assertNotIn('X-Consultas', response)
+        self.assertEqual(ESTATISTICAS.resumo(), {})
+
+    def test_cabecalhos_e_estatisticas_por_rota(self):
+        with self.settings(BIBLIOTECA_PERFIL=True):
+            client = Client()
+            for _ in range(2):
+                response = client.get(reverse('biblioteca:autocompletar', args=['livros']), {'q': 'tri'})
+        self.assertEqual(response['X-Consultas'], '1')
+        self.assertEqual(response['X-Consultas-Duplicadas'], '0')
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        rota = ESTATISTICAS.resumo()['biblioteca:autocompletar']
+        self.assertEqual(rota['requisicoes'], 2)
+        self.assertEqual(rota['media_consultas'], 1)
+        self.assertEqual(sum(rota['histograma'].values()), 2)
+
+    def test_consultas_repetidas_sao_contadas(self):
+        """A mesma consulta com parâmetros diferentes conta como duplicada (N+1)."""
+        def view_n_mais_um(request):
+            for livro in Livro.objects.all():
+                livro.autor.nome  # uma consulta por livro
+            return HttpResponse()
+
+        with self.settings(BIBLIOTECA_PERFIL=True, BIBLIOTECA_PERFIL_LIMITE_N_MAIS_UM=3):
+            middleware = PerfilMiddleware(view_n_mais_um)
+            with self.assertLogs('biblioteca.perfil', 'WARNING'):
+                response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response['X-Consultas'], '4')
+        self.assertEqual(response['X-Consultas-Duplicadas'], '2')
+
+    async def test_consultas_das_views_assincronas_sao_contadas(self):
+        """Pelo handler ASGI as consultas do ORM assíncrono também entram na conta."""
+        with self.settings(BIBLIOTECA_PERFIL=True):
+            response = await AsyncClient().get(reverse('biblioteca:listar_livros'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-Consultas']), 0)
+        self.assertGreater(ESTATISTICAS.resumo()['biblioteca:listar_livros']['media_consultas'], 0)
+
+    def test_endpoint_de_perfil_exige_equipe(self):
+        url = reverse('biblioteca:perfil')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('equipe', is_staff=True))
+        with self.settings(BIBLIOTECA_PERFIL=True):
+            Client().get(reverse('biblioteca:autocompletar', args=['livros']), {'q': 'tri'})
+        dados = self.client.get(url).json()
+        self.assertIn('biblioteca:autocompletar', dados['rotas'])
+
+
+class EstaticosECompressaoTests(TestCase):
+    """Estáticos com hash e pré-comprimidos (collectstatic + EstaticosMiddleware) e páginas comprimidas."""
+
+    def setUp(self):
+        cache.clear()
+        autor = Autor.objects.create(nome="Clarice Lispector")
+        for i in range(30):
+            Livro.objects.create(
+                titulo=f"A Hora da Estrela {i:02d}", autor=autor, editora="Rocco",
+                ano=1977, quantidade_total=1, quantidade_disponivel=1,
+            )
+        self.pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.pasta.cleanup)
+
+    def _producao(self):
+        return self.settings(
+            STATIC_ROOT=self.pasta.name,
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'biblioteca.estaticos.ArmazenamentoComprimido'}},
+            BIBLIOTECA_ESTATICOS_SERVIR=True,
+        )
+
+    def test_collectstatic_e_middleware(self):
+        with self._producao():
+            call_command('collectstatic', '--noinput', verbosity=0)
+            url = staticfiles_storage.url('biblioteca/autocompletar.js')
+            self.assertRegex(url, r'^/static/biblioteca/autocompletar\.[0-9a-f]{12}\.js$')
+            # A página aponta para o nome com hash
+            self.assertContains(self.client.get(reverse('biblioteca:registrar_emprestimo')), url)
+
+            client = Client()
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            corpo = b''.join(response.streaming_content)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertNotIn('Content-Disposition', response)
+            with open(os.path.join(self.pasta.name, 'biblioteca', 'autocompletar.js'), 'rb') as arquivo:
+                self.assertEqual(gzip.decompress(corpo), arquivo.read())
+
+            # Visita repetida: 304 sem corpo
+            repetida = client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(repetida.status_code, 304)
+            self.assertEqual(repetida.content, b'')
+
+            # Sem gzip no Accept-Encoding (ou com q=0), o original; nome sem hash revalida
+            response = client.get('/static/biblioteca/autocompletar.js', HTTP_ACCEPT_ENCODING='gzip;q=0')
+            self.assertNotIn('Content-Encoding', response)
+            self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+            self.assertEqual(response['Content-Type'], 'text/javascript; charset=utf-8')
+
+            # Fora do índice segue para as URLs (404 do Django)
+            self.assertEqual(client.get('/static/../manage.py').status_code, 404)
+
+    def test_listagem_comprimida_e_304(self):
+        url = reverse('biblioteca:listar_livros')
+        normal = self.client.get(url)
+        comprimida = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(comprimida['Content-Encoding'], 'gzip')
+        self.assertLess(len(comprimida.content), len(normal.content) / 3)
+        self.assertEqual(gzip.decompress(comprimida.content), normal.content)
+
+        repetida = self.client.get(url, HTTP_IF_NONE_MATCH=normal['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+        self.assertEqual(repetida.content, b'')
+
+
+class LeituraAssincronaTests(TestCase):
+    """Testes das views de leitura assíncronas (ficha do livro e disponibilidade em lote)."""
+
+    def setUp(self):
+        cache.clear()
+        autor = Autor.objects.create(nome="Cecília Meireles")
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Romanceiro {i}", autor=autor, editora="Global", ano=1953,
+                quantidade_total=2, quantidade_disponivel=i,
+            )
+            for i in range(3)
+        ]
+
+    def test_detalhe_do_livro(self):
+        response = self.client.get(reverse('biblioteca:detalhe_livro', args=[self.livros[2].pk]))
+        self.assertContains(response, "Romanceiro 2")
+        self.assertContains(response, "2 de 2 disponível(is)")
+        self.assertEqual(
+            self.client.get(reverse('biblioteca:detalhe_livro', args=[99999])).status_code, 404
+        )
+
+    def test_disponibilidade_em_lote(self):
+        url = reverse('biblioteca:disponibilidade')
+        ids = ','.join(str(livro.pk) for livro in self.livros)
+        with self.assertNumQueries(1):
+            dados = self.client.get(url, {'ids': ids}).json()
+        self.assertEqual(dados['disponibilidade'], {str(livro.pk): livro.quantidade_disponivel for livro in self.livros})
+        with self.assertNumQueries(0):  # segunda consulta vem do cache por livro
+            self.client.get(url, {'ids': ids})
+        self.assertEqual(self.client.get(url, {'ids': 'abc'}).status_code, 400)
+
+    async def test_rotas_de_leitura_pelo_handler_asgi(self):
+        """Com o AsyncClient as views rodam nativamente no event loop."""
+        # Com sessão: as mensagens do base.html não podem consultar o banco na renderização
+        usuario = await User.objects.acreate(username='leitor')
+        await self.async_client.aforce_login(usuario)
+        for url, dados in [
+            (reverse('biblioteca:listar_livros'), {}),
+            (reverse('biblioteca:detalhe_livro', args=[self.livros[0].pk]), {}),
+            (reverse('biblioteca:buscar'), {'q': 'romanceiro'}),
+            (reverse('biblioteca:autocompletar', args=['livros']), {'q': 'rom'}),
+        ]:
+            response = await self.async_client.get(url, dados)
+            self.assertEqual(response.status_code, 200, url)
+        self.assertContains(response, "Romanceiro 0")
+
+
+class ApiTests(TestCase):
+    """Testes da API JSON: paginação por cursor, campos esparsos e GET condicional."""
+
+    def setUp(self):
+        cache.clear()
+        self.autor = Autor.objects.create(nome="Jorge Amado")
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Capitães da Areia {i}", autor=self.autor, editora="Record", ano=1937,
+                quantidade_total=2, quantidade_disponivel=2,
+            )
+            for i in range(5)
+        ]
+        self.membro = Membro.objects.create(nome="Pedro Bala", contato="pedro@exemplo.com", tipo="Comum")
+        self.url = reverse('biblioteca:api_lista', args=['livros'])
+
+    def test_paginacao_por_cursor(self):
+        pagina = self.client.get(self.url, {'limite': 2}).json()
+        titulos = [livro['titulo'] for livro in pagina['resultados']]
+        while pagina['proximo_cursor']:
+            pagina = self.client.get(self.url, {'limite': 2, 'cursor': pagina['proximo_cursor']}).json()
+            titulos += [livro['titulo'] for livro in pagina['resultados']]
+        self.assertEqual(titulos, [livro.titulo for livro in self.livros])
+
+    def test_cursor_com_valores_nao_escalares(self):
+        """Listas ou objetos no lugar dos valores da chave dão 400, não 500."""
+        for valores in ([[1], 1], ["Capitães", {'id': 1}]):
+            response = self.client.get(self.url, {'cursor': codificar_cursor(valores)})
+            self.assertEqual(response.status_code, 400, valores)
+            self.assertEqual(response.json()['erro'], "Cursor inválido.")
+
+    def test_campos_esparsos_viram_only(self):
+        """Só as colunas pedidas (e as do cursor) aparecem no SELECT e na resposta."""
+        with CaptureQueriesContext(connection) as consultas:
+            dados = self.client.get(self.url, {'campos': 'id,quantidade_disponivel'}).json()
+        self.assertEqual(set(dados['resultados'][0]), {'id', 'quantidade_disponivel'})
+        sql = consultas.captured_queries[-1]['sql']
+        self.assertIn('"quantidade_disponivel"', sql)
+        self.assertNotIn('"editora"', sql)
+
+        self.assertEqual(self.client.get(self.url, {'campos': 'senha'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'ano': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'preco': '1'}).status_code, 400)
+
+    def test_etag_responde_304_sem_consultar_o_banco(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Um empréstimo muda o estoque: o ETag antigo deixa de valer
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_emprestimo(self.membro, self.livros[0])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['resultados'][0]['quantidade_disponivel'], 1)
+
+    def test_detalhe(self):
+        url = reverse('biblioteca:api_detalhe', args=['livros', self.livros[1].pk])
+        self.assertEqual(self.client.get(url, {'campos': 'titulo'}).json(), {'titulo': "Capitães da Areia 1"})
+        self.assertEqual(self.client.get(reverse('biblioteca:api_detalhe', args=['livros', 99999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('biblioteca:api_lista', args=['senhas'])).status_code, 404)
+
+    def test_membros_e_emprestimos_so_para_equipe(self):
+        url = reverse('biblioteca:api_lista', args=['emprestimos'])
+        registrar_emprestimo(self.membro, self.livros[0])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user('equipe', is_staff=True))
+        response = self.client.get(url, {'status': 'Ativo'})
+        self.assertEqual(len(response.json()['resultados']), 1)
+        self.assertIn('private', response['Cache-Control'])
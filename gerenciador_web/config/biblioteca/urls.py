@@ -1,13 +1,38 @@
 # biblioteca/urls.py
 
 from django.urls import path
-from . import views
+from . import urls_api, views
+
+app_name = 'biblioteca'
 
 urlpatterns = [
-    # Exemplo de rota: a página inicial da aplicação 'biblioteca'
-    # Será acessada em / se configurada na raiz do projeto.
-    path('', views.index, name='index'), 
-    
-    # Você adicionará outras rotas aqui conforme desenvolver sua aplicação
-    # Exemplo: path('livros/', views.lista_livros, name='lista_livros'),
-]
\ No newline at end of file
+    # Página inicial da aplicação 'biblioteca' (acessada em / pela configuração raiz)
+    path('', views.index, name='index'),
+
+    # --- Cadastros ---
+    path('livros/novo/', views.adicionar_livro, name='adicionar_livro'),
+    path('autores/novo/', views.adicionar_autor, name='adicionar_autor'),
+    path('membros/novo/', views.adicionar_membro, name='adicionar_membro'),
+
+    # --- Listagem e Empréstimo ---
+    path('livros/', views.listar_livros, name='listar_livros'),
+    path('livros/<int:pk>/', views.detalhe_livro, name='detalhe_livro'),
+    path('livros/disponibilidade/', views.disponibilidade, name='disponibilidade'),
+    path('buscar/', views.buscar, name='buscar'),
+    path('emprestimos/novo/', views.registrar_emprestimo, name='registrar_emprestimo'),
+    path('emprestimos/lote/', views.registrar_emprestimos_lote, name='registrar_emprestimos_lote'),
+    path('reservas/nova/', views.reservar_livro, name='reservar_livro'),
+    path('autocompletar/<str:tipo>/', views.autocompletar, name='autocompletar'),
+
+    # --- API JSON somente leitura (ex: /api/livros/?campos=id,titulo) ---
+    *urls_api.urlpatterns,
+
+    # --- Painel de estatísticas (lê só os resumos diários) ---
+    path('estatisticas/', views.painel_estatisticas, name='painel_estatisticas'),
+
+    # --- Perfil de desempenho (PerfilMiddleware) ---
+    path('perfil/', views.perfil, name='perfil'),
+
+    # --- Exportação (ex: /exportar/emprestimos.csv) ---
+    path('exportar/<str:nome>.<str:formato>', views.exportar, name='exportar'),
+]
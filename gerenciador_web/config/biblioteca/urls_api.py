@@ -0,0 +1,13 @@
+# biblioteca/urls_api.py
+
+from django.urls import path
+from . import api
+
+# Rotas da API JSON: incluídas em urls.py e, sozinhas, na execução enxuta
+# (config/urls_enxuta.py), que não importa as views do site
+app_name = 'biblioteca'
+
+urlpatterns = [
+    path('api/<str:nome>/', api.lista, name='api_lista'),
+    path('api/<str:nome>/<int:pk>/', api.detalhe, name='api_detalhe'),
+]
@@ -1,18 +1,23 @@
 # biblioteca/views.py
 
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import F # Para operações de banco de dados mais avançadas (como listagem)
-from django.http import HttpResponse
+from django.db.models.functions import Collate
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 
-from .forms import LivroForm, AutorForm, MembroForm, EmprestimoForm
+from . import cache, estatisticas, exportacao, tarefas
+from .busca import buscar_livros
+from .middleware import ESTATISTICAS
+from .forms import LivroForm, AutorForm, MembroForm, EmprestimoForm, EmprestimoLoteForm, ReservaForm
 from .models import Livro, Autor, Membro, Emprestimo
+from .paginacao import CursorInvalido, apaginar_por_cursor
+from .services import EstoqueIndisponivel
 
 
-def index(request):
-    # Agora o Django sabe o que é HttpResponse
-    return HttpResponse("<h1>Bem-vindo à Biblioteca!</h1><p>Esta é a página inicial da sua aplicação.</p>")
-
 # --- Views de Cadastro (C) ---
 
 def criar_cadastro(request, form_class, template_name, redirect_url_name, item_name):
@@ -56,8 +61,14 @@ def adicionar_membro(request):
 def registrar_emprestimo(request):
     if request.method == 'POST':
         form = EmprestimoForm(request.POST)
+        emprestimo = None
         if form.is_valid():
-            emprestimo = form.save()
+            try:
+                emprestimo = form.save()
+            except EstoqueIndisponivel:
+                # Outra requisição levou a última cópia depois da validação
+                form.add_error('livro', "Este livro não possui mais cópias disponíveis no estoque.")
+        if emprestimo is not None:
             messages.success(request, f'Empréstimo de "{emprestimo.livro.titulo}" para "{emprestimo.membro.nome}" registrado com sucesso.')
             return redirect('biblioteca:registrar_emprestimo')
         else:
@@ -71,21 +82,254 @@ def registrar_emprestimo(request):
     }
     return render(request, 'biblioteca/registrar_emprestimo.html', contexto)
 
+
+def registrar_emprestimos_lote(request):
+    """Balcão: vários livros para o mesmo membro num único POST e numa única transação."""
+    if request.method == 'POST':
+        form = EmprestimoLoteForm(request.POST)
+        emprestimos = None
+        if form.is_valid():
+            try:
+                emprestimos = form.save()
+            except EstoqueIndisponivel as exc:
+                # Outra requisição levou as últimas cópias depois da validação
+                form.add_error('livros', str(exc))
+        if emprestimos:
+            messages.success(request, f'{len(emprestimos)} empréstimo(s) registrado(s) para "{form.cleaned_data["membro"].nome}".')
+            return redirect('biblioteca:registrar_emprestimos_lote')
+        messages.error(request, 'Nenhum empréstimo foi registrado. Verifique a disponibilidade dos livros.', extra_tags='danger')
+    else:
+        form = EmprestimoLoteForm()
+
+    contexto = {
+        'form': form,
+        'titulo_pagina': 'Empréstimo em Lote',
+    }
+    return render(request, 'biblioteca/registrar_emprestimos_lote.html', contexto)
+
+
+def reservar_livro(request):
+    """Balcão: coloca o membro na fila do livro esgotado, em vez de ele voltar a perguntar depois."""
+    if request.method == 'POST':
+        form = ReservaForm(request.POST)
+        if form.is_valid():
+            reserva = form.save()
+            if reserva.status == "Separada":
+                messages.success(request, f'Cópia de "{reserva.livro.titulo}" separada para "{reserva.membro.nome}" até {reserva.separada_ate:%d/%m/%Y}.')
+            else:
+                messages.success(request, f'"{reserva.membro.nome}" entrou na fila de "{reserva.livro.titulo}" (posição {reserva.posicao_na_fila()}).')
+            return redirect('biblioteca:reservar_livro')
+        messages.error(request, 'Erro ao registrar a reserva. Verifique os campos.', extra_tags='danger')
+    else:
+        # Vindo da ficha de um livro esgotado (?livro=<id>)
+        livro = request.GET.get('livro', '')
+        form = ReservaForm(initial={'livro': livro} if livro.isdigit() else None)
+
+    contexto = {
+        'form': form,
+        'titulo_pagina': 'Reservar Livro',
+    }
+    return render(request, 'biblioteca/reservar_livro.html', contexto)
+
+# --- Views de leitura (assíncronas) ---
+#
+# Listagem, detalhe/disponibilidade, busca e autocompletar são as rotas mais
+# acessadas e só leem: são views async que usam o ORM assíncrono, então sob
+# ASGI (config/asgi.py) um worker atende muitas em paralelo sem ocupar uma
+# thread por requisição. Sob WSGI continuam funcionando (o Django as executa
+# com async_to_sync).
+
+async def _arender(request, template_name, contexto):
+    """
+    render() para views async. O base.html mostra as mensagens, guardadas na
+    sessão: ela é carregada antes pelo caminho assíncrono, porque um acesso
+    ao banco durante a renderização não é permitido num contexto async.
+    """
+    if hasattr(request, 'session'):
+        await request.session.akeys()
+    return render(request, template_name, contexto)
+
+
+# --- Autocompletar (selects do formulário de empréstimo) ---
+
+AUTOCOMPLETAR_LIMITE = 20
+
+
+async def _buscar_livros(termo):
+    # Ordenar pela mesma collation do índice evita ordenar o resultado em memória
+    livros = Livro.objects.filter(titulo__istartswith=termo).order_by(Collate('titulo', 'NOCASE'), 'id')
+    return [
+        {'id': pk, 'texto': f'{titulo} ({disponivel} disp.)', 'disponivel': disponivel}
+        async for pk, titulo, disponivel in livros.values_list('pk', 'titulo', 'quantidade_disponivel')[:AUTOCOMPLETAR_LIMITE]
+    ]
+
+
+async def _buscar_membros(termo):
+    # Duas buscas por prefixo (nome e contato), cada uma no seu índice
+    resultados = {}
+    for campo in ('nome', 'contato'):
+        membros = Membro.objects.filter(**{f'{campo}__istartswith': termo}).order_by(Collate(campo, 'NOCASE'), 'id')
+        async for pk, nome in membros.values_list('pk', 'nome')[:AUTOCOMPLETAR_LIMITE]:
+            # Só o nome, como Membro.__str__: o contato não sai na resposta
+            resultados.setdefault(pk, {'id': pk, 'texto': nome})
+        if len(resultados) >= AUTOCOMPLETAR_LIMITE:
+            break
+    return list(resultados.values())[:AUTOCOMPLETAR_LIMITE]
+
+
+AUTOCOMPLETAR = {
+    'livros': _buscar_livros,
+    'membros': _buscar_membros,
+}
+
+
+async def autocompletar(request, tipo):
+    """Busca por prefixo para os selects de membro (só equipe) e livro (JSON, no máximo 20 itens)."""
+    if tipo not in AUTOCOMPLETAR:
+        raise Http404("Tipo de busca desconhecido.")
+    if tipo == 'membros':
+        # Dados de pessoas (e busca pelo contato): só para a equipe
+        usuario = await request.auser()
+        if not (usuario.is_active and usuario.is_staff):
+            return JsonResponse({'erro': "Acesso restrito à equipe."}, status=403)
+    termo = request.GET.get('q', '').strip()
+    return JsonResponse({'resultados': await AUTOCOMPLETAR[tipo](termo)})
+
 # --- View de Listagem (R) ---
 
-def listar_livros(request):
-    """Lista todos os livros, mostrando a disponibilidade."""
-    # F() expression garante que a operação é feita no banco de dados, não na memória
-    livros = Livro.objects.annotate(
+async def listar_livros(request):
+    """Lista os livros paginados por cursor, mostrando a disponibilidade."""
+    # F() expression garante que a operação é feita no banco de dados, não na memória.
+    # select_related traz o autor no mesmo SELECT (evita uma consulta por linha).
+    livros = Livro.objects.select_related('autor').annotate(
         disponivel_hoje=F('quantidade_disponivel')
-    ).order_by('titulo')
-    
+    )
+    tamanho = getattr(settings, 'BIBLIOTECA_LIVROS_POR_PAGINA', 50)
+    cursor = request.GET.get('cursor')
+
+    try:
+        # A página (dados de catálogo) fica em cache sob a versão do acervo
+        pagina, do_cache = await cache.apagina_do_acervo(
+            cursor, tamanho, lambda: apaginar_por_cursor(livros, ('titulo', 'id'), cursor, tamanho)
+        )
+    except CursorInvalido:
+        # Cursor adulterado ou antigo: volta para a primeira página
+        pagina, do_cache = await cache.apagina_do_acervo(
+            None, tamanho, lambda: apaginar_por_cursor(livros, ('titulo', 'id'), None, tamanho)
+        )
+
+    if do_cache:
+        # O estoque muda a cada empréstimo: vem do cache por livro, nunca da página guardada
+        disponivel = await cache.adisponibilidade(livro.pk for livro in pagina)
+        for livro in pagina:
+            livro.quantidade_disponivel = livro.disponivel_hoje = disponivel.get(livro.pk, 0)
+
     contexto = {
-        'livros': livros,
+        'livros': pagina.itens,
+        'pagina': pagina,
         'titulo_pagina': 'Acervo de Livros',
     }
-    return render(request, 'biblioteca/listar_livros.html', contexto)
-    # biblioteca/views.py (Exemplo)
+    return await _arender(request, 'biblioteca/listar_livros.html', contexto)
+
+
+async def detalhe_livro(request, pk):
+    """Ficha do livro com a disponibilidade atual (lida do cache por livro)."""
+    livro = await aget_object_or_404(Livro.objects.select_related('autor'), pk=pk)
+    disponivel = await cache.adisponibilidade([livro.pk])
+    livro.quantidade_disponivel = disponivel.get(livro.pk, livro.quantidade_disponivel)
+    contexto = {
+        'livro': livro,
+        'titulo_pagina': livro.titulo,
+    }
+    return await _arender(request, 'biblioteca/detalhe_livro.html', contexto)
+
+
+# Máximo de livros por consulta de disponibilidade
+DISPONIBILIDADE_LIMITE = 100
+
+
+async def disponibilidade(request):
+    """Disponibilidade de vários livros de uma vez: ?ids=1,2,3 -> {"1": 2, "2": 0, ...}."""
+    try:
+        livro_ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk.strip()]
+    except ValueError:
+        return JsonResponse({'erro': 'ids deve ser uma lista de números separados por vírgula.'}, status=400)
+    disponivel = await cache.adisponibilidade(livro_ids[:DISPONIBILIDADE_LIMITE])
+    return JsonResponse({'disponibilidade': {str(pk): n for pk, n in disponivel.items()}})
+
+
+# --- Busca no acervo ---
+
+# Páginas além desta não são servidas (o OFFSET cresce com a página e um
+# número gigante estoura o inteiro do banco)
+BUSCA_PAGINA_MAXIMA = 1000
+
+
+async def buscar(request):
+    """Busca textual no acervo (título, autor, editora e ano), ordenada por relevância."""
+    termo = request.GET.get('q', '').strip()
+    try:
+        pagina = int(request.GET.get('pagina', 1))
+    except ValueError:
+        raise Http404("Página inválida.")
+    if not 1 <= pagina <= BUSCA_PAGINA_MAXIMA:
+        raise Http404("Página inválida.")
+    tamanho = getattr(settings, 'BIBLIOTECA_LIVROS_POR_PAGINA', 50)
+
+    contexto = {
+        # A consulta ao índice FTS5 é SQL puro, que não tem API assíncrona
+        'resultado': await sync_to_async(buscar_livros)(termo, pagina, tamanho),
+        'termo': termo,
+        'titulo_pagina': f'Busca: {termo}' if termo else 'Buscar no Acervo',
+    }
+    return await _arender(request, 'biblioteca/buscar.html', contexto)
+
+
+# --- Exportação (relatórios) ---
+
+@staff_member_required
+def exportar(request, nome, formato):
+    """Exporta livros, membros, empréstimos ou o histórico completo em CSV/JSON por streaming (memória constante)."""
+    if nome not in exportacao.EXPORTACOES or formato not in exportacao.FORMATOS:
+        raise Http404("Exportação não encontrada.")
+
+    response = StreamingHttpResponse(
+        exportacao.GERADORES[formato](nome),
+        content_type=exportacao.FORMATOS[formato],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nome}.{formato}"'
+    return response
+
+
+# --- Painel de estatísticas ---
+
+@staff_member_required
+def painel_estatisticas(request):
+    """Mais emprestados, empréstimos por mês, atrasos por tipo de membro e uso do estoque por editora."""
+    if request.method == 'POST':
+        # A reconstrução lê o histórico inteiro: vai para a fila, não para a requisição
+        tarefas.enfileirar('recalcular_estatisticas', chave='recalcular_estatisticas')
+        messages.success(request, 'Recálculo das estatísticas agendado; o painel é atualizado quando a tarefa terminar.')
+        return redirect('biblioteca:painel_estatisticas')
+    contexto = {
+        **estatisticas.painel(),
+        'titulo_pagina': 'Estatísticas de Circulação',
+    }
+    return render(request, 'biblioteca/painel_estatisticas.html', contexto)
+
+
+# --- Perfil de desempenho ---
+
+@staff_member_required
+def perfil(request):
+    """Estatísticas agregadas por rota coletadas pelo PerfilMiddleware (neste processo)."""
+    if request.method == 'POST':
+        ESTATISTICAS.zerar()
+    return JsonResponse({
+        'ativo': getattr(settings, 'BIBLIOTECA_PERFIL', False),
+        'rotas': ESTATISTICAS.resumo(),
+    })
+
 
 def index(request):
     """
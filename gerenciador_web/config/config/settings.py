@@ -10,41 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
-"""
-Django settings for config project.
-
-Generated by 'django-admin startproject' using Django 5.2.1.
-
-For more information on this file, see
-https://docs.djangoproject.com/en/5.2/topics/settings/
-
-For the full list of settings and their values, see
-https://docs.djangoproject.com/en/5.2/ref/settings/
-"""
-
-"""
-Django settings for config project.
-
-Generated by 'django-admin startproject' using Django 5.2.1.
-"""
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                # Removida a linha incorreta que causava o erro
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -72,7 +42,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Perfil de consultas/tempo por requisição (só ativo com BIBLIOTECA_PERFIL = True)
+    'biblioteca.middleware.PerfilMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Arquivos do STATIC_ROOT, antes de sessão e URLs (só ativo com BIBLIOTECA_ESTATICOS_SERVIR = True)
+    'biblioteca.middleware.EstaticosMiddleware',
+    # Compressão das respostas dinâmicas (HTML, JSON e as exportações CSV em streaming, bloco a bloco)
+    # e ETag/304 para páginas que não mudaram; os estáticos já saem comprimidos do middleware acima
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -98,8 +76,54 @@ TEMPLATES = [
     },
 ]
 
+# Perfil de produção dos templates (ative com a variável de ambiente BIBLIOTECA_TEMPLATES=producao).
+# - loaders explícitos com o cached.Loader: cada template é lido e compilado
+#   uma vez por processo. Sem 'loaders', o Django também usa o cache, mas o
+#   runserver o esvazia a cada arquivo alterado;
+# - debug=False: o lexer não guarda a posição de cada token para a página de
+#   erro, e os templates compilam mais rápido.
+# Medido pelo comando benchmark_templates.
+BIBLIOTECA_TEMPLATES_PRODUCAO = {
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}
+
+if os.environ.get('BIBLIOTECA_TEMPLATES') == 'producao':
+    TEMPLATES[0]['APP_DIRS'] = BIBLIOTECA_TEMPLATES_PRODUCAO['APP_DIRS']
+    TEMPLATES[0]['OPTIONS'].update(BIBLIOTECA_TEMPLATES_PRODUCAO['OPTIONS'])
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Perfil de execução (variável de ambiente BIBLIOTECA_EXECUCAO):
+# - completa (padrão): site, admin e API;
+# - enxuta: só a API JSON e os comandos do manage.py (cron, processar_tarefas).
+#   Sem admin, mensagens e arquivos estáticos, o processo sobe sem importar o
+#   admin do Django nem, pelo autodiscover, o admin.py do biblioteca e o que
+#   ele usa. Medido pelo comando benchmark_inicializacao.
+BIBLIOTECA_EXECUCAO = os.environ.get('BIBLIOTECA_EXECUCAO', 'completa')
+
+if BIBLIOTECA_EXECUCAO == 'enxuta':
+    SO_DO_SITE = ('django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles')
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in SO_DO_SITE]
+    MIDDLEWARE = [
+        classe for classe in MIDDLEWARE
+        if classe not in ('django.contrib.messages.middleware.MessageMiddleware',
+                          'django.middleware.clickjacking.XFrameOptionsMiddleware',
+                          'biblioteca.middleware.EstaticosMiddleware')
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove('django.contrib.messages.context_processors.messages')
+    ROOT_URLCONF = 'config.urls_enxuta'
+elif BIBLIOTECA_EXECUCAO != 'completa':
+    raise ImproperlyConfigured(f"BIBLIOTECA_EXECUCAO deve ser 'completa' ou 'enxuta', não {BIBLIOTECA_EXECUCAO!r}.")
+
 
 # Database
 
@@ -110,6 +134,50 @@ DATABASES = {
     }
 }
 
+# Perfil de produção do SQLite (ative com a variável de ambiente BIBLIOTECA_BANCO=producao).
+# - WAL: leitores não bloqueiam o escritor e vice-versa;
+# - synchronous=NORMAL é seguro em WAL (uma queda de energia perde no máximo o último commit);
+# - BEGIN IMMEDIATE: a transação já nasce com o lock de escrita, então quem
+#   espera é o busy_timeout, e não um "database is locked" no meio do empréstimo;
+# - CONN_MAX_AGE reaproveita a conexão (e os pragmas) entre requisições.
+BIBLIOTECA_SQLITE_PRODUCAO = {
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA busy_timeout=20000;'
+            'PRAGMA cache_size=-65536;'  # 64 MB por conexão
+            'PRAGMA mmap_size=268435456;'  # 256 MB
+            'PRAGMA temp_store=MEMORY;'
+        ),
+    },
+}
+
+if os.environ.get('BIBLIOTECA_BANCO') == 'producao':
+    DATABASES['default'].update(BIBLIOTECA_SQLITE_PRODUCAO)
+
+
+# Cache compartilhado por todos os processos: workers do servidor, comandos do
+# cron (devolver_emprestimos, processar_reservas, verificar_atrasos...) e o
+# processar_tarefas. A invalidação por versão (biblioteca/cache.py) só vale se
+# todos enxergam os mesmos contadores; com LocMemCache cada processo teria os
+# seus e uma baixa feita por um comando não invalidaria o cache do site.
+# Com mais de um servidor, troque por Redis/Memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('BIBLIOTECA_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Os testes usam um diretório de cache temporário e próprio
+TEST_RUNNER = 'biblioteca.executor_de_testes.ExecutorDeTestes'
+
 
 # Password validation
 
@@ -144,6 +212,64 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Destino do collectstatic
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Perfil de produção dos estáticos (ative com a variável de ambiente BIBLIOTECA_ESTATICOS=producao).
+# - o collectstatic grava os arquivos com o hash do conteúdo no nome e as
+#   versões .gz (e .br, se o pacote brotli estiver instalado), e o {% static %}
+#   passa a gerar os nomes com hash: rode o collectstatic a cada deploy;
+# - o EstaticosMiddleware serve o STATIC_ROOT com cache de um ano para esses
+#   nomes, então uma visita repetida não baixa CSS/JS de novo.
+BIBLIOTECA_ESTATICOS_SERVIR = os.environ.get('BIBLIOTECA_ESTATICOS') == 'producao'
+
+if BIBLIOTECA_ESTATICOS_SERVIR:
+    STORAGES['staticfiles']['BACKEND'] = 'biblioteca.estaticos.ArmazenamentoComprimido'
+
 # Default primary key field type
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Biblioteca
+
+# Quantidade de livros por página na listagem do acervo (paginação por cursor)
+BIBLIOTECA_LIVROS_POR_PAGINA = 50
+
+# Registros por página da API JSON (/api/<recurso>/), quando o cliente não informa ?limite=
+BIBLIOTECA_API_POR_PAGINA = 100
+
+# Validade (segundos) das páginas do acervo e da disponibilidade em cache.
+# A invalidação é por versão, então isto só limita o uso de memória.
+BIBLIOTECA_CACHE_TIMEOUT = 60 * 60
+
+# Empréstimos devolvidos há mais dias que isto vão para o arquivo
+# (comando arquivar_emprestimos; relatórios de histórico leem as duas tabelas)
+BIBLIOTECA_ARQUIVAR_APOS_DIAS = 365
+
+# Dias que a cópia separada para uma reserva espera pelo membro antes de
+# passar ao próximo da fila (comando processar_reservas)
+BIBLIOTECA_RESERVA_PRAZO_DIAS = 3
+
+# Fila de tarefas (comando processar_tarefas): espera, em segundos, antes da
+# 2ª tentativa de uma tarefa que falhou (dobra a cada nova falha) e dias que
+# as concluídas ficam na tabela
+BIBLIOTECA_TAREFAS_ESPERA_BASE = 30
+BIBLIOTECA_TAREFAS_MANTER_DIAS = 7
+
+# Changelists do admin: acima deste número de linhas o COUNT(*) da paginação
+# é reaproveitado por BIBLIOTECA_ADMIN_CONTAGEM_TIMEOUT segundos
+BIBLIOTECA_ADMIN_CONTAGEM_LIMIAR = 10000
+BIBLIOTECA_ADMIN_CONTAGEM_TIMEOUT = 5 * 60
+
+# Perfil por requisição (cabeçalhos X-Consultas/Server-Timing e /perfil/).
+# Desligado por padrão; ligue com a variável de ambiente BIBLIOTECA_PERFIL=1.
+BIBLIOTECA_PERFIL = os.environ.get('BIBLIOTECA_PERFIL') == '1'
+
+# Quantas repetições da mesma consulta numa requisição geram o aviso de N+1
+BIBLIOTECA_PERFIL_LIMITE_N_MAIS_UM = 5
\ No newline at end of file
@@ -0,0 +1,10 @@
+# config/urls_enxuta.py
+
+# URLconf da execução enxuta (BIBLIOTECA_EXECUCAO=enxuta): só a API JSON,
+# sem o admin e sem as views do site.
+
+from django.urls import include, path
+
+urlpatterns = [
+    path('', include('biblioteca.urls_api')),
+]